@@ -0,0 +1,161 @@
+# benchmarks/bench_generation.py
+"""
+Study material generation benchmark: compares the GENERATION_MODE settings.
+
+Runs the summary, quizzes, flashcards and timestamps generation on the sample
+transcripts in data/text_timestamps (repeated to model longer lectures) once per
+mode, each in a fresh interpreter against a local fake OpenAI server, and reports
+LLM requests, prompt tokens, cached prompt tokens, billed input tokens (cached
+tokens at a discount), completion tokens and wall time.
+
+The fake server caches prompt prefixes the way the provider does (prefixes of
+1024+ tokens, in 128-token steps), so the shared_prefix numbers show what prompt
+caching can save; the combined mode sends the transcript only once.
+
+Usage (from the repository root):
+    python benchmarks/bench_generation.py [--modes separate shared_prefix combined] [--repeat 8]
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+SAMPLES_DIR = os.path.join(ROOT_DIR, 'data', 'text_timestamps')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server
+
+MODES = ["separate", "shared_prefix", "combined"]
+
+
+def load_lecture(path, repeat):
+    """
+    Loads a timestamped transcript CSV, repeated back to back to lengthen the lecture.
+    Args:
+        path (str): CSV with 'start', 'end' and 'text' columns.
+        repeat (int): Number of copies.
+    Returns:
+        tuple: (transcription text, list of segments).
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        rows = [{"start": float(row["start"]), "end": float(row["end"]), "text": row["text"]}
+                for row in csv.DictReader(f)]
+    duration = rows[-1]["end"] if rows else 0.0
+    segments = [dict(row, start=row["start"] + copy * duration, end=row["end"] + copy * duration)
+                for copy in range(repeat) for row in rows]
+    return "".join(segment["text"] for segment in segments), segments
+
+
+def run_child(path, repeat):
+    """
+    Generates every study material of one lecture (inside the child interpreter, whose
+    GENERATION_MODE selects the mode) the same way the pipeline does.
+    Args:
+        path (str): Transcript CSV.
+        repeat (int): Number of copies of the transcript.
+    Returns:
+        dict: Wall time in seconds and output sizes.
+    """
+    sys.path.insert(0, SRC_DIR)
+    from core import pipeline
+    from core.config import GENERATION_MODE
+    from core.concurrency import run_concurrently
+    from core.flashcards import generate_flashcards
+    from core.materials import generate_materials
+
+    transcription, segments = load_lecture(path, repeat)
+    started = time.perf_counter()
+    if GENERATION_MODE == "combined":
+        outputs = generate_materials(transcription, segments)
+    else:
+        outputs = run_concurrently({
+            "summary": (lambda: pipeline.generate_summary_stage(transcription, segments), None),
+            "quizzes": (lambda: pipeline.generate_quiz_stage(transcription), None),
+            "flashcards": (lambda: generate_flashcards(transcription), None),
+            "timestamps": (lambda: pipeline.generate_timestamps_stage(transcription, segments), None),
+        })
+    seconds = time.perf_counter() - started
+    return {"seconds": seconds, "transcript_chars": len(transcription),
+            "outputs": {name: len(value or "") for name, value in outputs.items()}}
+
+
+def benchmark(server, env, path, repeat, mode):
+    """
+    Benchmarks one mode on one lecture in a fresh interpreter.
+    Args:
+        server (FakeOpenAIServer): The fake server (its usage totals are read before and after).
+        env (dict): Environment of the child process.
+        path (str): Transcript CSV.
+        repeat (int): Number of copies of the transcript.
+        mode (str): GENERATION_MODE of the run.
+    Returns:
+        dict: The child's measurements plus the LLM usage of the run, or an error.
+    """
+    before = (server.requests, server.prompt_tokens, server.cached_tokens, server.completion_tokens)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, "--repeat", str(repeat)],
+                            cwd=SRC_DIR, env=dict(env, GENERATION_MODE=mode), capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "benchmark failed"
+        return {"mode": mode, "error": error}
+
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    after = (server.requests, server.prompt_tokens, server.cached_tokens, server.completion_tokens)
+    requests, prompt_tokens, cached_tokens, completion_tokens = (a - b for a, b in zip(after, before))
+    run.update(mode=mode, requests=requests, prompt_tokens=prompt_tokens, cached_tokens=cached_tokens,
+               completion_tokens=completion_tokens)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the study material generation modes.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--repeat", type=int, default=8, help="Copies of each sample transcript per lecture.")
+    parser.add_argument("--cached-discount", type=float, default=0.5,
+                        help="Fraction of the input price saved on cached prompt tokens.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM server latency per request (s).")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Fake LLM delay per streamed token (s).")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.repeat)))
+        return
+
+    server, base_url = start_server(latency=args.latency, token_latency=args.token_latency)
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, OPENAI_API_KEY="fake",
+               # Measure the requests themselves: no cached artifacts or responses, no client-side rate limiting
+               CACHE_ENABLED="0", LLM_CACHE_ENABLED="0", LLM_RPM="0", LLM_TPM="0")
+
+    samples = sorted(os.path.join(SAMPLES_DIR, name) for name in os.listdir(SAMPLES_DIR) if name.endswith(".txt"))
+    totals = {mode: {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+              for mode in args.modes}
+    for path in samples:
+        print(os.path.basename(path))
+        for mode in args.modes:
+            run = benchmark(server, env, path, args.repeat, mode)
+            if "error" in run:
+                print(f"  {mode:<14} failed: {run['error']}")
+                continue
+            for key in totals[mode]:
+                totals[mode][key] += run[key]
+            print(f"  {mode:<14} {run['requests']:>3} request(s)  prompt {run['prompt_tokens']:>7}  "
+                  f"cached {run['cached_tokens']:>7}  completion {run['completion_tokens']:>6}  {run['seconds']:.1f}s")
+    server.shutdown()
+
+    print("\nTotals (billed input counts cached tokens at a "
+          f"{args.cached_discount:.0%} discount, relative to {args.modes[0]}):")
+    baseline = None
+    for mode, total in totals.items():
+        billed = total["prompt_tokens"] - args.cached_discount * total["cached_tokens"]
+        baseline = baseline or billed or 1
+        print(f"  {mode:<14} {total['requests']:>3} request(s)  billed input {billed:>9.0f} ({billed / baseline:.0%})  "
+              f"completion {total['completion_tokens']:>6}  {total['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
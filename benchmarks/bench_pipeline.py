@@ -0,0 +1,193 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end pipeline benchmark on synthetic lectures.
+
+Generates synthetic lecture videos of several lengths with ffmpeg, then runs the
+pipeline stage by stage on each one in a fresh interpreter (store video, decode
+audio, load model, transcribe, summary, quizzes, flashcards, timestamps) against
+a local fake OpenAI server. Reports per-stage wall time, peak RSS and real-time
+factor, and appends the results to a JSON history so regressions show up between commits.
+
+The default synthetic audio is a speech-like tone pattern with pauses; pass --speech
+with a real recording (looped to each length) for realistic transcription work.
+
+Usage (from the repository root):
+    python benchmarks/bench_pipeline.py [--minutes 1 10 60 120] [--latency 0.5] [--speech sample.wav]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server
+from startup import git_commit
+
+# Syllable-rate amplitude modulated tones, silent for 1s out of every 8s so the
+# splitter and the windowed transcription see natural pauses
+SYNTHETIC_AUDIO = ("aevalsrc='if(lt(mod(t,8),7),0.4*sin(2*PI*(180+60*sin(2*PI*0.5*t))*t)"
+                   "*(0.5+0.5*sin(2*PI*4*t)),0)':s=16000:d={seconds}")
+
+
+def make_video(path, seconds, speech=None):
+    """
+    Generates a small synthetic lecture video (1 fps black frames plus audio).
+    Args:
+        path (str): Output path (.mp4).
+        seconds (float): Duration.
+        speech (str, optional): Recording looped as the soundtrack instead of the synthetic tones.
+    """
+    if speech:
+        audio = ["-stream_loop", "-1", "-i", speech]
+    else:
+        audio = ["-f", "lavfi", "-i", SYNTHETIC_AUDIO.format(seconds=seconds)]
+    command = (["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"color=c=black:s=320x240:r=1:d={seconds}"]
+               + audio + ["-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-ac", "1",
+                          "-shortest", path])
+    subprocess.run(command, check=True)
+
+
+def peak_rss_mb():
+    """
+    Returns:
+        dict: Peak resident set size in MB of this process and of its finished children (ffmpeg).
+    """
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def run_child(video, workdir):
+    """
+    Runs the pipeline stage by stage on one video (inside the child interpreter).
+    Args:
+        video (str): Path of the synthetic video.
+        workdir (str): Scratch directory for the stored video.
+    Returns:
+        dict: Per-stage seconds and peak RSS, plus output sizes.
+    """
+    sys.path.insert(0, SRC_DIR)
+    from core import pipeline
+    from core.audio import SAMPLE_RATE, stream_audio, store_video
+    from core.flashcards import generate_flashcards
+    from core.models import get_transcriber
+
+    stages = {}
+    outputs = {}
+
+    def stage(name, compute):
+        started = time.perf_counter()
+        value = compute()
+        stages[name] = {"seconds": time.perf_counter() - started, "peak_rss_mb": peak_rss_mb()}
+        return value
+
+    video_path = stage("store_video", lambda: store_video(video, os.path.join(workdir, os.path.basename(video))))
+    samples = stage("decode_audio", lambda: stream_audio(video_path))
+    stage("model_load", get_transcriber)
+    transcription, segments = stage("transcribe", lambda: pipeline.transcribe_audio(samples))
+    summary = stage("summary", lambda: pipeline.generate_summary_stage(transcription, segments))
+    quizzes = stage("quizzes", lambda: pipeline.generate_quiz_stage(transcription))
+    flashcards = stage("flashcards", lambda: generate_flashcards(transcription))
+    timestamps = stage("timestamps", lambda: pipeline.generate_timestamps_stage(transcription, segments))
+
+    outputs.update(segments=len(segments), transcript_chars=len(transcription), summary_chars=len(summary or ""),
+                   quizzes=len(quizzes or []), flashcards_chars=len(flashcards or ""),
+                   timestamps_chars=len(timestamps or ""))
+    return {"audio_seconds": len(samples) / SAMPLE_RATE, "stages": stages, "outputs": outputs}
+
+
+def benchmark(video, minutes, env, workdir):
+    """
+    Benchmarks one video in a fresh interpreter.
+    Args:
+        video (str): Path of the synthetic video.
+        minutes (float): Its nominal length.
+        env (dict): Environment of the child process (points it at the fake server).
+        workdir (str): Scratch directory.
+    Returns:
+        dict: The child's measurements plus totals and real-time factors, or an error.
+    """
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", video, "--workdir", workdir],
+                            cwd=SRC_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "benchmark failed"
+        return {"minutes": minutes, "error": error}
+
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    total = sum(s["seconds"] for s in run["stages"].values())
+    run.update(minutes=minutes, total_seconds=total,
+               rtf=total / run["audio_seconds"],
+               transcribe_rtf=run["stages"]["transcribe"]["seconds"] / run["audio_seconds"],
+               peak_rss_mb=max(s["peak_rss_mb"]["self"] for s in run["stages"].values()))
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LecChurro pipeline on synthetic lectures.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60, 120], help="Lecture lengths.")
+    parser.add_argument("--speech", help="Recording looped as the soundtrack instead of synthetic tones.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM server latency per request (s).")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Fake LLM delay per streamed token (s).")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, 'benchmarks', 'results', 'pipeline.json'))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.workdir)))
+        return
+
+    server, base_url = start_server(latency=args.latency, token_latency=args.token_latency)
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, OPENAI_API_KEY="fake",
+               # Measure the work itself: no cached artifacts or responses, no client-side rate limiting
+               CACHE_ENABLED="0", LLM_CACHE_ENABLED="0", LLM_RPM="0", LLM_TPM="0")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "settings": {key: os.getenv(key) for key in ("TRANSCRIBE_BACKEND", "WHISPER_MODEL", "WHISPER_COMPUTE_TYPE",
+                                                      "TRANSCRIBE_WORKERS") if os.getenv(key)},
+        "llm_latency": args.latency,
+        "speech": os.path.basename(args.speech) if args.speech else None,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="lecchurro-bench-") as workdir:
+        for minutes in args.minutes:
+            video = os.path.join(workdir, f"synthetic-{minutes:g}min.mp4")
+            make_video(video, minutes * 60, args.speech)
+            run = benchmark(video, minutes, env, workdir)
+            results["runs"].append(run)
+            if "error" in run:
+                print(f"{minutes:>6g} min  failed: {run['error']}")
+                continue
+            per_stage = "  ".join(f"{name}={s['seconds']:.1f}s" for name, s in run["stages"].items())
+            print(f"{minutes:>6g} min  total {run['total_seconds']:.1f}s  RTF {run['rtf']:.3f}  "
+                  f"transcribe RTF {run['transcribe_rtf']:.3f}  peak RSS {run['peak_rss_mb']:.0f} MB")
+            print(f"           {per_stage}")
+    server.shutdown()
+    results["llm_requests"] = server.requests
+
+    # Keep a history so regressions between commits are visible
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    history.append(results)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# benchmarks/fake_openai.py
+"""
+Minimal OpenAI-compatible chat completions server for benchmarks and tests.
+
+Answers POST /v1/chat/completions (streaming and non-streaming) with canned output
+shaped like what each core module expects (summary Markdown, a {"quizzes": [...]} object,
+"Front:/Back:" flashcards, JSON concept groups, topic labels and combined lecture materials),
+after a configurable latency. Repeated prompt prefixes are reported as cached tokens, like
+the provider's automatic prompt caching.
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage (from the repository root):
+    python benchmarks/fake_openai.py [--port 8001] [--latency 0.5] [--token-latency 0.005] [--error-rate 0.1]
+"""
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+QUIZ_RESPONSE = json.dumps({"quizzes": [
+    {"question": f"Synthetic question {i + 1}?", "options": ["A", "B", "C", "D"], "answer": "A"}
+    for i in range(12)
+]}, indent=2)
+
+FLASHCARDS_RESPONSE = "\n\n".join(f"Front: Synthetic term {i + 1}\nBack: Synthetic definition {i + 1}."
+                                  for i in range(15))
+
+SUMMARY_RESPONSE = "## Synthetic lecture\n\n" + "\n".join(f"- Key point {i + 1} of the lecture." for i in range(20))
+
+# Prompt caching: prefixes of at least this many tokens are cached, in steps of CACHE_STEP_TOKENS
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+# Earlier prompts remembered for prefix matching
+CACHE_PROMPTS = 64
+
+
+def concept_groups(prompt):
+    """
+    Groups the compact segments found in a timestamps prompt into five concepts.
+    Args:
+        prompt (str): User prompt containing the "Input segments (JSON)" block.
+    Returns:
+        str: JSON list of concept groups.
+    """
+    match = re.search(r"Input segments \(JSON\):\n(\[.*\])", prompt, flags=re.DOTALL)
+    segments = json.loads(match.group(1)) if match else []
+    groups = []
+    size = max(1, len(segments) // 5)
+    for i in range(0, len(segments), size):
+        chunk = segments[i:i + size]
+        groups.append({
+            "title": f"Concept {len(groups) + 1}",
+            "start_time": chunk[0]["s"],
+            "end_time": chunk[-1]["e"],
+            "summary": "Synthetic concept summary.",
+            "segments": [{"mini_title": "Sub-topic", "start_time": s["s"], "text": s["t"][:80]} for s in chunk[:3]],
+        })
+    return json.dumps(groups)
+
+
+def topic_labels(prompt):
+    """
+    Labels the pre-computed topics found in a topic labeling prompt.
+    Args:
+        prompt (str): User prompt containing the "Input topics (JSON)" block.
+    Returns:
+        str: JSON object with one label per topic.
+    """
+    match = re.search(r"Input topics \(JSON\):\n(\[.*\])", prompt, flags=re.DOTALL)
+    topics = json.loads(match.group(1)) if match else []
+    return json.dumps({"topics": [
+        {"id": topic["id"], "title": f"Concept {topic['id'] + 1}", "summary": "Synthetic concept summary.",
+         "subtopic_titles": ["Sub-topic"] * len(topic["subtopics"])}
+        for topic in topics
+    ]})
+
+
+def lecture_materials(messages):
+    """
+    Builds a combined materials object, labelling every [t.s] topic marker found in the transcript.
+    Args:
+        messages (list of dict): Chat messages of the request.
+    Returns:
+        str: JSON object with a summary, quizzes, flashcards and topic labels.
+    """
+    subtopics = {}
+    for message in messages:
+        for topic, sub in re.findall(r"\[(\d+)\.(\d+)\]", message.get("content", "")):
+            subtopics[int(topic)] = max(subtopics.get(int(topic), 0), int(sub) + 1)
+    return json.dumps({
+        "summary": SUMMARY_RESPONSE,
+        "quizzes": json.loads(QUIZ_RESPONSE)["quizzes"],
+        "flashcards": [{"front": f"Synthetic term {i + 1}", "back": f"Synthetic definition {i + 1}."}
+                       for i in range(15)],
+        "topics": [{"id": topic, "title": f"Concept {topic + 1}", "summary": "Synthetic concept summary.",
+                    "subtopic_titles": ["Sub-topic"] * count}
+                   for topic, count in sorted(subtopics.items())],
+    }, indent=2)
+
+
+def canned_response(messages, response_format=None):
+    """
+    Picks a response that the calling module can parse, based on its prompt.
+    Args:
+        messages (list of dict): Chat messages of the request.
+        response_format (dict, optional): The request's response_format.
+    Returns:
+        str: Response content.
+    """
+    if ((response_format or {}).get("json_schema") or {}).get("name") == "lecture_materials":
+        return lecture_materials(messages)
+    prompt = messages[-1]["content"] if messages else ""
+    if "Input segments (JSON)" in prompt:
+        return concept_groups(prompt)
+    if "Input topics (JSON)" in prompt:
+        return topic_labels(prompt)
+    if '"quizzes": [' in prompt:
+        return QUIZ_RESPONSE
+    if "Front:" in prompt:
+        return FLASHCARDS_RESPONSE
+    return SUMMARY_RESPONSE
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler; settings are read from the server instance."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        server.record_request()
+
+        time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            headers={"retry-after-ms": "200"})
+            return
+
+        messages = request.get("messages", [])
+        content = canned_response(messages, request.get("response_format"))
+        # Roughly four characters per token, like the client-side estimate
+        prompt = "".join(f"{m.get('role', '')}:{m.get('content', '')}\n" for m in messages)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        cached_tokens = min(server.cached_prefix_tokens(prompt), prompt_tokens)
+        tokens = re.findall(r"\S+\s*", content)
+        server.record_usage(prompt_tokens, cached_tokens, len(tokens))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens),
+                 "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        model = request.get("model", "gpt-4o")
+        created = int(time.time())
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": model}
+        for token in tokens:
+            time.sleep(server.token_latency)
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=usage))}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded fake server with configurable latency and error rate."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, token_latency=0.0, error_rate=0.0):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._prompts = []
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_usage(self, prompt_tokens, cached_tokens, completion_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+
+    def cached_prefix_tokens(self, prompt):
+        """
+        Simulates automatic prompt caching: the longest prefix shared with an earlier prompt
+        counts as cached once it reaches CACHE_MIN_TOKENS, rounded down to CACHE_STEP_TOKENS.
+        Args:
+            prompt (str): Serialized messages of the request.
+        Returns:
+            int: Cached prompt tokens.
+        """
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, earlier])) for earlier in self._prompts), default=0)
+            self._prompts = (self._prompts + [prompt])[-CACHE_PROMPTS:]
+        tokens = shared // 4
+        return tokens // CACHE_STEP_TOKENS * CACHE_STEP_TOKENS if tokens >= CACHE_MIN_TOKENS else 0
+
+
+def start_server(port=0, latency=0.0, token_latency=0.0, error_rate=0.0):
+    """
+    Starts a fake server on a background thread.
+    Args:
+        port (int): Port to listen on (0 picks a free one).
+        latency (float): Seconds before each response starts.
+        token_latency (float): Seconds between streamed tokens.
+        error_rate (float): Fraction of requests answered with a 429.
+    Returns:
+        tuple: (server, base_url) where base_url is suitable for OPENAI_BASE_URL.
+    """
+    server = FakeOpenAIServer(("127.0.0.1", port), latency, token_latency, error_rate)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before each response starts.")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds between streamed tokens.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 429.")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(("127.0.0.1", args.port), args.latency, args.token_latency, args.error_rate)
+    print(f"Fake OpenAI server on http://127.0.0.1:{args.port}/v1 (set OPENAI_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
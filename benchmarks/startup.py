@@ -0,0 +1,91 @@
+# benchmarks/startup.py
+"""
+Measures application cold-start costs, each in a fresh interpreter:
+- import time of the core modules and of the Gradio app,
+- time to load the transcription model,
+- first-request latency (model load plus a first short transcription).
+
+Usage (from the repository root):
+    python benchmarks/startup.py [--output benchmarks/results/startup.json] [--repeat 3]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+
+# Each probe runs in its own interpreter and prints the elapsed seconds on its last line
+PROBES = {
+    "import_core_quizzes": "import core.quizzes",
+    "import_core_pipeline": "import core.pipeline",
+    "import_app": "import app",
+    "model_load": "from core.models import get_transcriber\nget_transcriber()",
+    "first_request": (
+        "import numpy as np\n"
+        "from core.models import get_transcriber\n"
+        "get_transcriber().transcribe(np.zeros(16000 * 5, dtype=np.float32))"
+    ),
+}
+
+
+def run_probe(code):
+    """
+    Times a snippet in a fresh Python process.
+    Args:
+        code (str): Python code to time.
+    Returns:
+        float or None: Elapsed seconds, or None if the snippet failed.
+    """
+    script = (
+        "import time\n"
+        "_started = time.perf_counter()\n"
+        f"{code}\n"
+        "print(time.perf_counter() - _started)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    """Returns the current git commit hash, or None outside a repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LecChurro startup and first-request latency.")
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, 'benchmarks', 'results', 'startup.json'))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per probe (the best run is reported).")
+    args = parser.parse_args()
+
+    results = {"commit": git_commit(), "timestamp": time.time(), "probes": {}}
+    for name, code in PROBES.items():
+        timings = [t for t in (run_probe(code) for _ in range(args.repeat)) if t is not None]
+        best = min(timings) if timings else None
+        results["probes"][name] = {"best_seconds": best, "runs": timings}
+        print(f"{name:<22} {best:.3f}s" if best is not None else f"{name:<22} failed")
+
+    # Keep a history so regressions between commits are visible
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    history = []
+    if os.path.exists(args.output):
+        with open(args.output, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    history.append(results)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,9 @@
 # src/app.py
 import os
-import shutil
-import gradio as gr
-import ffmpeg
-import whisper
-import openai
+import time
 import warnings
+import threading
 import traceback
-import json
-import re
 
 # Suppress specific warnings we don't care about to declutter logs
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU; using FP32 instead")
@@ -17,171 +12,152 @@ warnings.filterwarnings("ignore", message="You are using torch.load with weights
 # Avoid potential multiprocessing issues
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
-from dotenv import load_dotenv
-load_dotenv()
-
-# Set up OpenAI API key from environment variables
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-# Import custom core functionalities for our featuers from the application 
-from core.summaries import summarize_text
-from core.quizzes import generate_quiz, grade_quizzes
-from core.flashcards import generate_flashcards, format_flashcards_markdown
-from core.timestamps import generate_conceptual_timestamps
-
-# Directory paths for organizing data
-ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-DATA_DIR = os.path.join(ROOT_DIR, 'data')
-AUDIO_DIR = os.path.join(DATA_DIR, 'audio')
-TEXT_DIR = os.path.join(ROOT_DIR, 'data', 'text_timestamps')
-VIDEO_DIR = os.path.join(DATA_DIR, 'video')
-
-# Ensure required directories exist
-os.makedirs(AUDIO_DIR, exist_ok=True)
-os.makedirs(TEXT_DIR, exist_ok=True)
-os.makedirs(VIDEO_DIR, exist_ok=True)
+import gradio as gr
 
-# Load the Whisper model for audio transcription
-print("Loading Whisper model...")
-whisper_model = whisper.load_model("base")
-print("Whisper model loaded.")
+# Import custom core functionalities for our featuers from the application.
+# Heavy dependencies (torch, whisper, openai) are only imported when first used.
+from core.pipeline import process_video_stream, add_upgrade_listener, VIDEO_DIR, AUDIO_DIR, TEXT_DIR
+from core.quizzes import grade_quizzes
+from core.flashcards import format_flashcards_markdown
+from core.timestamps import format_transcript_markdown
+from core.tiers import tier_transcriber, warm_up_tier, DEFAULT_TIER
+from core.workers import transcription_pool
+from core.live import LiveSession
+from core.metrics import start_exporters
+from core.search import SearchIndex, format_search_results
+from core.segment_store import EXTENSION as SEGMENT_STORE_EXTENSION
+from core.config import SEARCH_INDEX_PATH, SERVER_WORKERS, SERVER_QUEUE_SIZE
 
 # Maximum number of questions for quizzes
 MAX_QUESTIONS = 50 # Adjustable
 
+# Full-text index over every processed lecture, loaded from its last snapshot
+search_index = SearchIndex.load(SEARCH_INDEX_PATH)
+
 
-def extract_audio(video_file_path, audio_file_path):
+def sync_search_index():
     """
-    Extracts audio from a video file using FFmpeg.
-    Args:
-        video_file_path (str): Path to the input video file.
-        audio_file_path (str): Path to save the extracted audio file.
-    Returns:
-        bool: True if extraction succeeds, False otherwise.
+    Indexes the segment stores written since the last snapshot (e.g. by the batch command)
+    and saves a new snapshot if anything changed.
     """
-    print("Extracting audio with ffmpeg...")
     try:
-        (
-            ffmpeg
-            .input(video_file_path)
-            .output(audio_file_path, format='wav', acodec='pcm_s16le', ac=1, ar='16k')
-            .overwrite_output()
-            .run(quiet=True)
-        )
-        print("Audio extraction successful.")
-        return True
+        if search_index.sync(TEXT_DIR):
+            search_index.save(SEARCH_INDEX_PATH)
+        print(f"Search index ready: {len(search_index.lectures)} lecture(s), {len(search_index)} segment(s).")
     except Exception as e:
-        print(f"Error extracting audio: {e}")
-        traceback.print_exc()
-        return False
+        print(f"Error syncing search index: {e}")
 
 
-def transcribe_audio(audio_file_path):
+def index_lecture(video_path, segments, lecture=None):
     """
-    Transcribes audio using Whisper.
+    Adds a freshly processed lecture to the search index and snapshots it in the background.
     Args:
-        audio_file_path (str): Path to the audio file.
-    Returns:
-        tuple: (transcription text, list of segments with timestamps).
+        video_path (str or None): Path of the lecture video (None for a live lecture).
+        segments (list of dict): Transcript segments.
+        lecture (str, optional): Lecture name (defaults to the video's file name without extension).
     """
-    print("Transcribing audio with Whisper...")
-    result = whisper_model.transcribe(audio_file_path)
-    transcription = result["text"]
-    segments = result["segments"]
-    print("Transcription complete.")
-    return transcription, segments
+    lecture = lecture or os.path.splitext(os.path.basename(video_path))[0]
+    source = os.path.join(TEXT_DIR, lecture + SEGMENT_STORE_EXTENSION)
+    mtime = os.path.getmtime(source) if os.path.isfile(source) else None
+    search_index.add_lecture(lecture, segments, source=source if mtime else None, mtime=mtime, video=video_path)
+    threading.Thread(target=search_index.save, args=(SEARCH_INDEX_PATH,), daemon=True).start()
 
 
-def process_video(video_file):
+def on_upgrade(lecture, tier, segments):
     """
-    Processes the uploaded video to extract and analyze its content.
+    Re-indexes a lecture whose draft transcript was replaced by a background upgrade.
     Args:
-        video_file (str): Path to the uploaded video file.
-    Returns:
-        tuple: Paths and generated data (video path, summary, segments, quizzes, flashcards).
+        lecture (str): Lecture name.
+        tier (str): Tier of the new transcript.
+        segments (list of dict): The upgraded segments.
     """
-    print(f"Processing video file: {video_file}")
-
-    # Validate video file
-    if not video_file or not os.path.isfile(video_file):
-        print("Invalid video file path.")
-        return "Error extracting audio.", None, None, None, None
+    entry = search_index.lectures.get(lecture)
+    index_lecture(entry["video"] if entry else None, segments, lecture=lecture)
+    print(f"Search index updated with the '{tier}' transcript of {lecture}.")
 
-    # Save the video to the designated directory
-    video_filename = os.path.basename(video_file)
-    video_path = os.path.join(VIDEO_DIR, video_filename)
-    shutil.copy(video_file, video_path)
-    print(f"Video saved to: {video_path}")
 
-    # Extract audio from the video
-    audio_filename = os.path.splitext(video_filename)[0] + ".wav"
-    audio_path = os.path.join(AUDIO_DIR, audio_filename)
-    success = extract_audio(video_path, audio_path)
+add_upgrade_listener(on_upgrade)
 
-    if not success:
-        return "Error extracting audio.", None, None, None, None
 
-    # Transcribe the audio
-    try:
-        transcription, segments = transcribe_audio(audio_path)
-        print(f"Transcription snippet: {transcription[:100]}...")
-        print(f"First 3 segments: {segments[:3]}...")
-    except Exception as e:
-        print(f"Error in transcription: {e}")
-        traceback.print_exc()
-        return "Error transcribing audio.", None, None, None, None
+def on_search(query):
+    """
+    Searches every processed lecture.
+    Args:
+        query (str): Words to look for; quoted phrases must match exactly.
+    Returns:
+        str: HTML results with clickable timestamps.
+    """
+    if not query or not query.strip():
+        return "<p>Type a word or a \"quoted phrase\" to search every processed lecture.</p>"
+    started = time.perf_counter()
+    results = search_index.search(query)
+    elapsed = (time.perf_counter() - started) * 1000
+    return (f"<p>{len(results)} result(s) in {elapsed:.1f} ms.</p>"
+            + format_search_results(results, query))
 
-    # Generate summary
-    try:
-        summary = summarize_text(transcription, segments)
-        print(f"Summary generated snippet: {summary[:100]}...")
-    except Exception as e:
-        print(f"Error in summarizing text: {e}")
-        traceback.print_exc()
-        summary = None
 
-    # Generate quizzes
-    try:
-        quizzes_str = generate_quiz(transcription)
-        print(f"Quiz generated snippet: {quizzes_str[:100]}...")
-        match = re.search(r"quizzes\s*=\s*(\[.*\])", quizzes_str, flags=re.DOTALL)
-        if match:
-            quizzes_json_str = match.group(1)
-            quizzes = json.loads(quizzes_json_str)
-        else:
-            quizzes = []
-    except Exception as e:
-        print(f"Error parsing quizzes: {e}")
-        traceback.print_exc()
-        quizzes = None
+def hidden_outputs(message):
+    """
+    Builds the interface outputs shown when there is nothing to display.
+    Args:
+        message (str): Message shown in the Summary/Notes tab.
+    Returns:
+        tuple: Outputs for the Gradio interface with every quiz component hidden.
+    """
+    return (gr.update(), "", message, "", "", "",
+            *([gr.update(visible=False)]*MAX_QUESTIONS),
+            gr.update(visible=False),
+            gr.update(visible=False),
+            [])
 
-    # Generate flashcards
-    try:
-        flashcards = generate_flashcards(transcription)
-    except Exception as e:
-        print(f"Error in generating flashcards: {e}")
-        traceback.print_exc()
-        flashcards = None
 
-    return video_path, summary, segments, quizzes, flashcards
+def quiz_outputs(quizzes):
+    """
+    Builds the quiz tab outputs for a list of generated questions.
+    Args:
+        quizzes (list or None): Quiz questions, each a dict with 'question', 'options' and 'answer'.
+    Returns:
+        tuple: (quiz HTML, radio button updates, submit button update, feedback update).
+    """
+    if quizzes and isinstance(quizzes, list) and len(quizzes) > 0:
+        # If quizzes are available, format them for display
+        quiz_html = "<p>Select your answers and click Submit Quiz.</p>"
+        quiz_count = min(len(quizzes), MAX_QUESTIONS) # Limit quizzes to MAX_QUESTIONS
+        radios_updates = []
+        for i in range(MAX_QUESTIONS):
+            if i < quiz_count:
+                q = quizzes[i]
+                 # Update each radio button with the quiz question and options
+                radios_updates.append(gr.update(label=f"Q{i+1}: {q['question']}", choices=q["options"], visible=True))
+            else:
+                # Hide unused radio buttons
+                radios_updates.append(gr.update(visible=False))
+        submit_upd = gr.update(visible=True) # Show the submit quiz button
+        feedback_upd = gr.update(visible=True, value="") # Show the quiz feedback area
+    else:
+        # If no quizzes are available, hide quiz-related components
+        quiz_html = "<p>No quizzes generated.</p>"
+        radios_updates = [gr.update(visible=False) for _ in range(MAX_QUESTIONS)]
+        submit_upd = gr.update(visible=False) # Hide submit quiz button
+        feedback_upd = gr.update(visible=False) # Hide the quiz feedback area
+    return quiz_html, radios_updates, submit_upd, feedback_upd
 
 
 def on_transcribe(video_file):
     """
     Handles the transcription and analysis process when a video is uploaded.
+    This is a generator: the transcript is shown while Whisper produces it, and each tab
+    is filled in as soon as its artifact is ready (the summary and flashcards stream in).
     Args:
         video_file: Uploaded video file.
-    Returns:
-        Outputs for the Gradio interface (summary, quizzes, flashcards, etc.).
+    Yields:
+        Outputs for the Gradio interface (transcript, summary, quizzes, flashcards, etc.).
     """
     # Step 1: Validate the uploaded video file
     if video_file is None:
-        # If no file is provided, return placeholder values and hide all outputs
-        return (gr.update(), "Please upload a video file.", "", "", "",
-                *([gr.update(visible=False)]*MAX_QUESTIONS),
-                gr.update(visible=False),
-                gr.update(visible=False),
-                [])
+        # If no file is provided, show placeholder values and hide all outputs
+        yield hidden_outputs("Please upload a video file.")
+        return
 
     # Determine the file path of the uploaded video
     if isinstance(video_file, dict) and "name" in video_file:
@@ -193,63 +169,151 @@ def on_transcribe(video_file):
 
     # Ensure the file path is valid
     if not video_file_path or not os.path.isfile(video_file_path):
-        # If the file path is invalid, return placeholder values and hide all outputs
-        return (gr.update(), "Please upload a video file.", "", "", "",
-                *([gr.update(visible=False)]*MAX_QUESTIONS),
-                gr.update(visible=False),
-                gr.update(visible=False),
-                [])
-
-    # Step 2: Process the video file to generate outputs
+        # If the file path is invalid, show placeholder values and hide all outputs
+        yield hidden_outputs("Please upload a video file.")
+        return
+
+    # Current value of every output; gr.update() leaves a component untouched
+    transcript_md = "*Transcribing...*"
+    summary = "*Waiting for the transcript...*"
+    timestamps_html = gr.update()
+    flashcards_markdown = gr.update()
+    quiz_html, submit_upd, feedback_upd = gr.update(), gr.update(), gr.update()
+    radios_updates = [gr.update()] * MAX_QUESTIONS
+    quizzes = []
+    draft_note = ""
+    segments = None
+
+    def current_outputs(video=gr.update()):
+        return (video, transcript_md, summary, timestamps_html, quiz_html, flashcards_markdown,
+                *radios_updates, submit_upd, feedback_upd, quizzes)
+
+    yield current_outputs()
+
+    # Step 2: Process the video file, updating the interface after every event
+    video_path = video_file_path
     try:
-        video_path, summary, segments, quizzes, flashcards = process_video(video_file_path)
+        for kind, stage, value in process_video_stream(video_file_path):
+            if kind == "error":
+                yield hidden_outputs(value)
+                return
+
+            if stage == "video":
+                video_path = value
+                continue
+            if stage == "tier":
+                # TIER_UPGRADE: say that a better transcript is on its way; a later tier event without an
+                # upgrade (already pending for another upload, failed or finished) clears the note again
+                draft_note = (f"*Draft transcript: a more accurate '{value['upgrade']}' transcript is being prepared "
+                              f"in the background and is used the next time this lecture is opened.*\n\n"
+                              if value["upgrade"] else "")
+                if segments is None:
+                    continue
+                transcript_md = draft_note + format_transcript_markdown(segments)
+            elif stage == "queue":
+                # Server mode: every transcription worker is busy, show where this lecture stands
+                transcript_md = f"*Waiting for a transcription worker (position {value} in the queue)...*"
+            elif stage == "transcript":
+                segments = value
+                transcript_md = draft_note + format_transcript_markdown(value)
+                if kind == "done":
+                    if summary == "*Waiting for the transcript...*":
+                        summary = "*Generating summary...*"
+                    # Make the lecture searchable as soon as its transcript is final (again after an upgrade)
+                    index_lecture(video_path, value)
+            elif stage == "summary":
+                # Partial summaries are the text streamed so far
+                summary = value
+            elif stage == "timestamps" and kind == "done":
+                timestamps_html = value or ""
+            elif stage == "quizzes":
+                # Partial quizzes hold the questions validated so far; answers can be picked right away
+                quizzes = value if value else []
+                quiz_html, radios_updates, submit_upd, feedback_upd = quiz_outputs(value)
+                if kind == "partial":
+                    quiz_html = "<p>Generating more questions...</p>"
+                    submit_upd = gr.update(visible=False)
+            elif stage == "flashcards":
+                if value and isinstance(value, str) and value.strip():
+                    # Format the flashcards parsed so far in Markdown
+                    flashcards_markdown = format_flashcards_markdown(value)
+                elif kind == "done":
+                    # If no flashcards are available, provide a default message
+                    flashcards_markdown = "No flashcards generated."
+            else:
+                continue
+            yield current_outputs()
     except Exception as e:
         # Handle errors that occur during video processing
-        print("Error during process_video call:")
+        print("Error during process_video_stream call:")
         traceback.print_exc()
-        return (gr.update(), f"Error processing video: {e}", "", "", "",
-                *([gr.update(visible=False)]*MAX_QUESTIONS),
-                gr.update(visible=False),
-                gr.update(visible=False),
-                [])
+        yield hidden_outputs(f"Error processing video: {e}")
+        return
 
-    # Step 3: Generate conceptual timestamps from the summary and segments
-    timestamps_html = generate_conceptual_timestamps(summary, segments) if segments else ""
+    # Step 3: All stages are done
+    yield current_outputs(video=video_file)
 
-    # Step 4: Handle quizzes
-    if quizzes and isinstance(quizzes, list) and len(quizzes) > 0:
-        # If quizzes are available, format them for display
-        quiz_html = "<p>Select your answers and click Submit Quiz.</p>"
-        quiz_count = min(len(quizzes), MAX_QUESTIONS) # Limit quizzes to MAX_QUESTIONS
-        radios_updates = []
-        for i in range(MAX_QUESTIONS):
-            if i < quiz_count:
-                q = quizzes[i]
-                 # Update each radio button with the quiz question and options
-                radios_updates.append(gr.update(label=f"Q{i+1}: {q['question']}", choices=q["options"], visible=True))
-            else:
-                # Hide unused radio buttons
-                radios_updates.append(gr.update(visible=False))
-        submit_upd = gr.update(visible=True) # Show the submit quiz button
-        feedback_upd = gr.update(visible=True, value="") # Show the quiz feedback area
-    else:
-        # If no quizzes are available, hide quiz-related components
-        quiz_html = "<p>No quizzes generated.</p>"
-        radios_updates = [gr.update(visible=False) for _ in range(MAX_QUESTIONS)]
-        submit_upd = gr.update(visible=False) # Hide submit quiz button
-        feedback_upd = gr.update(visible=False) # Hide the quiz feedback area
 
-    # Step 5: Handle flashcards
-    if flashcards and isinstance(flashcards, str) and flashcards.strip():
-        # If flashcards are available, format them in Markdown
-        flashcards_markdown = format_flashcards_markdown(flashcards)
-    else:
-        # If no flashcards are available, provide a default message
-        flashcards_markdown = "No flashcards generated."
+def on_live_start(stream_url, session):
+    """
+    Starts a live lecture and keeps the Transcript, Summary/Notes and Timestamps tabs up to date.
+    Audio comes from the stream URL when one is given, otherwise from the microphone.
+    Args:
+        stream_url (str): RTSP/HTTP stream of the lecture (empty to use the microphone).
+        session (LiveSession or None): The previous live session of this browser tab, if any.
+    Yields:
+        tuple: (session, transcript Markdown, summary Markdown, timestamps HTML).
+    """
+    if session is not None:
+        session.stop()
+    name = time.strftime("live-%Y%m%d-%H%M%S")
+    session = LiveSession(name, store_path=os.path.join(TEXT_DIR, name + SEGMENT_STORE_EXTENSION))
+    if stream_url and stream_url.strip():
+        session.start_source(stream_url.strip())
+    transcript_md = "*Listening...*"
+    summary = "*The notes are updated every few minutes during the lecture.*"
+    timestamps_html = ""
+    yield session, transcript_md, summary, timestamps_html
+
+    try:
+        for kind, stage, value in session.events():
+            if stage == "transcript":
+                transcript_md = format_transcript_markdown(value) or transcript_md
+                if kind == "done":
+                    summary = "*Writing the final summary...*"
+                    # Make the lecture searchable like an uploaded one
+                    index_lecture(None, value, lecture=name)
+            elif stage == "summary":
+                summary = value or summary
+            elif stage == "timestamps":
+                timestamps_html = value or timestamps_html
+            yield session, transcript_md, summary, timestamps_html
+    except Exception as e:
+        print("Error during live session:")
+        traceback.print_exc()
+        yield session, transcript_md, f"Error during live transcription: {e}", timestamps_html
+
+
+def on_live_audio(chunk, session):
+    """
+    Hands a microphone chunk to the running live session.
+    Args:
+        chunk (tuple or None): (sample rate, samples) streamed by the microphone component.
+        session (LiveSession or None): The live session of this browser tab.
+    """
+    if session is not None and chunk is not None:
+        sample_rate, samples = chunk
+        session.push(samples, sample_rate)
 
-    # Step 6: Return all outputs to the Gradio interface
-    return (video_file, summary, timestamps_html, quiz_html, flashcards_markdown,
-            *radios_updates, submit_upd, feedback_upd, quizzes if quizzes else [])
+
+def on_live_stop(session):
+    """
+    Ends the live session; the remaining audio is transcribed and the final summary written.
+    Args:
+        session (LiveSession or None): The live session of this browser tab.
+    """
+    if session is not None:
+        session.stop()
 
 
 def main():
@@ -271,6 +335,13 @@ def main():
                 video_input = gr.Video(label="Upload Lecture Video", elem_id="main_video_player")
                 # Button to trigger transcription and processing
                 transcribe_button = gr.Button("Transcribe Now")
+            with gr.Column(scale=1):
+                # Live lectures: a stream URL, or the microphone when it is left empty
+                live_url = gr.Textbox(label="Live lecture stream (optional)", placeholder="rtsp://...")
+                live_microphone = gr.Audio(sources=["microphone"], streaming=True, label="Live lecture microphone")
+                with gr.Row():
+                    live_start_button = gr.Button("Start Live Lecture")
+                    live_stop_button = gr.Button("End Live Lecture")
 
         # Output section with tabs for different functionalities
         with gr.Tabs():
@@ -297,16 +368,32 @@ def main():
             with gr.Tab("Flashcards"):
                 # Use Markdown to display interactive flashcards
                 flashcards_output = gr.Markdown(label="Flashcards")
+            # Tab for displaying the transcript as it is produced
+            with gr.Tab("Transcript"):
+                transcript_output = gr.Markdown(label="Transcript")
+            # Tab for searching the transcripts of every processed lecture
+            with gr.Tab("Search"):
+                with gr.Row():
+                    search_input = gr.Textbox(label="Search all lectures", placeholder='e.g. "complete the square"',
+                                              scale=4)
+                    search_button = gr.Button("Search", scale=1)
+                search_output = gr.HTML()
 
         # State variable to hold quiz data across interactions
         quizzes_state = gr.State()
+        # State variable holding the live session of this browser tab
+        live_state = gr.State()
 
         # Define interaction: Connect the Transcribe button to the on_transcribe function
         transcribe_button.click(
             on_transcribe, # Function to call when button is clicked
             inputs=[video_input],
-            outputs=[video_input, summary_output, timestamps_output, quiz_output, flashcards_output] +
-                    quiz_radios + [submit_quiz_button, quiz_feedback, quizzes_state]
+            outputs=[video_input, transcript_output, summary_output, timestamps_output, quiz_output,
+                     flashcards_output] +
+                    quiz_radios + [submit_quiz_button, quiz_feedback, quizzes_state],
+            # In server mode the transcription pool does admission control, so let every upload
+            # it could accept (plus one, to be told the server is busy) reach it
+            concurrency_limit=(SERVER_WORKERS + SERVER_QUEUE_SIZE + 1) if transcription_pool is not None else "default",
         )
 
         # Define interaction: Connect the Submit Quiz button to the grade_quizzes function
@@ -316,9 +403,32 @@ def main():
             outputs=quiz_feedback
         )
 
+        # Define interaction: live lectures fill the Transcript, Summary/Notes and Timestamps tabs as they go
+        live_start_button.click(on_live_start, inputs=[live_url, live_state],
+                                outputs=[live_state, transcript_output, summary_output, timestamps_output])
+        live_microphone.stream(on_live_audio, inputs=[live_microphone, live_state], outputs=None)
+        live_stop_button.click(on_live_stop, inputs=[live_state], outputs=None)
+
+        # Define interaction: search on button click or Enter
+        search_button.click(on_search, inputs=[search_input], outputs=search_output)
+        search_input.submit(on_search, inputs=[search_input], outputs=search_output)
+
         # Preload and set up the interface
         demo.load()
 
+    if transcription_pool is not None:
+        # Server mode: start the transcription worker processes, each loading its own model
+        transcription_pool.start(tier_transcriber(DEFAULT_TIER, load=False).settings())
+    else:
+        # Load the transcription model in the background so the interface comes up immediately
+        warm_up_tier(DEFAULT_TIER)
+
+    # Export metrics (Prometheus text file and/or /metrics endpoint) in the background
+    start_exporters()
+
+    # Catch the search index up with lectures processed while the app was not running
+    threading.Thread(target=sync_search_index, name="search-sync", daemon=True).start()
+
     print("Launching Gradio interface...")
 
     # Launch the Gradio application with restricted file access paths
@@ -0,0 +1,311 @@
+# src/batch.py
+"""
+Headless batch processing of a whole lecture library.
+
+Runs the full process_video pipeline over every video in the given directories,
+files or manifests on a bounded pool of worker processes. Progress is checkpointed
+per video and per stage, so a crashed or interrupted run picks up where it stopped:
+finished lectures are skipped and, thanks to the artifact cache, unfinished ones
+resume after their last completed stage.
+
+With --rebuild, lectures are selected by the artifact cache instead of the checkpoints:
+after a prompt, model or setting change, only lectures with stale stages are processed
+again, and only their stale stages (and whatever those read from) are recomputed.
+
+Usage:
+    python src/batch.py data/video --workers 2
+    python src/batch.py lectures.txt --checkpoint-dir data/batch/fall-semester
+    python src/batch.py data/video --restart
+    python src/batch.py data/video --rebuild [--dry-run]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Video extensions picked up when scanning a directory
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".webm", ".m4v")
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CHECKPOINT_DIR = os.path.join(ROOT_DIR, 'data', 'batch')
+
+
+def collect_videos(inputs):
+    """
+    Expands the command-line inputs into a list of video files.
+    Args:
+        inputs (list of str): Directories (scanned recursively), video files, or manifests
+            (.txt with one path per line, or .json with a list of paths).
+    Returns:
+        list of str: Absolute paths of the videos, without duplicates, in a stable order.
+    """
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _, filenames in os.walk(item):
+                videos.extend(os.path.join(dirpath, f) for f in sorted(filenames)
+                              if f.lower().endswith(VIDEO_EXTENSIONS))
+        elif item.endswith(".json"):
+            with open(item, 'r', encoding='utf-8') as f:
+                base = os.path.dirname(os.path.abspath(item))
+                videos.extend(os.path.join(base, path) for path in json.load(f))
+        elif item.endswith(".txt"):
+            with open(item, 'r', encoding='utf-8') as f:
+                base = os.path.dirname(os.path.abspath(item))
+                videos.extend(os.path.join(base, line.strip()) for line in f
+                              if line.strip() and not line.startswith("#"))
+        else:
+            videos.append(item)
+
+    seen = set()
+    unique = []
+    for video in (os.path.abspath(v) for v in videos):
+        if video not in seen:
+            seen.add(video)
+            unique.append(video)
+    return unique
+
+
+def job_name(video_path):
+    """
+    Builds a unique, filesystem-safe name for a video's checkpoint and outputs.
+    Args:
+        video_path (str): Absolute path of the video.
+    Returns:
+        str: The video's file name plus a short hash of its path.
+    """
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(video_path.encode("utf-8")).hexdigest()[:8]
+    return f"{stem}-{digest}"
+
+
+def load_checkpoint(checkpoint_dir, name):
+    """
+    Reads the checkpoint of one video.
+    Args:
+        checkpoint_dir (str): Directory of the batch run.
+        name (str): Job name of the video.
+    Returns:
+        dict or None: The checkpoint, or None if the video was never started.
+    """
+    try:
+        with open(os.path.join(checkpoint_dir, "checkpoints", name + ".json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(checkpoint_dir, name, checkpoint):
+    """
+    Atomically writes the checkpoint of one video (each worker only writes its own files).
+    Args:
+        checkpoint_dir (str): Directory of the batch run.
+        name (str): Job name of the video.
+        checkpoint (dict): Progress of the video.
+    """
+    directory = os.path.join(checkpoint_dir, "checkpoints")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + ".json")
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def save_outputs(output_dir, outputs):
+    """
+    Writes the generated study materials of a lecture to its output directory.
+    Args:
+        output_dir (str): Directory for this lecture's outputs.
+        outputs (dict): Final value of every pipeline stage.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = {
+        "segments.json": json.dumps(outputs.get("transcript"), default=float),
+        "summary.md": outputs.get("summary"),
+        "quizzes.json": json.dumps(outputs.get("quizzes"), indent=2),
+        "flashcards.txt": outputs.get("flashcards"),
+        "timestamps.html": outputs.get("timestamps"),
+    }
+    for filename, content in files.items():
+        if content:
+            with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+                f.write(content)
+
+
+def _init_worker(threads, workers):
+    """
+    Pins the CPU threads of a worker process before any model is loaded, sets up its LLM
+    requests as low-priority batch work with an equal share of the rate limits, and turns
+    off draft transcripts.
+    Args:
+        threads (int): Threads this worker may use.
+        workers (int): Number of worker processes sharing the API key.
+    """
+    os.environ["WHISPER_THREADS"] = str(threads)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["LLM_PRIORITY"] = "batch"
+    os.environ["LLM_RATE_SHARE"] = str(float(os.getenv("LLM_RATE_SHARE", "1")) / workers)
+    # Nobody is waiting on a batch run, so transcribe with the final tier instead of a draft first
+    os.environ["TIER_UPGRADE"] = "0"
+
+
+def process_one(video_path, checkpoint_dir):
+    """
+    Runs the pipeline on one video inside a worker process, checkpointing every finished stage.
+    Args:
+        video_path (str): Absolute path of the video.
+        checkpoint_dir (str): Directory of the batch run.
+    Returns:
+        dict: The final checkpoint of the video.
+    """
+    # Imported here so each worker loads the pipeline (and its model) with its own thread settings
+    from core.pipeline import process_video_stream
+
+    name = job_name(video_path)
+    checkpoint = load_checkpoint(checkpoint_dir, name) or {"video": video_path, "stages": {}, "attempts": 0}
+    checkpoint.update(status="running", attempts=checkpoint["attempts"] + 1, error=None)
+    save_checkpoint(checkpoint_dir, name, checkpoint)
+
+    started = time.time()
+    outputs = {}
+    try:
+        for kind, stage, value in process_video_stream(video_path):
+            if kind == "error":
+                checkpoint.update(status="failed", error=value)
+                break
+            if kind == "done":
+                outputs[stage] = value
+                checkpoint["stages"][stage] = "done" if value is not None else "failed"
+                save_checkpoint(checkpoint_dir, name, checkpoint)
+        else:
+            save_outputs(os.path.join(checkpoint_dir, "outputs", name), outputs)
+            checkpoint["status"] = "done"
+    except Exception as e:
+        checkpoint.update(status="failed", error=str(e))
+
+    checkpoint["elapsed"] = time.time() - started
+    save_checkpoint(checkpoint_dir, name, checkpoint)
+    return checkpoint
+
+
+def stale_videos(videos):
+    """
+    Finds the videos with stale or missing stage outputs in the artifact cache.
+    Args:
+        videos (list of str): Absolute paths of the videos.
+    Returns:
+        dict or None: Mapping of video path to its stale stages (up-to-date videos are left out),
+            or None when the artifact cache is disabled.
+    """
+    from core.pipeline import rebuild_plan
+
+    stale = {}
+    for video in videos:
+        plan = rebuild_plan(video)
+        if plan is None:
+            return None
+        if plan:
+            stale[video] = plan
+    return stale
+
+
+def run_batch(videos, checkpoint_dir, workers, restart=False, rebuild=None):
+    """
+    Processes videos on a bounded pool of worker processes, skipping finished ones.
+    Args:
+        videos (list of str): Absolute paths of the videos.
+        checkpoint_dir (str): Directory holding checkpoints and outputs of the run.
+        workers (int): Number of worker processes.
+        restart (bool): Ignore existing checkpoints and process every video again.
+        rebuild (dict, optional): Stale stages of every video to rebuild (see stale_videos);
+            when given, these videos are processed whatever their checkpoints say.
+    Returns:
+        dict: Counts of done, failed and skipped lectures plus the throughput.
+    """
+    pending = []
+    skipped = 0
+    for video in videos:
+        if rebuild is not None:
+            up_to_date = video not in rebuild
+        else:
+            checkpoint = None if restart else load_checkpoint(checkpoint_dir, job_name(video))
+            up_to_date = checkpoint and checkpoint.get("status") == "done"
+        if up_to_date:
+            skipped += 1
+        else:
+            pending.append(video)
+    print(f"{len(videos)} lecture(s): {skipped} {'up to date' if rebuild is not None else 'already done'}, "
+          f"{len(pending)} to process on {workers} worker(s).")
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    done = failed = 0
+    started = time.time()
+    # "spawn" gives every worker a clean interpreter (torch does not like being forked)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads, workers)) as executor:
+        futures = {executor.submit(process_one, video, checkpoint_dir): video for video in pending}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                checkpoint = future.result()
+            except Exception as e:
+                checkpoint = {"status": "failed", "error": str(e), "elapsed": 0.0}
+            if checkpoint["status"] == "done":
+                done += 1
+            else:
+                failed += 1
+            hours = (time.time() - started) / 3600
+            rate = done / hours if hours > 0 else 0.0
+            print(f"[{done + failed}/{len(pending)}] {checkpoint['status']}: {os.path.basename(video)} "
+                  f"in {checkpoint.get('elapsed', 0.0):.0f}s ({rate:.1f} lectures/hour)"
+                  + (f" - {checkpoint['error']}" if checkpoint.get("error") else ""))
+
+    hours = (time.time() - started) / 3600
+    throughput = done / hours if hours > 0 else 0.0
+    print(f"Finished: {done} done, {failed} failed, {skipped} skipped in {hours * 60:.1f} min "
+          f"({throughput:.1f} lectures/hour).")
+    return {"done": done, "failed": failed, "skipped": skipped, "lectures_per_hour": throughput}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process a whole lecture library without the UI.")
+    parser.add_argument("inputs", nargs="+", help="Video directories, video files, or .txt/.json manifests.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of lectures processed at the same time.")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR,
+                        help="Where checkpoints and generated outputs are stored.")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and reprocess every lecture.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recompute only the stages made stale by prompt, model or setting changes.")
+    parser.add_argument("--dry-run", action="store_true", help="With --rebuild, only list the stale stages.")
+    args = parser.parse_args(argv)
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("No videos found.")
+        return 1
+
+    rebuild = None
+    if args.rebuild:
+        rebuild = stale_videos(videos)
+        if rebuild is None:
+            print("The artifact cache is disabled (CACHE_ENABLED=0), so stale stages cannot be detected.")
+            return 1
+        for video, stages in rebuild.items():
+            print(f"{os.path.basename(video)}: {', '.join(stages)}")
+        if args.dry_run:
+            print(f"{len(rebuild)} of {len(videos)} lecture(s) have stale stages.")
+            return 0
+
+    checkpoint_dir = os.path.abspath(args.checkpoint_dir)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    summary = run_batch(videos, checkpoint_dir, max(1, args.workers), restart=args.restart, rebuild=rebuild)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
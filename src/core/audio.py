@@ -0,0 +1,128 @@
+# src/core/audio.py
+import os
+import wave
+import errno
+import shutil
+import ffmpeg
+import numpy as np
+
+# Whisper expects 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Bytes read from the ffmpeg pipe at a time (about 32 seconds of 16-bit mono audio)
+PIPE_READ_SIZE = 1024 * 1024
+
+
+def probe_duration(media_file_path):
+    """
+    Reads the duration of a media file with ffprobe.
+    Args:
+        media_file_path (str): Path to the audio or video file.
+    Returns:
+        float or None: Duration in seconds, or None if it cannot be determined.
+    """
+    try:
+        return float(ffmpeg.probe(media_file_path)["format"]["duration"])
+    except Exception:
+        return None
+
+
+def stream_audio(media_file_path, sample_rate=SAMPLE_RATE):
+    """
+    Decodes the audio track of a media file straight into memory, without an intermediate WAV.
+    ffmpeg writes 16-bit PCM to a pipe, which is converted block by block into a
+    preallocated float32 buffer (sized from the probed duration) in Whisper's [-1, 1] range.
+    Args:
+        media_file_path (str): Path to the audio or video file.
+        sample_rate (int): Output sample rate in Hz.
+    Returns:
+        np.ndarray: Mono float32 samples.
+    """
+    duration = probe_duration(media_file_path)
+    capacity = int((duration or 60.0) * sample_rate) + sample_rate
+    samples = np.empty(capacity, dtype=np.float32)
+    filled = 0
+
+    process = (
+        ffmpeg
+        .input(media_file_path)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate)
+        # Only errors go to stderr, so that pipe can never fill up and stall the decoder
+        .global_args('-loglevel', 'error', '-nostats')
+        .run_async(pipe_stdout=True, pipe_stderr=True, quiet=True)
+    )
+    try:
+        leftover = b""
+        while True:
+            block = process.stdout.read(PIPE_READ_SIZE)
+            if not block:
+                break
+            block = leftover + block
+            # Keep an odd trailing byte for the next read so samples are never split
+            usable = len(block) - (len(block) % 2)
+            leftover = block[usable:]
+            chunk = np.frombuffer(block[:usable], dtype=np.int16)
+            if filled + len(chunk) > len(samples):
+                # The probed duration was short (or missing); grow the buffer geometrically
+                samples = np.resize(samples, max(len(samples) * 2, filled + len(chunk)))
+            samples[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        stderr = process.stderr.read()
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+        return_code = process.wait()
+
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {stderr.decode('utf-8', errors='ignore')[-500:]}")
+
+    samples = samples[:filled]
+    samples /= 32768.0
+    return samples
+
+
+def save_wav(samples, audio_file_path, sample_rate=SAMPLE_RATE):
+    """
+    Persists float32 samples as a 16-bit PCM WAV file.
+    Args:
+        samples (np.ndarray): Mono float32 samples in [-1, 1].
+        audio_file_path (str): Path of the WAV file to write.
+        sample_rate (int): Sample rate in Hz.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(audio_file_path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def store_video(video_file_path, destination_path, mode="link"):
+    """
+    Stores an uploaded video in the data directory without duplicating its bytes when possible.
+    Args:
+        video_file_path (str): Path to the uploaded video.
+        destination_path (str): Where the video should live under data/video.
+        mode (str): "link" hardlinks the upload and falls back to referencing it in place
+            when a hardlink is impossible (e.g. across filesystems); "copy" always copies.
+    Returns:
+        str: Path of the stored (or referenced) video.
+    """
+    if os.path.abspath(video_file_path) == os.path.abspath(destination_path):
+        return destination_path
+    if mode == "copy":
+        shutil.copy(video_file_path, destination_path)
+        return destination_path
+
+    if os.path.exists(destination_path):
+        if os.path.samefile(video_file_path, destination_path):
+            return destination_path
+        os.remove(destination_path)
+    try:
+        os.link(video_file_path, destination_path)
+        return destination_path
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP):
+            raise
+        print(f"Cannot hardlink video ({e.strerror}), referencing the upload in place.")
+        return video_file_path
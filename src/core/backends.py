@@ -0,0 +1,201 @@
+# src/core/backends.py
+import os
+import sys
+import time
+
+from core.audio import SAMPLE_RATE, stream_audio
+from core.config import (TRANSCRIBE_BACKEND, WHISPER_MODEL, WHISPER_COMPUTE_TYPE,
+                         WHISPER_BEAM_SIZE, WHISPER_THREADS)
+
+# Keys of a Whisper segment dict; every backend returns segments with exactly these keys
+SEGMENT_KEYS = ("id", "seek", "start", "end", "text", "tokens", "temperature",
+                "avg_logprob", "compression_ratio", "no_speech_prob")
+
+
+class TranscriptionBackend:
+    """
+    Interface of a speech-to-text engine. Subclasses load their model lazily and
+    return results shaped like openai-whisper's: {"text", "segments", "language"}.
+    """
+
+    name = None
+
+    # Whether transcribe() reports segments while decoding (otherwise the pipeline streams by windows)
+    streams_segments = False
+
+    def __init__(self, model_size="base", compute_type="int8", beam_size=5, threads=0):
+        """
+        Args:
+            model_size (str): Model size or name (e.g. "base", "small", "medium").
+            compute_type (str): Numeric precision (e.g. "int8", "float16", "float32").
+            beam_size (int): Beam width used for decoding (1 for greedy).
+            threads (int): CPU threads used by the engine (0 lets the engine decide).
+        """
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.threads = threads
+        self.model = None
+
+    def settings(self):
+        """
+        Returns:
+            dict: Everything that influences the transcription output, used to recreate the backend
+                (and to key cached transcripts). The thread count is left out since it only affects speed.
+        """
+        return {"backend": self.name, "model_size": self.model_size, "compute_type": self.compute_type,
+                "beam_size": self.beam_size}
+
+    def load(self):
+        """Loads the model if it is not loaded yet."""
+        raise NotImplementedError
+
+    def transcribe(self, audio, on_segments=None, **options):
+        """
+        Transcribes audio.
+        Args:
+            audio (str or np.ndarray): Path to an audio file, or 16 kHz mono float32 samples.
+            on_segments (callable, optional): Called with the segments decoded so far, when the
+                engine supports it (see streams_segments).
+            **options: Engine-specific decoding options (e.g. language).
+        Returns:
+            dict: {"text": str, "segments": list of dict, "language": str}.
+        """
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper running on PyTorch."""
+
+    name = "whisper"
+
+    def load(self):
+        if self.model is None:
+            import torch
+            import whisper
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            self.model = whisper.load_model(self.model_size)
+        return self.model
+
+    def transcribe(self, audio, on_segments=None, **options):
+        model = self.load()
+        # Whisper only distinguishes half precision from full precision
+        options.setdefault("fp16", self.compute_type == "float16")
+        if self.beam_size and self.beam_size > 1:
+            options.setdefault("beam_size", self.beam_size)
+        result = model.transcribe(audio, **options)
+        return {"text": result["text"], "segments": result["segments"], "language": result.get("language")}
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """faster-whisper running on CTranslate2 (int8 on CPU is several times faster than PyTorch)."""
+
+    name = "faster-whisper"
+    streams_segments = True
+
+    def load(self):
+        if self.model is None:
+            from faster_whisper import WhisperModel
+            self.model = WhisperModel(self.model_size, device="cpu", compute_type=self.compute_type,
+                                      cpu_threads=self.threads)
+        return self.model
+
+    def transcribe(self, audio, on_segments=None, **options):
+        model = self.load()
+        options.setdefault("beam_size", self.beam_size)
+        raw_segments, info = model.transcribe(audio, **options)
+        # faster-whisper yields Segment objects lazily; convert them to Whisper's dict shape
+        segments = []
+        for segment in raw_segments:
+            segments.append(segment_to_dict(segment))
+            if on_segments:
+                on_segments(list(segments))
+        text = "".join(segment["text"] for segment in segments)
+        return {"text": text, "segments": segments, "language": info.language}
+
+
+def segment_to_dict(segment):
+    """
+    Converts a faster-whisper Segment into an openai-whisper style segment dict.
+    Args:
+        segment: faster-whisper Segment.
+    Returns:
+        dict: Segment with the keys in SEGMENT_KEYS.
+    """
+    return {key: getattr(segment, key, None) for key in SEGMENT_KEYS}
+
+
+# Registry of available backends, selected by name through TRANSCRIBE_BACKEND
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(name=None, **settings):
+    """
+    Creates a transcription backend from the configuration.
+    Args:
+        name (str, optional): Backend name (defaults to TRANSCRIBE_BACKEND).
+        **settings: Overrides for model_size, compute_type, beam_size and threads.
+    Returns:
+        TranscriptionBackend: The (not yet loaded) backend.
+    """
+    name = name or TRANSCRIBE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    defaults = {"model_size": WHISPER_MODEL, "compute_type": WHISPER_COMPUTE_TYPE,
+                "beam_size": WHISPER_BEAM_SIZE, "threads": WHISPER_THREADS}
+    defaults.update({key: value for key, value in settings.items() if value is not None})
+    return BACKENDS[name](**defaults)
+
+
+def compare_backends(audio_dir, backend_names=None):
+    """
+    Transcribes every audio file in a directory with each backend and reports the real-time factor.
+    The real-time factor is transcription time divided by audio duration (below 1 is faster than real time).
+    Args:
+        audio_dir (str): Directory with .wav/.mp3 sample files.
+        backend_names (list of str, optional): Backends to compare (defaults to all).
+    Returns:
+        list of dict: One row per (backend, file) with the timing results.
+    """
+    files = sorted(f for f in os.listdir(audio_dir) if f.endswith((".wav", ".mp3")))
+    rows = []
+    for name in backend_names or list(BACKENDS):
+        backend = create_backend(name)
+        load_start = time.perf_counter()
+        backend.load()
+        load_seconds = time.perf_counter() - load_start
+        print(f"[{name}] model '{backend.model_size}' loaded in {load_seconds:.2f}s")
+        for filename in files:
+            try:
+                samples = stream_audio(os.path.join(audio_dir, filename))
+            except Exception as e:
+                print(f"[{name}] skipping {filename}: {e}")
+                continue
+            duration = len(samples) / SAMPLE_RATE
+            start = time.perf_counter()
+            result = backend.transcribe(samples)
+            elapsed = time.perf_counter() - start
+            rtf = elapsed / duration if duration else float("nan")
+            rows.append({"backend": name, "file": filename, "audio_seconds": duration,
+                         "transcribe_seconds": elapsed, "rtf": rtf, "segments": len(result["segments"])})
+            print(f"[{name}] {filename}: {duration:.1f}s audio in {elapsed:.1f}s (RTF {rtf:.3f})")
+
+    # Summary table: mean real-time factor per backend
+    print("\nBackend            Files   Mean RTF")
+    for name in backend_names or list(BACKENDS):
+        backend_rows = [row for row in rows if row["backend"] == name]
+        if backend_rows:
+            mean_rtf = sum(row["rtf"] for row in backend_rows) / len(backend_rows)
+            print(f"{name:<18} {len(backend_rows):>5}   {mean_rtf:.3f}")
+    return rows
+
+
+if __name__ == "__main__":
+    # Usage (from src/): python -m core.backends [audio_dir] [backend ...]
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    audio_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(root_dir, 'data', 'audio')
+    compare_backends(audio_dir, sys.argv[2:] or None)
@@ -0,0 +1,469 @@
+# src/core/cache.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # Windows: index updates are only serialized within one process
+
+# Size of the blocks read when hashing files (1 MiB)
+HASH_BLOCK_SIZE = 1024 * 1024
+# Cache hits only update last access times in memory; they reach the index on disk with the next
+# store or removal, or with the first hit this many seconds after the last write (they only order evictions)
+ACCESS_FLUSH_SECONDS = 30
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Holds an exclusive advisory lock shared by every process using the same lock file
+    (e.g. batch workers updating one index).
+    Args:
+        lock_path (str): Path of the lock file (created if missing).
+    """
+    with open(lock_path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def file_signature(file_path):
+    """
+    Identifies the current version of a file that is only ever replaced atomically (e.g. an index).
+    Args:
+        file_path (str): Path to the file.
+    Returns:
+        tuple or None: Inode, size and modification time, or None if the file does not exist.
+    """
+    try:
+        stat = os.stat(file_path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return None
+
+
+def hash_file(file_path):
+    """
+    Computes the SHA-256 hash of a file's contents.
+    Args:
+        file_path (str): Path to the file.
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_config(*parts):
+    """
+    Computes a stable hash over a sequence of JSON-serializable values.
+    Args:
+        *parts: Values to hash (strings, numbers, dicts, lists).
+    Returns:
+        str: Hex digest identifying the combination of values.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed, size-bounded LRU cache for pipeline artifacts.
+
+    Every artifact is stored under a key derived from the hash of the input video
+    and the configuration of the stage that produced it, so changing a model,
+    a temperature or a prompt file automatically misses the cache. Artifacts
+    are plain files under `root`, tracked by a small JSON index holding their
+    size and last access time for eviction. Hits are written back lazily
+    (see ACCESS_FLUSH_SECONDS). Several processes (e.g. batch workers)
+    may share one cache: every change is merged into the index on disk under a
+    file lock, so no process overwrites the entries of another.
+    """
+
+    def __init__(self, root, max_bytes):
+        """
+        Args:
+            root (str): Directory holding the cached artifacts and the index.
+            max_bytes (int): Maximum total size of the cached artifacts in bytes.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = self.index_path + ".lock"
+        self._lock = threading.RLock()
+        # Changes not yet merged into the index on disk
+        self._changed = set()
+        self._dropped = set()
+        self._changed_files = set()
+        self._accessed = set()
+        self._last_write = time.monotonic()
+        os.makedirs(root, exist_ok=True)
+        with file_lock(self.lock_path):
+            self._signature = file_signature(self.index_path)
+            self._index = self._load_index()
+
+    # ------------------------------------------------------------------ keys
+
+    def video_key(self, video_file_path):
+        """
+        Returns the content hash of a video, reusing the last hash when the file is unchanged.
+        Args:
+            video_file_path (str): Path to the video file.
+        Returns:
+            str: Hex digest of the video bytes.
+        """
+        stat = os.stat(video_file_path)
+        fingerprint = f"{os.path.abspath(video_file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        with self._lock:
+            known = self._index["files"].get(fingerprint)
+        if known:
+            return known
+        key = hash_file(video_file_path)
+        with self._lock:
+            self._index["files"][fingerprint] = key
+            self._changed_files.add(fingerprint)
+            self._save_index()
+        return key
+
+    def stage_key(self, video_key, stage, config):
+        """
+        Builds the cache key of a stage output.
+        Args:
+            video_key (str): Content hash of the input video.
+            stage (str): Name of the stage (e.g. "audio", "transcript", "summary").
+            config (dict): Everything the stage output depends on besides the video.
+        Returns:
+            str: Cache key for the stage output.
+        """
+        return f"{video_key[:16]}-{stage}-{hash_config(stage, config)[:16]}"
+
+    # --------------------------------------------------------------- lookups
+
+    def path_for(self, key, extension):
+        """
+        Returns the on-disk location of an artifact (whether or not it exists yet).
+        Args:
+            key (str): Artifact key.
+            extension (str): File extension, including the dot.
+        Returns:
+            str: Path of the artifact file.
+        """
+        return os.path.join(self.root, key[:16], key + extension)
+
+    def get_path(self, key):
+        """
+        Looks up a cached artifact file and marks it as recently used.
+        Args:
+            key (str): Artifact key.
+        Returns:
+            str or None: Path of the cached file, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            if not entry:
+                return None
+            path = os.path.join(self.root, entry["file"])
+            if not os.path.isfile(path):
+                # The file was removed behind our back; forget about it
+                self._drop(key)
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._accessed.add(key)
+            if time.monotonic() - self._last_write >= ACCESS_FLUSH_SECONDS:
+                self._save_index()
+            return path
+
+    def contains(self, key):
+        """
+        Checks whether an artifact is cached, without marking it as used.
+        Args:
+            key (str): Artifact key.
+        Returns:
+            bool: True if the artifact is cached.
+        """
+        with self._lock:
+            entry = self._entry(key)
+            return bool(entry) and os.path.isfile(os.path.join(self.root, entry["file"]))
+
+    def get_text(self, key):
+        """
+        Reads a cached text artifact.
+        Args:
+            key (str): Artifact key.
+        Returns:
+            str or None: The cached text, or None on a miss.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def get_json(self, key):
+        """
+        Reads a cached JSON artifact.
+        Args:
+            key (str): Artifact key.
+        Returns:
+            object or None: The decoded value, or None on a miss.
+        """
+        text = self.get_text(key)
+        return json.loads(text) if text is not None else None
+
+    # ---------------------------------------------------------------- stores
+
+    def put_text(self, key, text, extension=".txt"):
+        """
+        Stores a text artifact.
+        Args:
+            key (str): Artifact key.
+            text (str): Content to store.
+            extension (str): File extension of the stored artifact.
+        Returns:
+            str: Path of the stored artifact.
+        """
+        path = self.path_for(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self._register(key, path)
+        return path
+
+    def put_json(self, key, value):
+        """
+        Stores a JSON-serializable artifact.
+        Args:
+            key (str): Artifact key.
+            value (object): Value to store.
+        Returns:
+            str: Path of the stored artifact.
+        """
+        # NumPy scalars (e.g. Whisper's float32 timings) are stored as plain numbers
+        payload = json.dumps(value, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+        return self.put_text(key, payload, extension=".json")
+
+    def put_file(self, key, file_path):
+        """
+        Stores a copy of an existing file, hardlinking it when possible to avoid a copy.
+        Args:
+            key (str): Artifact key.
+            file_path (str): File to store.
+        Returns:
+            str: Path of the stored artifact.
+        """
+        path = self.path_for(key, os.path.splitext(file_path)[1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(file_path, path)
+        except OSError:
+            shutil.copyfile(file_path, path)
+        self._register(key, path)
+        return path
+
+    def get_or_compute(self, key, compute, is_valid=lambda value: value is not None):
+        """
+        Returns a cached JSON artifact, computing and storing it on a miss.
+        Args:
+            key (str): Artifact key.
+            compute (callable): Produces the artifact when it is not cached.
+            is_valid (callable): Decides whether a computed value may be cached (errors should not be).
+        Returns:
+            object: The cached or freshly computed value.
+        """
+        cached = self.get_json(key)
+        if cached is not None:
+            print(f"Cache hit: {key}")
+            return cached
+        value = compute()
+        if is_valid(value):
+            self.put_json(key, value)
+        return value
+
+    # ------------------------------------------------------------ management
+
+    def invalidate(self, video_key=None, stage=None):
+        """
+        Removes cached artifacts. Without arguments the whole cache is cleared.
+        Args:
+            video_key (str, optional): Only remove artifacts of this video.
+            stage (str, optional): Only remove artifacts of this stage.
+        Returns:
+            int: Number of artifacts removed.
+        """
+        with self._lock:
+            self._save_index() # Pick up the artifacts other processes added
+            removed = 0
+            for key in list(self._index["entries"]):
+                entry_video, entry_stage = key.split("-")[:2]
+                if video_key and entry_video != video_key[:16]:
+                    continue
+                if stage and entry_stage != stage:
+                    continue
+                self._drop(key)
+                removed += 1
+            self._save_index()
+        print(f"Invalidated {removed} cached artifact(s).")
+        return removed
+
+    def release_links(self, file_path):
+        """
+        Drops the cached artifacts that are hardlinks of a file (put_file links rather than
+        copies), so that deleting the file elsewhere actually frees its space.
+        Args:
+            file_path (str): A file outside the cache.
+        Returns:
+            int: Number of artifacts dropped.
+        """
+        try:
+            target = os.stat(file_path)
+        except OSError:
+            return 0
+        with self._lock:
+            self._save_index() # Pick up the artifacts other processes added
+            dropped = 0
+            for key, entry in list(self._index["entries"].items()):
+                try:
+                    stat = os.stat(os.path.join(self.root, entry["file"]))
+                except OSError:
+                    continue
+                if (stat.st_ino, stat.st_dev) == (target.st_ino, target.st_dev):
+                    print(f"Dropping cached artifact linked to {os.path.basename(file_path)}: {key}")
+                    self._drop(key)
+                    dropped += 1
+            if dropped:
+                self._save_index()
+            return dropped
+
+    def total_bytes(self):
+        """
+        Returns:
+            int: Total size of the cached artifacts in bytes.
+        """
+        with self._lock:
+            return sum(entry["size"] for entry in self._index["entries"].values())
+
+    def _entry(self, key):
+        """Returns the index entry of a key, re-reading the index once if another process may have added it."""
+        entry = self._index["entries"].get(key)
+        if entry is None and file_signature(self.index_path) != self._signature:
+            self._save_index()
+            entry = self._index["entries"].get(key)
+        return entry
+
+    def _register(self, key, path):
+        """Records a stored artifact in the index and evicts old ones if over budget."""
+        with self._lock:
+            self._index["entries"][key] = {
+                "file": os.path.relpath(path, self.root),
+                "size": os.path.getsize(path),
+                "last_access": time.time(),
+            }
+            self._changed.add(key)
+            self._dropped.discard(key)
+            self._save_index(evict=True)
+
+    def _evict(self):
+        """Removes the least recently used artifacts until the cache fits in max_bytes."""
+        total = sum(entry["size"] for entry in self._index["entries"].values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(self._index["entries"].items(), key=lambda item: item[1]["last_access"])
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            print(f"Evicting cached artifact: {key}")
+            self._drop(key)
+
+    def _drop(self, key):
+        """Deletes an artifact file and its index entry."""
+        entry = self._index["entries"].pop(key, None)
+        if not entry:
+            return
+        self._dropped.add(key)
+        self._changed.discard(key)
+        self._accessed.discard(key)
+        path = os.path.join(self.root, entry["file"])
+        if os.path.exists(path):
+            os.remove(path)
+        directory = os.path.dirname(path)
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+
+    def _prune_files(self):
+        """Forgets the video hashes of videos whose last artifact was just dropped."""
+        dropped = {key[:16] for key in self._dropped} - {key[:16] for key in self._index["entries"]}
+        for fingerprint, video_key in list(self._index["files"].items()):
+            if video_key[:16] in dropped:
+                del self._index["files"][fingerprint]
+                self._changed_files.discard(fingerprint)
+
+    def _load_index(self):
+        """Loads the index from disk, starting fresh if it is missing or corrupt."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            index.setdefault("entries", {})
+            index.setdefault("files", {})
+            return index
+        except (OSError, ValueError):
+            return {"entries": {}, "files": {}}
+
+    def _save_index(self, evict=False):
+        """
+        Merges this process's pending changes into the index on disk and adopts the result.
+        Under the file lock, the index is re-read if another process replaced it since this
+        one last read or wrote it, the pending additions and removals are applied on top,
+        and the merged index is written back atomically.
+        Args:
+            evict (bool): Evict least recently used artifacts from the merged index before writing.
+        """
+        with file_lock(self.lock_path):
+            if file_signature(self.index_path) != self._signature:
+                index = self._load_index()
+                for key in self._dropped:
+                    index["entries"].pop(key, None)
+                for key in self._changed:
+                    if key in self._index["entries"]:
+                        index["entries"][key] = self._index["entries"][key]
+                for fingerprint in self._changed_files:
+                    index["files"][fingerprint] = self._index["files"][fingerprint]
+                # A hit only refreshes the access time of an artifact that is still cached
+                for key in self._accessed:
+                    if key in index["entries"] and key in self._index["entries"]:
+                        index["entries"][key]["last_access"] = max(index["entries"][key]["last_access"],
+                                                                   self._index["entries"][key]["last_access"])
+                self._index = index
+            if evict:
+                self._evict()
+            if self._dropped:
+                self._prune_files()
+            if self._changed or self._dropped or self._changed_files or self._accessed:
+                tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f)
+                os.replace(tmp_path, self.index_path)
+            self._signature = file_signature(self.index_path)
+            self._changed.clear()
+            self._dropped.clear()
+            self._changed_files.clear()
+            self._accessed.clear()
+            self._last_write = time.monotonic()
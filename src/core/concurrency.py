@@ -0,0 +1,103 @@
+# src/core/concurrency.py
+import time
+import queue
+import traceback
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrently(stages, timeouts=None, default_timeout=None):
+    """
+    Runs independent pipeline stages at the same time on a thread pool and waits for all of them.
+    Every stage is isolated: an exception or a timeout in one stage only replaces
+    that stage's result with its fallback, the other stages are unaffected.
+    Args:
+        stages (dict): Mapping of stage name to a (callable, fallback) tuple. The callable takes no arguments.
+        timeouts (dict, optional): Mapping of stage name to its timeout in seconds.
+        default_timeout (float, optional): Timeout for stages missing from `timeouts` (None waits forever).
+    Returns:
+        dict: Mapping of stage name to the stage result (or its fallback on failure).
+    """
+    wrapped = {name: (lambda emit, func=func: func(), fallback) for name, (func, fallback) in stages.items()}
+    return {name: value for kind, name, value in stream_concurrently(wrapped, timeouts, default_timeout)
+            if kind == "done"}
+
+
+def stream_concurrently(stages, timeouts=None, default_timeout=None, min_interval=0.25):
+    """
+    Runs independent pipeline stages at the same time and yields their progress as it happens.
+    Each stage callable receives an `emit(value)` function it may call with partial results
+    (e.g. a summary streamed token by token). Failures and timeouts are isolated per stage,
+    exactly like run_concurrently.
+    Args:
+        stages (dict): Mapping of stage name to a (callable, fallback) tuple. The callable takes `emit`.
+        timeouts (dict, optional): Mapping of stage name to its timeout in seconds.
+        default_timeout (float, optional): Timeout for stages missing from `timeouts` (None waits forever).
+        min_interval (float): Minimum seconds between two partial updates of the same stage.
+    Yields:
+        tuple: ("partial", name, value) for progress, then ("done", name, result or fallback) once per stage.
+    """
+    timeouts = timeouts or {}
+    if not stages:
+        return
+
+    events = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="stage")
+    started = time.monotonic()
+
+    def make_emit(name):
+        last_sent = [0.0]
+
+        def emit(value):
+            # Throttle partial updates so the UI is not flooded with one message per token
+            now = time.monotonic()
+            if now - last_sent[0] >= min_interval:
+                last_sent[0] = now
+                events.put(("partial", name, value))
+        return emit
+
+    def run(name, func):
+        try:
+            events.put(("done", name, func(make_emit(name))))
+        except Exception as e:
+            print(f"Error in stage '{name}': {e}")
+            traceback.print_exception(type(e), e, e.__traceback__)
+            events.put(("failed", name, None))
+
+    for name, (func, _) in stages.items():
+        # Each stage runs in a copy of the caller's context, so its trace spans nest under the caller's span
+        executor.submit(contextvars.copy_context().run, run, name, func)
+
+    pending = set(stages)
+    try:
+        while pending:
+            # Wake up in time for the nearest stage deadline
+            deadlines = [started + timeouts.get(name, default_timeout) for name in pending
+                         if timeouts.get(name, default_timeout) is not None]
+            wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            try:
+                kind, name, value = events.get(timeout=wait)
+            except queue.Empty:
+                now = time.monotonic()
+                for name in list(pending):
+                    timeout = timeouts.get(name, default_timeout)
+                    if timeout is not None and now - started >= timeout:
+                        print(f"Stage '{name}' timed out after {timeout}s, using fallback.")
+                        pending.discard(name)
+                        yield "done", name, stages[name][1]
+                continue
+            if name not in pending:
+                # Late result from a stage that already timed out
+                continue
+            if kind == "partial":
+                yield "partial", name, value
+                continue
+            pending.discard(name)
+            if kind == "done":
+                print(f"Stage '{name}' finished in {time.monotonic() - started:.2f}s.")
+                yield "done", name, value
+            else:
+                yield "done", name, stages[name][1]
+    finally:
+        # Don't block on stages that timed out; their threads finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
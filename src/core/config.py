@@ -0,0 +1,200 @@
+# src/core/config.py
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file so every setting below can be overridden there
+load_dotenv()
+
+
+def env_int(name, default):
+    """
+    Reads an integer setting from the environment.
+    Args:
+        name (str): Name of the environment variable.
+        default (int): Value used when the variable is unset or invalid.
+    Returns:
+        int: The configured value.
+    """
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name, default):
+    """
+    Reads a float setting from the environment.
+    Args:
+        name (str): Name of the environment variable.
+        default (float): Value used when the variable is unset or invalid.
+    Returns:
+        float: The configured value.
+    """
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Per-stage timeouts (in seconds) for the concurrent generation stages
+STAGE_TIMEOUTS = {
+    "summary": env_float("SUMMARY_TIMEOUT", 300.0),
+    "quizzes": env_float("QUIZ_TIMEOUT", 300.0),
+    "flashcards": env_float("FLASHCARDS_TIMEOUT", 300.0),
+    "timestamps": env_float("TIMESTAMPS_TIMEOUT", 300.0),
+    "materials": env_float("MATERIALS_TIMEOUT", 600.0),
+}
+
+# Artifact cache: set CACHE_ENABLED=0 to always recompute, CACHE_MAX_BYTES bounds its size on disk
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") != "0"
+CACHE_MAX_BYTES = env_int("CACHE_MAX_BYTES", 10 * 1024 ** 3)
+
+# Shared LLM gateway: responses are memoized in memory and on disk. Only deterministic
+# (temperature 0) calls are cached unless LLM_CACHE_NONDETERMINISTIC=1 opts the rest in.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_NONDETERMINISTIC = os.getenv("LLM_CACHE_NONDETERMINISTIC", "0") == "1"
+LLM_CACHE_SIZE = env_int("LLM_CACHE_SIZE", 256)
+LLM_CACHE_DIR = os.getenv(
+    "LLM_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cache', 'llm'),
+)
+
+# Audio handling: decode audio straight into memory instead of through a WAV file,
+# optionally still persisting the WAV, and hardlink ("link") or copy ("copy") uploaded videos
+AUDIO_STREAMING = os.getenv("AUDIO_STREAMING", "1") != "0"
+PERSIST_WAV = os.getenv("PERSIST_WAV", "0") == "1"
+VIDEO_STORAGE_MODE = os.getenv("VIDEO_STORAGE_MODE", "link")
+
+# Storage quotas of the data directories in bytes (0 for none, see core/storage.py): STORAGE_MAX_BYTES bounds the
+# stored videos, WAVs and transcripts together, STORAGE_MAX_VIDEO_BYTES and STORAGE_MAX_AUDIO_BYTES a single kind.
+# Over quota, the least recently used lectures lose their video first, then their WAV; transcripts are always kept.
+STORAGE_MAX_BYTES = env_int("STORAGE_MAX_BYTES", 50 * 1024 ** 3)
+STORAGE_MAX_VIDEO_BYTES = env_int("STORAGE_MAX_VIDEO_BYTES", 0)
+STORAGE_MAX_AUDIO_BYTES = env_int("STORAGE_MAX_AUDIO_BYTES", 0)
+
+# Chunked transcription: with more than one worker, audio longer than a chunk is split at
+# silences into overlapping windows that are transcribed in parallel worker processes
+TRANSCRIBE_WORKERS = env_int("TRANSCRIBE_WORKERS", 1)
+TRANSCRIBE_CHUNK_SECONDS = env_float("TRANSCRIBE_CHUNK_SECONDS", 300.0)
+TRANSCRIBE_OVERLAP_SECONDS = env_float("TRANSCRIBE_OVERLAP_SECONDS", 2.0)
+
+# Transcription backend ("whisper" or "faster-whisper") and its decoding settings.
+# WHISPER_THREADS=0 lets the engine pick its own thread count.
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "whisper")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_BEAM_SIZE = env_int("WHISPER_BEAM_SIZE", 5)
+WHISPER_THREADS = env_int("WHISPER_THREADS", 0)
+
+# Progressive transcription: engines that cannot report segments while decoding (openai-whisper)
+# transcribe in windows of this many seconds so the transcript appears as it is produced (0 disables)
+TRANSCRIBE_WINDOW_SECONDS = env_float("TRANSCRIBE_WINDOW_SECONDS", 60.0)
+
+# Map-reduce summarization: transcripts above SUMMARY_MAP_REDUCE_THRESHOLD tokens are split into
+# chunks of about SUMMARY_CHUNK_TOKENS, summarized SUMMARY_MAP_PARALLELISM at a time, then merged
+SUMMARY_MAP_REDUCE_THRESHOLD = env_int("SUMMARY_MAP_REDUCE_THRESHOLD", 12000)
+SUMMARY_CHUNK_TOKENS = env_int("SUMMARY_CHUNK_TOKENS", 3000)
+SUMMARY_MAP_PARALLELISM = env_int("SUMMARY_MAP_PARALLELISM", 4)
+
+# LLM request scheduler: token buckets on requests and tokens per minute (0 disables a limit),
+# retries with jittered exponential backoff, and interactive requests served before batch ones.
+# LLM_RATE_SHARE scales the limits for processes that share one API key (e.g. batch workers).
+# A request reserves its prompt plus LLM_EXPECTED_COMPLETION_TOKENS (at most its max_tokens) against
+# LLM_TPM; the difference to the tokens it actually used is settled once it finishes.
+LLM_RPM = env_float("LLM_RPM", 500.0)
+LLM_TPM = env_float("LLM_TPM", 30000.0)
+LLM_EXPECTED_COMPLETION_TOKENS = env_int("LLM_EXPECTED_COMPLETION_TOKENS", 1500)
+LLM_RATE_SHARE = env_float("LLM_RATE_SHARE", 1.0)
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 5)
+LLM_BACKOFF_BASE = env_float("LLM_BACKOFF_BASE", 1.0)
+LLM_BACKOFF_MAX = env_float("LLM_BACKOFF_MAX", 60.0)
+LLM_REQUEST_TIMEOUT = env_float("LLM_REQUEST_TIMEOUT", 120.0)
+LLM_PRIORITY = os.getenv("LLM_PRIORITY", "interactive")
+
+# Observability: spans and counters are kept in memory (METRICS_ENABLED=0 turns them off), exported
+# in the Prometheus text format to METRICS_FILE every METRICS_FLUSH_SECONDS and/or on
+# http://<host>:METRICS_PORT/metrics (0 disables), and spans are appended to TRACE_FILE as JSON lines
+# (once it would grow past TRACE_MAX_BYTES it is moved to TRACE_FILE.1 and a new one is started; 0 never rotates)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_FILE = os.getenv(
+    "METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'metrics', 'metrics.prom'),
+)
+METRICS_FLUSH_SECONDS = env_float("METRICS_FLUSH_SECONDS", 15.0)
+METRICS_PORT = env_int("METRICS_PORT", 0)
+TRACE_FILE = os.getenv(
+    "TRACE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'metrics', 'traces.jsonl'),
+)
+TRACE_MAX_BYTES = env_int("TRACE_MAX_BYTES", 50 * 1024 * 1024)
+
+# Full-text search: snapshot of the index over every lecture's segments (rebuilt from the segment stores if missing)
+SEARCH_INDEX_PATH = os.getenv(
+    "SEARCH_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'search', 'index.pkl'),
+)
+
+# Conceptual timestamps: "hybrid" finds topic boundaries locally (TextTiling-style lexical cohesion)
+# and only asks the LLM to name them, "offline" names them from their keywords without any LLM call,
+# and "llm" sends every segment to the model to group (the original behaviour). Topics compare
+# TOPIC_BLOCK_SEGMENTS segments on each side of a gap, last at least TOPIC_MIN_SECONDS and number at
+# most TOPIC_MAX_PER_HOUR per hour of lecture.
+TIMESTAMPS_MODE = os.getenv("TIMESTAMPS_MODE", "hybrid")
+TOPIC_BLOCK_SEGMENTS = env_int("TOPIC_BLOCK_SEGMENTS", 6)
+TOPIC_MIN_SECONDS = env_float("TOPIC_MIN_SECONDS", 90.0)
+TOPIC_MAX_PER_HOUR = env_float("TOPIC_MAX_PER_HOUR", 30.0)
+
+# Voice activity detection: only the speech in a recording is transcribed (VAD_ENABLED=0 transcribes
+# everything). Frames VAD_THRESHOLD_DB above the noise floor are speech; pauses shorter than
+# VAD_MIN_SILENCE_SECONDS are kept, regions shorter than VAD_MIN_SPEECH_SECONDS dropped, and
+# VAD_PADDING_SECONDS of audio is kept around each region
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") != "0"
+VAD_THRESHOLD_DB = env_float("VAD_THRESHOLD_DB", 12.0)
+VAD_MIN_SPEECH_SECONDS = env_float("VAD_MIN_SPEECH_SECONDS", 0.25)
+VAD_MIN_SILENCE_SECONDS = env_float("VAD_MIN_SILENCE_SECONDS", 2.0)
+VAD_PADDING_SECONDS = env_float("VAD_PADDING_SECONDS", 0.3)
+
+# Server mode: with SERVER_WORKERS > 0, transcription runs in that many worker processes, each with a
+# preloaded model and SERVER_WORKER_THREADS threads (0 splits the cores evenly) pinned to its own cores
+# (SERVER_PIN_CPUS=0 disables pinning). Up to SERVER_QUEUE_SIZE more uploads wait for a worker; beyond
+# that, uploads are turned away until the queue drains.
+SERVER_WORKERS = env_int("SERVER_WORKERS", 0)
+SERVER_QUEUE_SIZE = env_int("SERVER_QUEUE_SIZE", 8)
+SERVER_WORKER_THREADS = env_int("SERVER_WORKER_THREADS", 0)
+SERVER_PIN_CPUS = os.getenv("SERVER_PIN_CPUS", "1") != "0"
+
+# Study material generation: "separate" sends the transcript in each of the summary, quiz and flashcards
+# prompts, "shared_prefix" starts all three with the same system message and transcript so the provider's
+# prompt cache reuses it, and "combined" asks for every material in a single structured call
+GENERATION_MODE = os.getenv("GENERATION_MODE", "separate")
+
+# Live lectures: every LIVE_STEP_SECONDS of new audio, the rolling window (at most LIVE_WINDOW_SECONDS of
+# audio not committed yet) is transcribed again. Segments ending more than LIVE_HOLD_SECONDS before the end
+# of the window are committed, since later audio can no longer change them. When transcription falls more
+# than LIVE_MAX_BACKLOG_SECONDS behind, the oldest audio is skipped to catch up. The running summary and
+# concept timestamps are refreshed every LIVE_REFRESH_SECONDS of new transcript. LIVE_INPUT_FORMAT is the
+# ffmpeg input format of microphone devices (e.g. "pulse", "alsa", "avfoundation", "dshow"); leave it empty
+# for stream URLs and files.
+LIVE_WINDOW_SECONDS = env_float("LIVE_WINDOW_SECONDS", 30.0)
+LIVE_STEP_SECONDS = env_float("LIVE_STEP_SECONDS", 5.0)
+LIVE_HOLD_SECONDS = env_float("LIVE_HOLD_SECONDS", 2.0)
+LIVE_MAX_BACKLOG_SECONDS = env_float("LIVE_MAX_BACKLOG_SECONDS", 60.0)
+LIVE_REFRESH_SECONDS = env_float("LIVE_REFRESH_SECONDS", 300.0)
+LIVE_INPUT_FORMAT = os.getenv("LIVE_INPUT_FORMAT", "")
+
+# Service tiers (see core/tiers.py): TRANSCRIBE_TIER names the tier every lecture is transcribed with, or
+# "auto" picks one per lecture: "fast" while TIER_BUSY_QUEUE or more lectures are queued or for lectures
+# longer than TIER_LONG_MINUTES, "accurate" for lectures shorter than TIER_SHORT_MINUTES, "standard"
+# otherwise. With TIER_UPGRADE=1 a quick "draft" transcript comes first and is replaced in the background
+# by a pass with the chosen tier. TRANSCRIBE_TIERS (JSON) overrides or adds tiers, e.g.
+# {"accurate": {"model_size": "medium"}}.
+TRANSCRIBE_TIER = os.getenv("TRANSCRIBE_TIER", "standard")
+TIER_SHORT_MINUTES = env_float("TIER_SHORT_MINUTES", 20.0)
+TIER_LONG_MINUTES = env_float("TIER_LONG_MINUTES", 90.0)
+TIER_BUSY_QUEUE = env_int("TIER_BUSY_QUEUE", 2)
+TIER_UPGRADE = os.getenv("TIER_UPGRADE", "0") != "0"
+# With TIER_UPGRADE_REGENERATE=1 an upgrade whose text differs from the draft's also regenerates the study
+# materials in the background (cached for the next time the lecture is opened); otherwise they are
+# generated on that next open. Off by default since it doubles the LLM calls of every drafted lecture.
+TIER_UPGRADE_REGENERATE = os.getenv("TIER_UPGRADE_REGENERATE", "0") != "0"
+TRANSCRIBE_TIERS = os.getenv("TRANSCRIBE_TIERS", "")
@@ -1,44 +1,47 @@
 # src/core/flashcards.py
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from core.llm import chat_completion, lecture_messages, TRANSCRIPT_ABOVE
+from core.config import GENERATION_MODE
 
-# Load environment variables from the .env file to access API keys or other configurations
-load_dotenv()
+# Generation settings (also used to key cached flashcards)
+FLASHCARDS_MODEL = "gpt-4o"
+FLASHCARDS_TEMPERATURE = 0.7
+FLASHCARDS_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/flashcards_prompt.txt')
 
-# Initialize OpenAI client with the API key
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_flashcards(transcription_text):
+def generate_flashcards(transcription_text, on_token=None):
     """
     Generates flashcards from a lecture transcription using OpenAI's API.
     Args:
         transcription_text (str): The lecture transcription text to generate flashcards from.
+        on_token (callable, optional): Streams the response; called with the text so far after every token.
     Returns:
         str: Raw flashcards text as a string, formatted in "Front: ... Back: ..." style.
     """
-    # Determine the current directory and locate the flashcards prompt file
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    prompt_file_path = os.path.join(current_dir, 'prompts/flashcards_prompt.txt')
     # Read the flashcards prompt template from the file
-    with open(prompt_file_path, 'r', encoding='utf-8') as f:
+    with open(FLASHCARDS_PROMPT_PATH, 'r', encoding='utf-8') as f:
         prompt_template = f.read()
     
-    # Replace the placeholder in the template with the actual transcription text
-    prompt = prompt_template.replace("TRANSCRIPTION_HERE", transcription_text)
-    
-    # Send the formatted prompt to OpenAI's API (gpt4o) to generate flashcards
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    if GENERATION_MODE == "shared_prefix":
+        # The transcript leads the request, shared with the summary and quiz requests
+        messages = lecture_messages(transcription_text, prompt_template.replace("TRANSCRIPTION_HERE", TRANSCRIPT_ABOVE))
+    else:
+        # Replace the placeholder in the template with the actual transcription text
+        prompt = prompt_template.replace("TRANSCRIPTION_HERE", " ".join(transcription_text.split()))
+        messages = [
             {"role": "system", "content": "You are an AI assistant that creates flashcards to help students learn."},
             {"role": "user", "content": prompt}
-        ],
-        max_tokens=14000, # Maximum tokens allowed in response
-        temperature=0.7, # Controls creativity in response
+        ]
+    
+    # Send the formatted prompt to OpenAI's API (gpt4o) to generate flashcards
+    response = chat_completion(
+        model=FLASHCARDS_MODEL,
+        messages=messages,
+        max_tokens=None, # Use whatever the context window leaves after the prompt
+        temperature=FLASHCARDS_TEMPERATURE, # Controls creativity in response
+        on_token=on_token,
     )
     # Extract and return the generated flashcards text
-    flashcards_raw = response.choices[0].message.content.strip()
+    flashcards_raw = response.strip()
     return flashcards_raw
 
 def format_flashcards_markdown(flashcards_text):
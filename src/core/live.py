@@ -0,0 +1,473 @@
+# src/core/live.py
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ffmpeg
+import numpy as np
+
+from core.audio import SAMPLE_RATE
+from core.models import get_transcriber
+from core.summaries import summarize_chunk, reduce_summaries, SUMMARY_MAP_PROMPT_PATH
+from core.topics import segment_topics, label_topics
+from core.timestamps import format_concept_groups_html
+from core.segment_store import write_segments
+from core.vad import ABSOLUTE_FLOOR_DB
+from core.metrics import inc, observe, set_gauge
+from core.config import (LIVE_WINDOW_SECONDS, LIVE_STEP_SECONDS, LIVE_HOLD_SECONDS, LIVE_MAX_BACKLOG_SECONDS,
+                         LIVE_REFRESH_SECONDS, LIVE_INPUT_FORMAT, TIMESTAMPS_MODE, VAD_ENABLED)
+
+# Audio read from ffmpeg at a time (half a second keeps the pipe responsive)
+BLOCK_SECONDS = 0.5
+
+# Characters of committed transcript passed to the model as context for the next window
+CONTEXT_CHARS = 200
+
+# Shown in the map prompt in place of the (unknown) number of sections
+LIVE_TOTAL_SECTIONS = "a lecture still in progress"
+
+
+def open_stream(source, input_format=LIVE_INPUT_FORMAT, realtime=False, sample_rate=SAMPLE_RATE):
+    """
+    Decodes a live audio source with ffmpeg, block by block.
+    Args:
+        source (str): Stream URL (rtsp://, http://, ...), microphone device (with input_format) or file.
+        input_format (str): ffmpeg input format, e.g. "pulse" for a microphone (empty to let ffmpeg guess).
+        realtime (bool): Read the source at its native speed (ffmpeg -re), which makes a file behave
+            like a live stream.
+        sample_rate (int): Output sample rate in Hz.
+    Yields:
+        np.ndarray: Mono float32 samples, BLOCK_SECONDS at a time.
+    """
+    input_args = {}
+    if input_format:
+        input_args["f"] = input_format
+    if realtime:
+        input_args["re"] = None
+    if source.startswith("rtsp://"):
+        # UDP drops packets on busy networks; TCP trades a little latency for a complete stream
+        input_args["rtsp_transport"] = "tcp"
+
+    process = (
+        ffmpeg
+        .input(source, **input_args)
+        .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=sample_rate)
+        .global_args('-loglevel', 'error', '-nostats')
+        # stderr is left on the console: a live stream can run for hours and a pipe could fill up
+        .run_async(pipe_stdout=True)
+    )
+    block_bytes = int(BLOCK_SECONDS * sample_rate) * 2
+    try:
+        leftover = b""
+        while True:
+            block = process.stdout.read(block_bytes)
+            if not block:
+                break
+            block = leftover + block
+            # Keep an odd trailing byte for the next read so samples are never split
+            usable = len(block) - (len(block) % 2)
+            leftover = block[usable:]
+            yield np.frombuffer(block[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def to_mono_16k(samples, sample_rate):
+    """
+    Converts audio from any source (e.g. a browser microphone) to 16 kHz mono float32.
+    Args:
+        samples (np.ndarray): Samples, int16 or float, shaped (n,) or (n, channels).
+        sample_rate (int): Sample rate of the samples in Hz.
+    Returns:
+        np.ndarray: Mono float32 samples at SAMPLE_RATE.
+    """
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if np.issubdtype(samples.dtype, np.integer):
+        samples = samples / 32768.0
+    if sample_rate != SAMPLE_RATE and len(samples):
+        # Linear interpolation is plenty for speech going into a 16 kHz model
+        positions = np.arange(0, len(samples), sample_rate / SAMPLE_RATE)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.float32)
+
+
+class LiveTranscriber:
+    """
+    Rolling-window transcription of an audio stream.
+
+    Audio that is not committed yet sits in a fixed-size buffer. Every `step_seconds` of
+    new audio, up to `window_seconds` of it is transcribed; segments ending more than
+    `hold_seconds` before the end of the buffer are committed (appended to `segments`)
+    and their audio is dropped, the rest stays `pending` and is transcribed again with
+    the next audio. A full window commits all but its last segment, so no segment waits
+    longer than about one window. Memory is bounded by the buffer: if transcription falls
+    more than `max_backlog_seconds` behind, the oldest audio is skipped.
+    """
+
+    def __init__(self, backend, window_seconds=LIVE_WINDOW_SECONDS, step_seconds=LIVE_STEP_SECONDS,
+                 hold_seconds=LIVE_HOLD_SECONDS, max_backlog_seconds=LIVE_MAX_BACKLOG_SECONDS,
+                 sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            backend (TranscriptionBackend): Loaded transcription backend.
+            window_seconds (float): Longest stretch of audio transcribed at once.
+            step_seconds (float): New audio that triggers the next transcription.
+            hold_seconds (float): Segments ending this close to the newest audio are not committed yet.
+            max_backlog_seconds (float): Untranscribed audio kept beyond the window before skipping.
+            sample_rate (int): Sample rate in Hz.
+        """
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.step_size = int(step_seconds * sample_rate)
+        self.hold_seconds = hold_seconds
+        # Committed segments on the session timeline, and the uncommitted ones of the last window
+        self.segments = []
+        self.pending = []
+        self.skipped_seconds = 0.0
+        self._buffer = np.zeros(self.window + int(max_backlog_seconds * sample_rate), dtype=np.float32)
+        self._filled = 0
+        self._decoded = 0
+        self._buffer_start = 0.0
+        self._context = ""
+
+    @property
+    def audio_seconds(self):
+        """float: Session time of the newest audio received."""
+        return self._buffer_start + self._filled / self.sample_rate
+
+    def push(self, samples):
+        """
+        Appends 16 kHz mono float32 audio, skipping the oldest audio if the buffer overflows.
+        Args:
+            samples (np.ndarray): New samples.
+        """
+        # A block larger than the whole buffer only keeps its end
+        dropped = max(0, len(samples) - len(self._buffer))
+        overflow = self._filled + len(samples) - dropped - len(self._buffer)
+        if dropped or overflow > 0:
+            # Transcription cannot keep up: drop the oldest audio rather than fall further behind
+            skipped = (max(0, overflow) + dropped) / self.sample_rate
+            print(f"Live transcription is falling behind, skipping {skipped:.1f}s of audio.")
+            self.skipped_seconds += skipped
+            inc("lecchurro_live_skipped_seconds_total", skipped)
+            self._advance(overflow)
+            self._buffer_start += dropped / self.sample_rate
+            samples = samples[dropped:]
+        self._buffer[self._filled:self._filled + len(samples)] = samples
+        self._filled += len(samples)
+        set_gauge("lecchurro_live_backlog_seconds", (self._filled - self._decoded) / self.sample_rate)
+
+    def ready(self):
+        """
+        Returns:
+            bool: True when enough new audio arrived for the next transcription.
+        """
+        return self._filled - self._decoded >= self.step_size
+
+    def step(self, final=False):
+        """
+        Transcribes the current window and commits the segments that are settled.
+        Args:
+            final (bool): The stream ended; commit everything transcribed.
+        Returns:
+            list of dict: The newly committed segments.
+        """
+        length = min(self._filled, self.window)
+        window = self._buffer[:length]
+        window_seconds = length / self.sample_rate
+        full = length >= self.window
+
+        segments = []
+        silent = VAD_ENABLED and (not length or 10 * np.log10(np.square(window).mean() + 1e-10) < ABSOLUTE_FLOOR_DB)
+        if not silent:
+            options = {"initial_prompt": self._context} if self._context else {}
+            result = self.backend.transcribe(window.copy(), **options)
+            segments = [{"start": float(segment["start"]), "end": float(segment["end"]), "text": segment["text"]}
+                        for segment in result["segments"] if segment["text"].strip()]
+
+        # Segments are in time order, so the settled ones are a prefix
+        count = 0
+        while count < len(segments) and segments[count]["end"] <= window_seconds - self.hold_seconds:
+            count += 1
+        if final:
+            count = len(segments)
+        elif full:
+            # Bound the latency: a full window keeps at most its last segment for later
+            count = max(count, len(segments) - 1 if len(segments) > 1 else len(segments))
+        committed = segments[:count]
+
+        if committed:
+            cut = min(committed[-1]["end"], window_seconds)
+        elif final or full or silent:
+            # Nothing (more) to wait for in this audio: drop it, keeping the hold margin unless the stream ended
+            cut = window_seconds if final else max(0.0, window_seconds - self.hold_seconds)
+        else:
+            cut = 0.0
+        if final and (length == self._filled or int(cut * self.sample_rate) <= 0):
+            # The stream ended: never transcribe the same audio twice, or flush could loop forever
+            # (e.g. on a segment ending at 0.0)
+            cut = window_seconds
+
+        newest = self.audio_seconds
+        new_segments = []
+        for segment in committed:
+            segment = dict(segment, id=len(self.segments), start=segment["start"] + self._buffer_start,
+                           end=segment["end"] + self._buffer_start)
+            self.segments.append(segment)
+            new_segments.append(segment)
+            observe("lecchurro_live_commit_delay_seconds", newest - segment["end"])
+        self.pending = [dict(segment, start=segment["start"] + self._buffer_start,
+                             end=segment["end"] + self._buffer_start)
+                        for segment in segments[count:]]
+        if new_segments:
+            self._context = "".join(segment["text"] for segment in self.segments[-10:])[-CONTEXT_CHARS:]
+
+        self._advance(int(cut * self.sample_rate))
+        self._decoded = max(0, length - int(cut * self.sample_rate))
+        return new_segments
+
+    def flush(self):
+        """
+        Commits whatever audio is left once the stream has ended.
+        Returns:
+            list of dict: The newly committed segments.
+        """
+        committed = []
+        while self._filled:
+            committed += self.step(final=True)
+        self.pending = []
+        return committed
+
+    def _advance(self, count):
+        """Drops the oldest `count` samples of the buffer."""
+        count = min(count, self._filled)
+        if count <= 0:
+            return
+        self._buffer[:self._filled - count] = self._buffer[count:self._filled]
+        self._filled -= count
+        self._decoded = max(0, self._decoded - count)
+        self._buffer_start += count / self.sample_rate
+
+
+class LiveNotes:
+    """
+    Running summary and concept timestamps of a live lecture. Each refresh only processes
+    the transcript added since the previous one: new segments are summarized as one more
+    section of notes, and topics are only looked for after the last settled topic boundary.
+    """
+
+    def __init__(self, refresh_seconds=LIVE_REFRESH_SECONDS, label_topics_with_llm=TIMESTAMPS_MODE != "offline"):
+        """
+        Args:
+            refresh_seconds (float): Transcript duration that makes a refresh due.
+            label_topics_with_llm (bool): Ask the model to name settled topics (otherwise keywords are used).
+        """
+        self.refresh_seconds = refresh_seconds
+        self.label_topics_with_llm = label_topics_with_llm
+        # (start, end, notes) of every summarized section, and the settled concept groups
+        self.sections = []
+        self.groups = []
+        self._open_groups = []
+        self._summarized = 0
+        self._topics_start = 0
+        # End of the transcript when summarizing last failed (retried after another refresh_seconds)
+        self._failed_at = None
+        with open(SUMMARY_MAP_PROMPT_PATH, 'r') as file:
+            self._map_template = file.read()
+
+    def due(self, segments):
+        """
+        Args:
+            segments (list of dict): Committed segments of the session.
+        Returns:
+            bool: True once `refresh_seconds` of transcript were added since the last refresh
+                (and since the last failed one, so a failing model is not called again on every step).
+        """
+        if len(segments) <= self._summarized:
+            return False
+        end = segments[-1]["end"]
+        if self._failed_at is not None and end - self._failed_at < self.refresh_seconds:
+            return False
+        return end - segments[self._summarized]["start"] >= self.refresh_seconds
+
+    def refresh(self, segments, final=False):
+        """
+        Adds the new transcript to the running summary and concept timestamps.
+        Args:
+            segments (list of dict): Committed segments of the session (only the new ones are processed).
+            final (bool): The session ended; settle every remaining topic.
+        """
+        new = segments[self._summarized:]
+        if new:
+            try:
+                notes = summarize_chunk(new, len(self.sections) + 1, LIVE_TOTAL_SECTIONS, self._map_template)
+                self.sections.append((new[0]["start"], new[-1]["end"], notes))
+                self._summarized = len(segments)
+                self._failed_at = None
+            except Exception as e:
+                # The same segments are summarized again with the next refresh
+                print(f"Error summarizing live lecture section: {e}")
+                self._failed_at = new[-1]["end"]
+
+        tail = segments[self._topics_start:]
+        groups = segment_topics(tail)
+        # The last topic may still continue, so only the ones before it are settled (and named)
+        settled, self._open_groups = (groups, []) if final else (groups[:-1], groups[-1:])
+        if settled and self.label_topics_with_llm:
+            settled = label_topics(settled, tail)
+        self.groups += settled
+        if self._open_groups:
+            opening = self._open_groups[0]["start_time"]
+            self._topics_start += next(i for i, segment in enumerate(tail) if segment["start"] >= opening)
+        else:
+            self._topics_start = len(segments)
+
+    def summary(self):
+        """
+        Returns:
+            str: The section notes written so far, in lecture order (Markdown).
+        """
+        return "\n\n".join(notes for _, _, notes in self.sections)
+
+    def timestamps_html(self):
+        """
+        Returns:
+            str: HTML of the settled concept groups followed by the open one.
+        """
+        groups = self.groups + self._open_groups
+        return format_concept_groups_html(groups) if groups else ""
+
+    def final_summary(self):
+        """
+        Merges the section notes into the summary of the whole lecture.
+        Returns:
+            str: The summary (the section notes as they are if merging fails).
+        """
+        if len(self.sections) < 2:
+            return self.summary()
+        try:
+            return reduce_summaries(self.sections)
+        except Exception as e:
+            print(f"Error merging live lecture notes: {e}")
+            return self.summary()
+
+
+class LiveSession:
+    """
+    A live lecture: audio pushed from a microphone or decoded from a stream is transcribed
+    as it arrives, while the running notes are refreshed in the background.
+    """
+
+    def __init__(self, name=None, backend=None, store_path=None):
+        """
+        Args:
+            name (str, optional): Name of the lecture (defaults to the start date and time).
+            backend (TranscriptionBackend, optional): Transcription backend (defaults to the shared one).
+            store_path (str, optional): Segment store written when the session ends.
+        """
+        self.name = name or time.strftime("live-%Y%m%d-%H%M%S")
+        self.store_path = store_path
+        self.transcriber = LiveTranscriber(backend or get_transcriber())
+        self.notes = LiveNotes()
+        self._blocks = queue.Queue()
+        self._stopped = threading.Event()
+
+    def push(self, samples, sample_rate=SAMPLE_RATE):
+        """
+        Hands audio to the session (thread-safe).
+        Args:
+            samples (np.ndarray): Samples of any rate and channel count.
+            sample_rate (int): Their sample rate in Hz.
+        """
+        if not self._stopped.is_set():
+            self._blocks.put(to_mono_16k(samples, sample_rate))
+
+    def start_source(self, source, input_format=LIVE_INPUT_FORMAT, realtime=False):
+        """
+        Starts decoding a stream or device on a background thread; the session stops when it ends.
+        Args:
+            source (str): Stream URL, device or file (see open_stream).
+            input_format (str): ffmpeg input format.
+            realtime (bool): Read the source at its native speed.
+        Returns:
+            threading.Thread: The reader thread.
+        """
+        def read():
+            try:
+                for block in open_stream(source, input_format, realtime):
+                    if self._stopped.is_set():
+                        break
+                    self._blocks.put(block)
+            except Exception as e:
+                print(f"Error reading live stream {source}: {e}")
+            finally:
+                self.stop()
+
+        thread = threading.Thread(target=read, name="live-reader", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Ends the session; audio already received is still transcribed."""
+        self._stopped.set()
+
+    def _drain(self, timeout):
+        """Moves every queued audio block into the transcriber, waiting up to `timeout` for the first."""
+        try:
+            self.transcriber.push(self._blocks.get(timeout=timeout))
+            while True:
+                self.transcriber.push(self._blocks.get_nowait())
+        except queue.Empty:
+            pass
+
+    def events(self):
+        """
+        Runs the session until it is stopped.
+        Yields:
+            tuple: (kind, stage, value) events like process_video_stream's: partial "transcript"
+                (committed plus pending segments), "summary" and "timestamps" updates while the
+                lecture goes on, then "done" for all three once it has ended.
+        """
+        refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-notes")
+        refresh = None
+        try:
+            while not (self._stopped.is_set() and self._blocks.empty()):
+                self._drain(timeout=0.2)
+                if self.transcriber.ready():
+                    self.transcriber.step()
+                    yield "partial", "transcript", self.transcriber.segments + self.transcriber.pending
+
+                # Notes are refreshed on their own thread so the LLM calls never hold up transcription
+                if refresh is not None and refresh.done():
+                    refresh.result()
+                    refresh = None
+                    yield "partial", "summary", self.notes.summary()
+                    yield "partial", "timestamps", self.notes.timestamps_html()
+                if refresh is None and self.notes.due(self.transcriber.segments):
+                    refresh = refresher.submit(self.notes.refresh, list(self.transcriber.segments))
+
+            self.transcriber.flush()
+            segments = self.transcriber.segments
+            if self.store_path and segments:
+                try:
+                    write_segments(self.store_path, segments)
+                except Exception as e:
+                    print(f"Error writing segment store: {e}")
+            yield "done", "transcript", segments
+            if refresh is not None:
+                refresh.result()
+        finally:
+            refresher.shutdown(wait=False)
+
+        self.notes.refresh(segments, final=True)
+        print(f"Live session {self.name} ended: {len(segments)} segment(s), "
+              f"{self.transcriber.skipped_seconds:.0f}s of audio skipped.")
+        yield "done", "summary", self.notes.final_summary()
+        yield "done", "timestamps", self.notes.timestamps_html()
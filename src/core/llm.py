@@ -0,0 +1,270 @@
+# src/core/llm.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from core.tokens import count_message_tokens, choose_max_tokens
+from core.scheduler import scheduler, DEFAULT_PRIORITY
+from core.metrics import span, inc
+from core.config import (LLM_CACHE_ENABLED, LLM_CACHE_NONDETERMINISTIC,
+                         LLM_CACHE_SIZE, LLM_CACHE_DIR, LLM_REQUEST_TIMEOUT, LLM_EXPECTED_COMPLETION_TOKENS)
+
+# Shared-prefix prompts: every call about a lecture starts with the same system message and the
+# transcript, byte for byte, so the provider's prompt cache can reuse that prefix across calls
+LECTURE_SYSTEM_PROMPT = "You are an AI assistant that helps students learn from lecture transcripts."
+
+# Stands in for the transcript inside instructions that follow a shared prefix
+TRANSCRIPT_ABOVE = "(the lecture transcription above)"
+
+# One HTTP client per process, created on first use and shared by every core module
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide OpenAI client, creating it on first use.
+    A forked worker process gets its own client instead of sharing the parent's connections.
+    Returns:
+        OpenAI: The shared client.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            # Imported here so modules using the gateway stay cheap to import
+            from openai import OpenAI
+            # Retries are handled by the scheduler, which knows about the other queued requests
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, timeout=LLM_REQUEST_TIMEOUT)
+            _client_pid = os.getpid()
+        return _client
+
+
+class ResponseCache:
+    """
+    Two-level cache of chat completion responses: an in-memory LRU in front of
+    one JSON file per response on disk, so identical requests are answered
+    without calling the API, even across restarts.
+    """
+
+    def __init__(self, directory, max_entries):
+        """
+        Args:
+            directory (str): Directory holding the on-disk responses.
+            max_entries (int): Maximum number of responses kept in memory.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens, response_format=None):
+        """
+        Builds the cache key of a request.
+        Args:
+            model (str): Model name.
+            messages (list of dict): Chat messages.
+            temperature (float): Sampling temperature.
+            max_tokens (int): Maximum tokens in the response.
+            response_format (dict, optional): Structured output format of the request.
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        request = [model, messages, temperature, max_tokens]
+        if response_format is not None:
+            request.append(response_format)
+        payload = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Looks a response up in memory, then on disk.
+        Args:
+            key (str): Request key.
+        Returns:
+            str or None: The cached response content, or None on a miss.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = os.path.join(self.directory, key + ".json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = json.load(f)["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, content)
+        return content
+
+    def put(self, key, content):
+        """
+        Stores a response in memory and on disk.
+        Args:
+            key (str): Request key.
+            content (str): Response content.
+        """
+        self._remember(key, content)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, key + ".json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"content": content}, f)
+        os.replace(tmp_path, path)
+
+    def _remember(self, key, content):
+        """Adds a response to the in-memory LRU, evicting the oldest one if full."""
+        with self._lock:
+            self._memory[key] = content
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+response_cache = ResponseCache(os.path.abspath(LLM_CACHE_DIR), LLM_CACHE_SIZE)
+
+
+def lecture_messages(transcription, instructions):
+    """
+    Builds chat messages that lead with the lecture transcript and end with the task, so the
+    system message and transcript form a prefix shared by every call about the same lecture.
+    Args:
+        transcription (str): The lecture transcription.
+        instructions (str): The task-specific instructions (referring to TRANSCRIPT_ABOVE).
+    Returns:
+        list of dict: Chat messages.
+    """
+    return [
+        {"role": "system", "content": LECTURE_SYSTEM_PROMPT},
+        # Whitespace collapsed exactly as the other prompts do, so the prefix never differs between calls
+        {"role": "user", "content": f"Lecture Transcription:\n{' '.join(transcription.split())}"},
+        {"role": "user", "content": instructions},
+    ]
+
+
+def chat_completion(model, messages, max_tokens, temperature, cache=None, on_token=None, priority=None,
+                    response_format=None):
+    """
+    Sends a chat completion request through the shared gateway.
+    The prompt is counted before sending and max_tokens is picked from what the model's
+    context window has left, capped by the caller's value. Requests go through the
+    scheduler, which enforces the rate limits and retries transient failures.
+    Args:
+        model (str): Model name (e.g. "gpt-4o").
+        messages (list of dict): Chat messages with 'role' and 'content'.
+        max_tokens (int or None): Upper bound on the response tokens (None uses the whole remaining budget).
+        temperature (float): Sampling temperature.
+        cache (bool, optional): Force caching on or off. By default only temperature 0
+            requests are cached, unless LLM_CACHE_NONDETERMINISTIC is set.
+        on_token (callable, optional): When given, the response is streamed and this is called
+            with the text received so far after every token (once with the full text on a cache hit).
+        priority (str, optional): "interactive" or "batch" (defaults to LLM_PRIORITY).
+        response_format (dict, optional): Structured output format (e.g. a JSON schema) the response must follow.
+    Returns:
+        str: The content of the first response choice.
+    """
+    prompt_tokens = count_message_tokens(messages, model)
+    max_tokens = choose_max_tokens(model, prompt_tokens, max_tokens)
+    print(f"LLM request ({model}): {prompt_tokens} prompt tokens, max_tokens={max_tokens}.")
+
+    if cache is None:
+        cache = LLM_CACHE_ENABLED and (temperature == 0 or LLM_CACHE_NONDETERMINISTIC)
+
+    key = ResponseCache.make_key(model, messages, temperature, max_tokens, response_format) if cache else None
+    if key:
+        cached = response_cache.get(key)
+        inc("lecchurro_llm_cache_total", model=model, result="hit" if cached is not None else "miss")
+        if cached is not None:
+            print(f"LLM cache hit ({model}).")
+            if on_token:
+                on_token(cached)
+            return cached
+
+    # Only sent when given, so plain requests stay identical to what they were
+    extra = {"response_format": response_format} if response_format is not None else {}
+
+    def send():
+        if on_token:
+            return _stream_completion(model, messages, max_tokens, temperature, on_token, **extra)
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **extra,
+        )
+        return response.choices[0].message.content, response.usage
+
+    # Reserving the whole completion budget would let a single request with a large max_tokens fill the
+    # tokens-per-minute bucket, so reserve the expected size and settle with the actual usage afterwards
+    reserved = prompt_tokens + min(max_tokens, LLM_EXPECTED_COMPLETION_TOKENS)
+    with span("llm_call", model=model, prompt_tokens=prompt_tokens, max_tokens=max_tokens,
+              streamed=bool(on_token)) as attributes:
+        content, usage = scheduler.submit(send, reserved, priority or DEFAULT_PRIORITY)
+        log_usage(model, usage)
+        if usage is not None:
+            attributes["completion_tokens"] = usage.completion_tokens
+            scheduler.refund(reserved - usage.total_tokens)
+            scheduler.charge(usage.total_tokens - reserved)
+
+    if key and content:
+        response_cache.put(key, content)
+    return content
+
+
+def _stream_completion(model, messages, max_tokens, temperature, on_token, **extra):
+    """
+    Streams a chat completion token by token.
+    Args:
+        model (str): Model name.
+        messages (list of dict): Chat messages.
+        max_tokens (int): Maximum tokens in the response.
+        temperature (float): Sampling temperature.
+        on_token (callable): Called with the accumulated text after every received token.
+        **extra: Additional request parameters (e.g. response_format).
+    Returns:
+        tuple: The complete response content and the usage reported by the API (or None).
+    """
+    stream = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+        **extra,
+    )
+    text = ""
+    usage = None
+    for chunk in stream:
+        # The final chunk carries the token usage and no choices
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            # Extend the running text rather than re-joining every received piece per token
+            text += delta
+            on_token(text)
+    return text, usage
+
+
+def log_usage(model, usage):
+    """
+    Logs the tokens billed for a completion.
+    Args:
+        model (str): Model name.
+        usage: Usage object of the API response (may be None).
+    """
+    if usage is not None:
+        # Prompt tokens served from the provider's prompt cache (billed at a discount)
+        cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+        print(f"LLM usage ({model}): {usage.prompt_tokens} prompt ({cached} cached) + "
+              f"{usage.completion_tokens} completion tokens.")
+        inc("lecchurro_llm_tokens_total", usage.prompt_tokens, model=model, kind="prompt")
+        inc("lecchurro_llm_tokens_total", cached, model=model, kind="cached_prompt")
+        inc("lecchurro_llm_tokens_total", usage.completion_tokens, model=model, kind="completion")
@@ -0,0 +1,219 @@
+# src/core/materials.py
+import os
+import re
+import json
+
+from core.llm import chat_completion, lecture_messages
+from core.quizzes import QUIZ_SCHEMA, QuizStreamParser, validate_question, MAX_QUESTIONS
+from core.topics import TOPICS_SCHEMA, segment_topics, apply_topic_labels
+from core.timestamps import format_concept_groups_html
+from core.summaries import SUMMARY_ERROR
+
+# Generation settings of the single-call mode (also used to key cached materials)
+MATERIALS_MODEL = "gpt-4o"
+MATERIALS_TEMPERATURE = 0.5
+MATERIALS_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/lecture_materials_prompt.txt')
+
+# Structured output schema: every study material in one object. The summary comes first so it
+# can be shown while the rest is still streaming, then the quiz, which is parsed as it arrives.
+MATERIALS_SCHEMA = {
+    "name": "lecture_materials",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string"},
+            "quizzes": QUIZ_SCHEMA["schema"]["properties"]["quizzes"],
+            "flashcards": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "front": {"type": "string"},
+                        "back": {"type": "string"},
+                    },
+                    "required": ["front", "back"],
+                    "additionalProperties": False,
+                },
+            },
+            "topics": TOPICS_SCHEMA["schema"]["properties"]["topics"],
+        },
+        "required": ["summary", "quizzes", "flashcards", "topics"],
+        "additionalProperties": False,
+    },
+}
+
+# Start of the response up to the opening quote of the summary
+SUMMARY_START = re.compile(r'\s*\{\s*"summary"\s*:\s*"')
+
+# The "quizzes" key (an escaped one would be part of the summary text)
+QUIZZES_KEY = re.compile(r'(?<!\\)"quizzes"\s*:')
+
+
+def annotate_transcript(segments, groups):
+    """
+    Joins the segments into a transcript with a [t.s] marker where every sub-topic starts.
+    Args:
+        segments (list of dict): Segments with 'start' and 'text'.
+        groups (list of dict): Groups returned by segment_topics for the same segments.
+    Returns:
+        str: The annotated transcript.
+    """
+    markers = [(sub["start_time"], f"[{group_id}.{sub_id}]")
+               for group_id, group in enumerate(groups) for sub_id, sub in enumerate(group["segments"])]
+    parts = []
+    next_marker = 0
+    for segment in segments:
+        while next_marker < len(markers) and segment["start"] >= markers[next_marker][0]:
+            parts.append(markers[next_marker][1])
+            next_marker += 1
+        parts.append(segment["text"].strip())
+    return " ".join(part for part in parts if part)
+
+
+def _decode_partial_string(body, final=False):
+    """
+    Decodes a piece of the inside of a JSON string that may end in an incomplete escape sequence.
+    Args:
+        body (str): The raw string text, starting outside of any escape sequence.
+        final (bool): Whether the string ends with this piece.
+    Returns:
+        tuple: The decoded text and how many characters of body it covers (None and 0 if invalid).
+    """
+    # An escape sequence is at most 6 characters long ("\\uXXXX"), so at most 5 of them can be missing
+    for cut in range(6):
+        end = len(body) - cut
+        try:
+            decoded = json.loads('"' + body[:end] + '"')
+        except ValueError:
+            continue
+        # Hold back the first half of a surrogate pair until the second half arrives
+        if not final and decoded and "\ud800" <= decoded[-1] <= "\udbff" and body[end - 6:end - 4] == "\\u":
+            return decoded[:-1], end - 6
+        return decoded, end
+    return None, 0
+
+
+class MaterialsStreamParser:
+    """
+    Incremental parser for a streamed materials response: decodes the summary while it is
+    still being written, then hands the quiz over to a QuizStreamParser. Every call only
+    scans and decodes the newly received text.
+    """
+
+    def __init__(self):
+        self.summary = None
+        self.quiz = QuizStreamParser()
+        self._summary_end = None
+        self._pos = 0
+        self._decoded = 0 # End of the summary text decoded so far
+        self._escape = False
+        self._quizzes_found = False
+
+    def feed(self, text):
+        """
+        Parses the response received so far.
+        Args:
+            text (str): The whole response text so far (each call extends the previous one).
+        """
+        if self.summary is None:
+            match = SUMMARY_START.match(text)
+            if not match:
+                return
+            self.summary = ""
+            self._pos = self._decoded = match.end()
+
+        if self._summary_end is None:
+            i = self._pos
+            while i < len(text):
+                char = text[i]
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._summary_end = i
+                    break
+                i += 1
+            self._pos = i
+            decoded, used = _decode_partial_string(text[self._decoded:i], final=self._summary_end is not None)
+            if decoded:
+                self.summary += decoded
+                self._decoded += used
+            if self._summary_end is None:
+                return
+
+        if not self._quizzes_found:
+            match = QUIZZES_KEY.search(text, self._summary_end)
+            if not match:
+                return
+            self._quizzes_found = True
+            self.quiz = QuizStreamParser(start=match.end())
+        self.quiz.feed(text)
+
+
+def format_flashcards_text(cards):
+    """
+    Writes flashcards in the "Front: ... / Back: ..." text form used by the separate generation mode.
+    Args:
+        cards (list of dict): Cards with 'front' and 'back'.
+    Returns:
+        str: The flashcards text.
+    """
+    return "\n\n".join(f"Front: {' '.join(card['front'].split())}\nBack: {' '.join(card['back'].split())}"
+                       for card in cards
+                       if isinstance(card, dict) and card.get("front", "").strip() and card.get("back", "").strip())
+
+
+def generate_materials(transcription, segments, on_update=None):
+    """
+    Generates the summary, quiz, flashcards and conceptual timestamps of a lecture in a single
+    structured call, so the transcript is sent (and billed) once instead of once per material.
+    Topic boundaries are found locally and marked in the transcript; the model only names them.
+    Args:
+        transcription (str): The full transcription of the lecture.
+        segments (list of dict): Transcription segments with timestamps.
+        on_update (callable, optional): Called while the response streams in with a dict holding
+            the 'summary' so far (or None) and the valid 'quizzes' parsed so far.
+    Returns:
+        dict: 'summary' (Markdown), 'quizzes' (list of questions), 'flashcards' (text) and
+            'timestamps' (HTML). The summary is SUMMARY_ERROR if generation failed.
+    """
+    segments = [segment for segment in segments or [] if segment["text"].strip()]
+    groups = segment_topics(segments)
+    transcript = annotate_transcript(segments, groups) if segments else transcription
+
+    with open(MATERIALS_PROMPT_PATH, 'r', encoding='utf-8') as f:
+        instructions = f.read()
+
+    parser = MaterialsStreamParser()
+
+    def on_token(text):
+        parser.feed(text)
+        if on_update:
+            on_update({"summary": parser.summary, "quizzes": list(parser.quiz.questions)})
+
+    try:
+        response = chat_completion(
+            model=MATERIALS_MODEL,
+            messages=lecture_messages(transcript, instructions),
+            max_tokens=None, # Use whatever the context window leaves after the prompt
+            temperature=MATERIALS_TEMPERATURE,
+            on_token=on_token,
+            response_format={"type": "json_schema", "json_schema": MATERIALS_SCHEMA},
+        )
+        materials = json.loads(response)
+    except Exception as e:
+        print(f"Error generating lecture materials: {e}")
+        # The topics were found locally, so the timestamps survive with their keyword labels
+        return {"summary": SUMMARY_ERROR, "quizzes": [], "flashcards": "",
+                "timestamps": format_concept_groups_html(groups) if groups else ""}
+
+    quizzes = [question for question in map(validate_question, materials.get("quizzes") or []) if question]
+    return {
+        "summary": str(materials.get("summary", "")).strip() or SUMMARY_ERROR,
+        "quizzes": quizzes[:MAX_QUESTIONS],
+        "flashcards": format_flashcards_text(materials.get("flashcards") or []),
+        "timestamps": format_concept_groups_html(apply_topic_labels(groups, materials.get("topics") or []))
+                      if groups else "",
+    }
@@ -0,0 +1,295 @@
+# src/core/metrics.py
+import os
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from core.config import (METRICS_ENABLED, METRICS_FILE, METRICS_PORT, METRICS_FLUSH_SECONDS, TRACE_FILE,
+                         TRACE_MAX_BYTES)
+
+# Histogram buckets (in seconds) for span durations: from cache hits to hour-long transcriptions
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Innermost active span of the current thread or stage (spans opened inside it become its children)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters, gauges and histograms with labels, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, help=None, **labels):
+        """
+        Adds to a counter.
+        Args:
+            name (str): Metric name (should end in _total).
+            value (float): Amount added.
+            help (str, optional): Description shown in the exposition.
+            **labels: Label values.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def set_gauge(self, name, value, help=None, **labels):
+        """
+        Sets a gauge to its current value.
+        Args:
+            name (str): Metric name.
+            value (float): Current value.
+            help (str, optional): Description shown in the exposition.
+            **labels: Label values.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, help=None, **labels):
+        """
+        Records a value in a histogram.
+        Args:
+            name (str): Metric name.
+            value (float): Observed value.
+            buckets (tuple of float): Upper bounds of the buckets (used when the series is created).
+            help (str, optional): Description shown in the exposition.
+            **labels: Label values.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets),
+                                                     "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(histogram["buckets"], value)
+            if index < len(buckets):
+                histogram["counts"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+            if help:
+                self._help.setdefault(name, help)
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in series}):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{name}{labels_text(labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, labels), histogram in sorted(self._histograms.items()):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{labels_text(labels, [('le', f'{bound:g}')])} {cumulative}")
+                    lines.append(f"{name}_bucket{labels_text(labels, [('le', '+Inf')])} {histogram['count']}")
+                    lines.append(f"{name}_sum{labels_text(labels)} {histogram['sum']}")
+                    lines.append(f"{name}_count{labels_text(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Serializes trace writes from concurrent stages of this process
+_trace_lock = threading.Lock()
+
+
+def inc(name, value=1, **labels):
+    """Adds to a counter of the process-wide registry (no-op when metrics are disabled)."""
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    """Sets a gauge of the process-wide registry (no-op when metrics are disabled)."""
+    if METRICS_ENABLED:
+        registry.set_gauge(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """Records a histogram value in the process-wide registry (no-op when metrics are disabled)."""
+    if METRICS_ENABLED:
+        registry.observe(name, value, **labels)
+
+
+def start_span(name, parent=None, **attributes):
+    """
+    Opens a span without making it current, for work that spans generator yields
+    (where the consuming thread, and so the context, may change between steps).
+    Close it with end_span and pass it as `parent` to the spans opened inside it.
+    Args:
+        name (str): Span name.
+        parent (dict, optional): Parent span (defaults to the current span).
+        **attributes: Extra details stored with the trace.
+    Returns:
+        dict: The open span.
+    """
+    parent = parent or _current_span.get()
+    return {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "start": time.time(),
+        "attributes": attributes,
+        "_started": time.perf_counter(),
+    }
+
+
+def end_span(record, error=None):
+    """
+    Closes a span: records its duration in the lecchurro_span_seconds histogram and,
+    when TRACE_FILE is set, appends it to the trace file as one JSON line.
+    Args:
+        record (dict): Span returned by start_span.
+        error (str, optional): Error that ended the span.
+    """
+    if not METRICS_ENABLED:
+        return
+    duration = time.perf_counter() - record.pop("_started")
+    registry.observe("lecchurro_span_seconds", duration, help="Duration of instrumented work.",
+                     span=record["name"], status="error" if error else "ok")
+    if TRACE_FILE:
+        record.update(duration=duration, error=error)
+        _write_trace(record)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """
+    Times a block of work as a span. Spans opened inside the block (on the same thread,
+    or in stages started from it) become its children, so one trace shows e.g. each
+    LLM call inside the summary stage inside process_video.
+    Args:
+        name (str): Span name (e.g. "ffmpeg_decode", "llm_call").
+        parent (dict, optional): Parent span (defaults to the current span).
+        **attributes: Extra details stored with the trace (model, tokens, cache result...).
+    Yields:
+        dict: The span's attributes, which the block may extend.
+    """
+    if not METRICS_ENABLED:
+        yield attributes
+        return
+
+    record = start_span(name, parent, **attributes)
+    token = _current_span.set(record)
+    error = None
+    try:
+        yield record["attributes"]
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(record, error)
+
+
+def _write_trace(record):
+    """Appends one span to the JSON lines trace file, rotating it first if it would outgrow TRACE_MAX_BYTES."""
+    line = json.dumps(record, default=str) + "\n"
+    try:
+        with _trace_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+            size = os.path.getsize(TRACE_FILE) if os.path.exists(TRACE_FILE) else 0
+            if TRACE_MAX_BYTES and size and size + len(line.encode("utf-8")) > TRACE_MAX_BYTES:
+                # Keep a single previous file, so traces take at most twice TRACE_MAX_BYTES
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                f.write(line)
+    except OSError as e:
+        print(f"Error writing trace: {e}")
+
+
+def write_metrics_file(path=None):
+    """
+    Writes the current metrics to a file (atomically), e.g. for node_exporter's textfile collector.
+    Args:
+        path (str, optional): Destination (defaults to METRICS_FILE).
+    """
+    path = path or METRICS_FILE
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(registry.render())
+    os.replace(path + ".tmp", path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        payload = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_exporters():
+    """
+    Starts the configured metrics exporters in background threads: an HTTP /metrics
+    endpoint on METRICS_PORT and/or a periodically rewritten METRICS_FILE.
+    """
+    if not METRICS_ENABLED:
+        return
+    if METRICS_PORT:
+        server = ThreadingHTTPServer(("0.0.0.0", METRICS_PORT), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics available on http://0.0.0.0:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        def flush():
+            while True:
+                time.sleep(METRICS_FLUSH_SECONDS)
+                try:
+                    write_metrics_file()
+                except OSError as e:
+                    print(f"Error writing metrics file: {e}")
+        threading.Thread(target=flush, name="metrics-file", daemon=True).start()
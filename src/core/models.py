@@ -0,0 +1,71 @@
+# src/core/models.py
+import time
+import threading
+
+from core.backends import create_backend
+from core.metrics import span
+
+# Loaded transcription backends, keyed by their settings, and a loading lock per backend.
+# The registry lock is only held to look entries up, so building cache keys (load=False)
+# never waits for a model load, and loading one model never waits for another.
+_registry = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(name, settings):
+    """Builds the registry key of a backend configuration."""
+    return (name, tuple(sorted((key, value) for key, value in settings.items() if value is not None)))
+
+
+def get_transcriber(name=None, load=True, **settings):
+    """
+    Returns a transcription backend from the registry, creating it on first use.
+    The model itself is only loaded when `load` is True, so callers that only need
+    the backend's settings (e.g. to build cache keys) never pay for it.
+    Args:
+        name (str, optional): Backend name (defaults to TRANSCRIBE_BACKEND).
+        load (bool): Load the model before returning.
+        **settings: Overrides for model_size, compute_type, beam_size and threads.
+    Returns:
+        TranscriptionBackend: The shared backend instance.
+    """
+    key = _registry_key(name, settings)
+    with _registry_lock:
+        backend = _registry.get(key)
+        if backend is None:
+            backend = create_backend(name, **settings)
+            _registry[key] = backend
+            _load_locks[key] = threading.Lock()
+        load_lock = _load_locks[key]
+    if load and backend.model is None:
+        # Serialize loading so two concurrent first requests don't load the model twice
+        with load_lock:
+            if backend.model is None:
+                print(f"Loading {backend.name} model '{backend.model_size}'...")
+                started = time.perf_counter()
+                with span("model_load", backend=backend.name, model=backend.model_size):
+                    backend.load()
+                print(f"Transcription model loaded in {time.perf_counter() - started:.1f}s.")
+    return backend
+
+
+def warm_up(name=None, **settings):
+    """
+    Loads a transcription backend in a background thread so the UI can start immediately.
+    Args:
+        name (str, optional): Backend name (defaults to TRANSCRIBE_BACKEND).
+        **settings: Overrides for model_size, compute_type, beam_size and threads.
+    Returns:
+        threading.Thread: The (daemon) loading thread.
+    """
+    def load():
+        try:
+            get_transcriber(name, **settings)
+        except Exception as e:
+            print(f"Error warming up transcription model: {e}")
+
+    thread = threading.Thread(target=load, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
@@ -0,0 +1,800 @@
+# src/core/pipeline.py
+import os
+import time
+import threading
+import traceback
+import ffmpeg
+from concurrent.futures import ThreadPoolExecutor
+
+from core import summaries, quizzes as quizzes_module, flashcards as flashcards_module, timestamps, topics, materials
+from core.summaries import summarize_text, SUMMARY_ERROR
+from core.quizzes import generate_quiz
+from core.flashcards import generate_flashcards
+from core.timestamps import generate_conceptual_timestamps, TIMESTAMPS_ERROR
+from core.materials import generate_materials
+from core.concurrency import stream_concurrently
+from core.cache import ArtifactCache, hash_file
+from core.storage import StorageManager
+from core.audio import SAMPLE_RATE, probe_duration, stream_audio, save_wav, store_video
+from core.segment_store import write_segments, EXTENSION as SEGMENT_STORE_EXTENSION
+from core.transcription import transcribe_chunked, transcribe_windows
+from core.vad import speech_regions, SpeechMap
+from core.workers import transcription_pool, ServerBusy
+from core.tiers import select_tier, log_tier_decision, log_transcription, tier_transcriber
+from core.metrics import span, start_span, end_span, inc
+from core.config import (STAGE_TIMEOUTS, CACHE_ENABLED, CACHE_MAX_BYTES,
+                         AUDIO_STREAMING, PERSIST_WAV, VIDEO_STORAGE_MODE,
+                         TRANSCRIBE_WORKERS, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_OVERLAP_SECONDS,
+                         TRANSCRIBE_WINDOW_SECONDS, SUMMARY_MAP_REDUCE_THRESHOLD, SUMMARY_CHUNK_TOKENS,
+                         TIMESTAMPS_MODE, TOPIC_BLOCK_SEGMENTS, TOPIC_MIN_SECONDS, TOPIC_MAX_PER_HOUR,
+                         VAD_ENABLED, VAD_THRESHOLD_DB, VAD_MIN_SPEECH_SECONDS, VAD_MIN_SILENCE_SECONDS,
+                         VAD_PADDING_SECONDS, GENERATION_MODE, STORAGE_MAX_BYTES, STORAGE_MAX_VIDEO_BYTES,
+                         STORAGE_MAX_AUDIO_BYTES, TIER_UPGRADE_REGENERATE)
+
+# Directory paths for organizing data
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+AUDIO_DIR = os.path.join(DATA_DIR, 'audio')
+TEXT_DIR = os.path.join(ROOT_DIR, 'data', 'text_timestamps')
+VIDEO_DIR = os.path.join(DATA_DIR, 'video')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+STORAGE_DIR = os.path.join(DATA_DIR, 'storage')
+
+# Ensure required directories exist
+os.makedirs(AUDIO_DIR, exist_ok=True)
+os.makedirs(TEXT_DIR, exist_ok=True)
+os.makedirs(VIDEO_DIR, exist_ok=True)
+
+# Content-addressed cache so re-uploading a lecture skips every stage already computed
+artifact_cache = ArtifactCache(CACHE_DIR, CACHE_MAX_BYTES) if CACHE_ENABLED else None
+
+# Size index of the stored videos, WAVs and transcripts of every lecture, enforcing the storage quotas
+# (evicting a WAV also drops the artifact cache's hardlink of it, or no space would be freed)
+storage_manager = StorageManager(DATA_DIR, os.path.join(STORAGE_DIR, 'index.json'), STORAGE_MAX_BYTES,
+                                 {"video": STORAGE_MAX_VIDEO_BYTES, "audio": STORAGE_MAX_AUDIO_BYTES},
+                                 directories={VIDEO_DIR: "video", AUDIO_DIR: "audio", TEXT_DIR: "transcript"},
+                                 release_links=artifact_cache.release_links if artifact_cache else None)
+
+# Background transcript upgrades (TIER_UPGRADE), one at a time so they never crowd out new uploads
+upgrade_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcript-upgrade")
+_pending_upgrades = set()
+_pending_upgrades_lock = threading.Lock()
+# Called with (lecture, tier, segments) after every finished upgrade, e.g. to update the search index
+_upgrade_listeners = []
+
+# Stage graph, in dependency order: every stage lists the stages whose outputs it reads.
+# A stage output is keyed by the video, its own configuration and the keys of those stages,
+# so a configuration change invalidates exactly that stage and everything downstream of it.
+# (The stored copy of the video is the input itself, identified by its content hash.)
+STAGE_GRAPH = {
+    "audio": [],
+    "transcript": ["audio"],
+    "summary": ["transcript"],
+    "quizzes": ["transcript"],
+    "flashcards": ["transcript"],
+    "timestamps": ["transcript"],
+    "materials": ["transcript"],
+}
+
+
+def extract_audio(video_file_path, audio_file_path):
+    """
+    Extracts audio from a video file using FFmpeg.
+    Args:
+        video_file_path (str): Path to the input video file.
+        audio_file_path (str): Path to save the extracted audio file.
+    Returns:
+        bool: True if extraction succeeds, False otherwise.
+    """
+    print("Extracting audio with ffmpeg...")
+    try:
+        (
+            ffmpeg
+            .input(video_file_path)
+            .output(audio_file_path, format='wav', acodec='pcm_s16le', ac=1, ar='16k')
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        print("Audio extraction successful.")
+        return True
+    except Exception as e:
+        print(f"Error extracting audio: {e}")
+        traceback.print_exc()
+        return False
+
+
+def transcribe_audio(audio, on_segments=None, ticket=None, tier="standard"):
+    """
+    Transcribes audio using Whisper.
+    With VAD enabled, only the speech regions are transcribed and the segment times are
+    mapped back onto the original recording.
+    Args:
+        audio (str or np.ndarray): Path to the audio file, or 16 kHz mono float32 samples.
+        on_segments (callable, optional): Called with the segments transcribed so far, as they are produced.
+        ticket (Ticket, optional): Server mode job holding a transcription worker process.
+        tier (str): Transcription tier picking the model and decoding settings (see core/tiers.py).
+    Returns:
+        tuple: (transcription text, list of segments with timestamps).
+    """
+    if not VAD_ENABLED:
+        return transcribe_samples(audio, on_segments, ticket, tier)
+
+    samples = stream_audio(audio) if isinstance(audio, str) else audio
+    with span("vad") as attributes:
+        speech = SpeechMap(samples, speech_regions(samples))
+        attributes["audio_seconds"] = speech.total_seconds
+        attributes["speech_seconds"] = speech.speech_seconds
+    if not speech.speech_seconds:
+        # Better to let the model decide than to return an empty transcript
+        print("No speech detected by VAD, transcribing the whole recording.")
+        return transcribe_samples(samples, on_segments, ticket, tier)
+
+    skipped_seconds = speech.total_seconds - speech.speech_seconds
+    inc("lecchurro_vad_audio_seconds_total", speech.speech_seconds, kind="speech")
+    inc("lecchurro_vad_audio_seconds_total", skipped_seconds, kind="skipped")
+    print(f"VAD: transcribing {speech.speech_seconds:.0f}s of speech out of {speech.total_seconds:.0f}s "
+          f"({speech.skipped_ratio:.0%} skipped).")
+
+    start = time.perf_counter()
+    transcription, segments = transcribe_samples(
+        speech.samples, (lambda partial: on_segments(speech.remap_segments(partial))) if on_segments else None,
+        ticket, tier)
+    elapsed = time.perf_counter() - start
+
+    # Skipped audio would have cost the same per second as the speech that was transcribed
+    saved = elapsed / speech.speech_seconds * skipped_seconds
+    inc("lecchurro_vad_saved_seconds_total", saved)
+    print(f"VAD saved about {saved:.1f}s of transcription time.")
+    return transcription, speech.remap_segments(segments)
+
+
+def transcribe_samples(audio, on_segments=None, ticket=None, tier="standard"):
+    """
+    Transcribes audio with the configured engine: on a server mode worker process, chunked
+    across worker processes, window by window, or in a single pass.
+    Args:
+        audio (str or np.ndarray): Path to the audio file, or 16 kHz mono float32 samples.
+        on_segments (callable, optional): Called with the segments transcribed so far, as they are produced.
+        ticket (Ticket, optional): Server mode job holding a transcription worker process.
+        tier (str): Transcription tier picking the model and decoding settings (see core/tiers.py).
+    Returns:
+        tuple: (transcription text, list of segments with timestamps).
+    """
+    if ticket is not None:
+        # Server mode: the worker process reserved for this lecture already has the model loaded
+        # (other tiers' models are loaded by the worker on first use)
+        samples = stream_audio(audio) if isinstance(audio, str) else audio
+        transcription, segments = transcription_pool.transcribe(ticket, samples, on_segments,
+                                                                tier_transcriber(tier, load=False).settings())
+        print("Transcription complete.")
+        return transcription, segments
+
+    if TRANSCRIBE_WORKERS > 1:
+        # Long recordings are split into chunks and transcribed across several processes
+        samples = stream_audio(audio) if isinstance(audio, str) else audio
+        if len(samples) > TRANSCRIBE_CHUNK_SECONDS * SAMPLE_RATE:
+            transcription, segments = transcribe_chunked(
+                samples, tier_transcriber(tier, load=False).settings(), TRANSCRIBE_WORKERS,
+                chunk_seconds=TRANSCRIBE_CHUNK_SECONDS, overlap_seconds=TRANSCRIBE_OVERLAP_SECONDS,
+                on_segments=on_segments)
+            print("Transcription complete.")
+            return transcription, segments
+        audio = samples
+
+    # The model is usually warm already; on a cold start the first request loads it here
+    transcriber = tier_transcriber(tier)
+    print("Transcribing audio with Whisper...")
+    if not transcriber.streams_segments and TRANSCRIBE_WINDOW_SECONDS > 0:
+        # openai-whisper can't report progress, so transcribe window by window instead
+        samples = stream_audio(audio) if isinstance(audio, str) else audio
+        transcription, segments = transcribe_windows(transcriber, samples, TRANSCRIBE_WINDOW_SECONDS,
+                                                     on_segments=on_segments)
+    else:
+        result = transcriber.transcribe(audio, on_segments=on_segments)
+        transcription = result["text"]
+        segments = result["segments"]
+    print("Transcription complete.")
+    return transcription, segments
+
+
+def generate_summary_stage(transcription, segments, on_token=None):
+    """
+    Generates the lecture summary.
+    Args:
+        transcription (str): Full transcription text.
+        segments (list of dict): Transcription segments with timestamps.
+        on_token (callable, optional): Called with the summary so far while it streams in.
+    Returns:
+        str: The generated summary.
+    """
+    summary = summarize_text(transcription, segments, on_token=on_token)
+    print(f"Summary generated snippet: {summary[:100]}...")
+    return summary
+
+
+def generate_quiz_stage(transcription, on_questions=None):
+    """
+    Generates the quiz as a list of validated questions.
+    Args:
+        transcription (str): Full transcription text.
+        on_questions (callable, optional): Called with the questions parsed so far while the quiz streams in.
+    Returns:
+        list: Quiz questions, each a dict with 'question', 'options' and 'answer'.
+    """
+    quizzes = generate_quiz(transcription, on_questions=on_questions)
+    print(f"Quiz generated: {len(quizzes)} question(s).")
+    return quizzes
+
+
+def generate_timestamps_stage(transcription, segments):
+    """
+    Generates the conceptual timestamps HTML.
+    Args:
+        transcription (str): Full transcription text.
+        segments (list of dict): Transcription segments with timestamps.
+    Returns:
+        str: HTML-formatted conceptual timestamps.
+    """
+    return generate_conceptual_timestamps(transcription, segments) if segments else ""
+
+
+def stage_configs(tier="standard"):
+    """
+    Describes everything each pipeline stage depends on besides the input video.
+    Changing any of these values (model, temperature, prompt file) misses the cache for that stage.
+    Args:
+        tier (str): Transcription tier of the transcript (its backend settings are part of the key).
+    Returns:
+        dict: Mapping of stage name to its configuration.
+    """
+    transcriber = tier_transcriber(tier, load=False)
+    return {
+        "audio": {"format": "wav", "acodec": "pcm_s16le", "ac": 1, "ar": "16k"},
+        "transcript": {"backend": transcriber.settings(),
+                       "chunking": ([TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_OVERLAP_SECONDS]
+                                    if TRANSCRIBE_WORKERS > 1 else None),
+                       "vad": ([VAD_THRESHOLD_DB, VAD_MIN_SPEECH_SECONDS, VAD_MIN_SILENCE_SECONDS, VAD_PADDING_SECONDS]
+                               if VAD_ENABLED else None),
+                       "window": TRANSCRIBE_WINDOW_SECONDS if not transcriber.streams_segments else None},
+        "summary": {"model": summaries.SUMMARY_MODEL, "temperature": summaries.SUMMARY_TEMPERATURE,
+                    "prompt": hash_file(summaries.SUMMARY_PROMPT_PATH),
+                    "map_reduce": [SUMMARY_MAP_REDUCE_THRESHOLD, SUMMARY_CHUNK_TOKENS,
+                                   hash_file(summaries.SUMMARY_MAP_PROMPT_PATH),
+                                   hash_file(summaries.SUMMARY_REDUCE_PROMPT_PATH)],
+                    "generation_mode": GENERATION_MODE},
+        "quizzes": {"model": quizzes_module.QUIZ_MODEL, "temperature": quizzes_module.QUIZ_TEMPERATURE,
+                    "prompt": hash_file(quizzes_module.QUIZ_PROMPT_PATH), "schema": quizzes_module.QUIZ_SCHEMA,
+                    "generation_mode": GENERATION_MODE},
+        "flashcards": {"model": flashcards_module.FLASHCARDS_MODEL,
+                       "temperature": flashcards_module.FLASHCARDS_TEMPERATURE,
+                       "prompt": hash_file(flashcards_module.FLASHCARDS_PROMPT_PATH),
+                       "generation_mode": GENERATION_MODE},
+        "timestamps": {"model": timestamps.TIMESTAMPS_MODEL, "temperature": timestamps.TIMESTAMPS_TEMPERATURE,
+                       "prompt": hash_file(timestamps.TIMESTAMPS_PROMPT_PATH), "mode": TIMESTAMPS_MODE,
+                       "topics": [TOPIC_BLOCK_SEGMENTS, TOPIC_MIN_SECONDS, TOPIC_MAX_PER_HOUR,
+                                  topics.TOPICS_MODEL, topics.TOPICS_TEMPERATURE,
+                                  hash_file(topics.TOPICS_PROMPT_PATH)]},
+        "materials": {"model": materials.MATERIALS_MODEL, "temperature": materials.MATERIALS_TEMPERATURE,
+                      "prompt": hash_file(materials.MATERIALS_PROMPT_PATH), "schema": materials.MATERIALS_SCHEMA,
+                      "topics": [TOPIC_BLOCK_SEGMENTS, TOPIC_MIN_SECONDS, TOPIC_MAX_PER_HOUR]},
+    }
+
+
+def stage_keys(video_key, configs=None):
+    """
+    Fingerprints every stage output of a video by walking the stage graph.
+    Args:
+        video_key (str): Content hash of the video.
+        configs (dict, optional): Stage configurations (defaults to the current stage_configs()).
+    Returns:
+        dict: Mapping of stage name to the cache key of its output.
+    """
+    configs = configs or stage_configs()
+    keys = {}
+    for stage, dependencies in STAGE_GRAPH.items():
+        # Stages with inputs also hash their inputs' keys (a source stage is keyed by its config alone)
+        config = [configs[stage]] + [keys[name] for name in dependencies] if dependencies else configs[stage]
+        keys[stage] = artifact_cache.stage_key(video_key, stage, config)
+    return keys
+
+
+def output_stages():
+    """
+    Returns:
+        list of str: The stages whose outputs a processed lecture needs with the current GENERATION_MODE.
+    """
+    if GENERATION_MODE == "combined":
+        return ["transcript", "materials"]
+    return ["transcript", "summary", "quizzes", "flashcards", "timestamps"]
+
+
+def stale_stages(keys):
+    """
+    Works out which stages have to run to bring a lecture up to date: every output stage
+    whose artifact is missing, plus every missing stage one of those reads from.
+    Args:
+        keys (dict): Cache keys of the video's stages, as returned by stage_keys.
+    Returns:
+        list of str: The stages to run, in dependency order (empty if the lecture is up to date).
+    """
+    needed = set()
+
+    def need(stage):
+        if stage in needed or artifact_cache.contains(keys[stage]):
+            return
+        needed.add(stage)
+        for dependency in STAGE_GRAPH[stage]:
+            need(dependency)
+
+    for stage in output_stages():
+        need(stage)
+    return [stage for stage in STAGE_GRAPH if stage in needed]
+
+
+def store_file(lecture, kind, path):
+    """
+    Records a file written under the data directory and evicts older lectures' media if a
+    storage quota is exceeded (the lecture itself is kept).
+    Args:
+        lecture (str): Lecture name (the video's file name without extension).
+        kind (str): "video", "audio" or "transcript" (see core/storage.py).
+        path (str): Path of the file.
+    """
+    storage_manager.record(lecture, kind, path)
+    storage_manager.enforce(protect=lecture)
+
+
+def queue_depth():
+    """
+    Returns:
+        int: Lectures waiting for a transcription worker (always 0 outside server mode).
+    """
+    if transcription_pool is None or not transcription_pool.started:
+        return 0
+    return transcription_pool.stats()["waiting"]
+
+
+def rebuild_plan(video_file):
+    """
+    Lists the stages that processing a video again would recompute.
+    Args:
+        video_file (str): Path to the video file.
+    Returns:
+        list of str or None: Stale stages in dependency order, or None when the artifact cache is disabled.
+    """
+    if artifact_cache is None:
+        return None
+    # Plan for the final transcript tier, i.e. the one a background upgrade would end with
+    tier = select_tier(probe_duration(video_file), queue_depth(), upgrade=False)["tier"]
+    return stale_stages(stage_keys(artifact_cache.video_key(video_file), stage_configs(tier)))
+
+
+def cached_stage(keys, stage, compute, is_valid=lambda value: value is not None, parent=None):
+    """
+    Runs a pipeline stage through the artifact cache (or directly when caching is disabled).
+    Args:
+        keys (dict or None): Cache keys of the current video's stages.
+        stage (str): Name of the stage.
+        compute (callable): Produces the stage output on a cache miss.
+        is_valid (callable): Decides whether the output may be cached.
+        parent (dict, optional): Trace span the stage belongs to.
+    Returns:
+        object: The stage output.
+    """
+    with span(f"{stage}_stage", parent=parent) as attributes:
+        if artifact_cache is None or keys is None:
+            return compute()
+        computed = []
+
+        def compute_on_miss():
+            computed.append(True)
+            return compute()
+
+        value = artifact_cache.get_or_compute(keys[stage], compute_on_miss, is_valid)
+        attributes["cache"] = "miss" if computed else "hit"
+        inc("lecchurro_artifact_cache_total", stage=stage, result=attributes["cache"])
+        return value
+
+
+def process_video_stream(video_file):
+    """
+    Processes the uploaded video and reports every artifact as soon as it is available.
+    The transcript is reported while it is being transcribed, then the summary, quizzes,
+    flashcards and timestamps stages run concurrently; streamed LLM output is reported
+    token by token.
+    Args:
+        video_file (str): Path to the uploaded video file.
+    Yields:
+        tuple: (kind, stage, value) events where kind is "partial" (progress), "done" (final
+            output of a stage) or "error" (the pipeline stopped; value is the error message).
+            Stages are "video", "tier" (the transcription tier decision, see core/tiers.py), "queue"
+            (server mode queue position), "transcript", "summary", "quizzes", "flashcards" and "timestamps".
+    """
+    trace = start_span("process_video", video=os.path.basename(video_file or ""))
+    tickets = []
+    error = None
+    try:
+        for event in _process_video_events(video_file, trace, tickets):
+            if event[0] == "error":
+                error = event[2]
+            yield event
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        # Give up the transcription queue place or worker if processing stopped early
+        for ticket in tickets:
+            transcription_pool.release(ticket)
+        end_span(trace, error)
+
+
+def _process_video_events(video_file, trace, tickets):
+    """
+    Produces the events of process_video_stream.
+    Args:
+        video_file (str): Path to the uploaded video file.
+        trace (dict): Root trace span of this video; every stage span is opened under it.
+        tickets (list): Transcription queue tickets taken in server mode are appended here
+            so the caller can release them however the generator ends.
+    Yields:
+        tuple: (kind, stage, value) events, see process_video_stream.
+    """
+    print(f"Processing video file: {video_file}")
+
+    # Validate video file
+    if not video_file or not os.path.isfile(video_file):
+        print("Invalid video file path.")
+        yield "error", "video", "Error extracting audio."
+        return
+
+    # Pick the transcription tier from the lecture's length and the transcription queue
+    duration = probe_duration(video_file)
+    depth = queue_depth()
+    decision = select_tier(duration, depth)
+
+    # Work out the cache keys of every stage from the video contents and the stage configuration
+    keys = None
+    upgraded_keys = None
+    cached_transcript = None
+    if artifact_cache is not None:
+        video_key = artifact_cache.video_key(video_file)
+        if decision["upgrade"]:
+            # An upgrade finished for an earlier upload of this lecture beats a new draft
+            upgraded_keys = stage_keys(video_key, stage_configs(decision["upgrade"]))
+            cached_transcript = artifact_cache.get_json(upgraded_keys["transcript"])
+            if cached_transcript is not None:
+                keys = upgraded_keys
+                decision = dict(decision, tier=decision["upgrade"], upgrade=None)
+        if keys is None:
+            keys = stage_keys(video_key, stage_configs(decision["tier"]))
+            cached_transcript = artifact_cache.get_json(keys["transcript"])
+        inc("lecchurro_artifact_cache_total", stage="transcript",
+            result="hit" if cached_transcript is not None else "miss")
+    log_tier_decision(decision, duration, depth)
+    yield "done", "tier", decision
+
+    video_filename = os.path.basename(video_file)
+    video_path = os.path.join(VIDEO_DIR, video_filename)
+    lecture = os.path.splitext(video_filename)[0]
+
+    if cached_transcript is not None:
+        # The transcript is cached, so the copy, ffmpeg and Whisper stages can all be skipped
+        print("Cache hit: transcript, skipping audio extraction and transcription.")
+        transcription, segments = cached_transcript["text"], cached_transcript["segments"]
+        if not os.path.isfile(video_path):
+            video_path = video_file
+        storage_manager.touch(lecture)
+        # Nothing was decoded; an upgrade decodes the cached WAV, or the video if the WAV is gone
+        cached_audio = artifact_cache.get_path(keys["audio"]) if keys else None
+        upgrade_audio = [path for path in (cached_audio, video_path, video_file) if path]
+        yield "done", "video", video_path
+    else:
+        # In server mode, claim a place in the transcription queue before doing any work
+        ticket = None
+        if transcription_pool is not None and transcription_pool.started:
+            try:
+                ticket = transcription_pool.admit()
+            except ServerBusy as e:
+                yield "error", "queue", str(e)
+                return
+            tickets.append(ticket)
+
+        # Save the video to the designated directory (hardlinked or referenced rather than copied)
+        with span("copy_video", parent=trace, mode=VIDEO_STORAGE_MODE):
+            video_path = store_video(video_file, video_path, mode=VIDEO_STORAGE_MODE)
+        print(f"Video saved to: {video_path}")
+        store_file(lecture, "video", video_path)
+        yield "done", "video", video_path
+
+        # Extract audio from the video (or reuse the cached WAV)
+        audio_filename = os.path.splitext(video_filename)[0] + ".wav"
+        audio = artifact_cache.get_path(keys["audio"]) if keys else None
+        if audio is None and AUDIO_STREAMING:
+            # Decode straight into memory; the WAV is only written when explicitly requested
+            try:
+                print("Streaming audio from ffmpeg...")
+                with span("ffmpeg_decode", parent=trace) as attributes:
+                    audio = stream_audio(video_path)
+                    attributes["audio_seconds"] = len(audio) / SAMPLE_RATE
+            except Exception as e:
+                print(f"Error extracting audio: {e}")
+                traceback.print_exc()
+                yield "error", "audio", "Error extracting audio."
+                return
+            if PERSIST_WAV:
+                audio_path = os.path.join(AUDIO_DIR, audio_filename)
+                with span("save_wav", parent=trace):
+                    save_wav(audio, audio_path)
+                store_file(lecture, "audio", audio_path)
+                if keys:
+                    artifact_cache.put_file(keys["audio"], audio_path)
+        elif audio is None:
+            audio = os.path.join(AUDIO_DIR, audio_filename)
+            with span("ffmpeg_extract", parent=trace) as attributes:
+                success = extract_audio(video_path, audio)
+                attributes["success"] = success
+
+            if not success:
+                yield "error", "audio", "Error extracting audio."
+                return
+            store_file(lecture, "audio", audio)
+            if keys:
+                artifact_cache.put_file(keys["audio"], audio)
+
+        if ticket is not None:
+            # Report the lecture's queue position until a transcription worker is free for it
+            position = None
+            while not transcription_pool.wait_turn(ticket, timeout=1.0):
+                if transcription_pool.position(ticket) != position:
+                    position = transcription_pool.position(ticket)
+                    yield "partial", "queue", position
+
+        # Transcribe the audio on a worker thread, reporting segments while they are produced
+        def transcribe(emit):
+            with span("transcribe", parent=trace, tier=decision["tier"]) as attributes:
+                started = time.perf_counter()
+                transcript = transcribe_audio(audio, on_segments=emit, ticket=ticket, tier=decision["tier"])
+                attributes["segments"] = len(transcript[1])
+                log_transcription(decision["tier"], tier_transcriber(decision["tier"], load=False),
+                                  len(audio) / SAMPLE_RATE if not isinstance(audio, str) else duration or 0.0,
+                                  time.perf_counter() - started)
+                return transcript
+
+        result = None
+        for kind, _, value in stream_concurrently({"transcript": (transcribe, None)}):
+            if kind == "partial":
+                yield "partial", "transcript", value
+            else:
+                result = value
+        if result is None:
+            yield "error", "transcript", "Error transcribing audio."
+            return
+        transcription, segments = result
+        # An upgrade reuses the decoded samples, or decodes the WAV again (the video if the WAV was evicted)
+        upgrade_audio = [audio, video_path, video_file] if isinstance(audio, str) else audio
+        print(f"Transcription snippet: {transcription[:100]}...")
+        print(f"First 3 segments: {segments[:3]}...")
+
+        if keys:
+            artifact_cache.put_json(keys["transcript"], {"text": transcription, "segments": segments})
+
+    # Keep a compact, memory-mappable copy of the segments with the other transcripts
+    store_path = os.path.join(TEXT_DIR, os.path.splitext(video_filename)[0] + SEGMENT_STORE_EXTENSION)
+    try:
+        write_segments(store_path, segments)
+        store_file(lecture, "transcript", store_path)
+    except Exception as e:
+        print(f"Error writing segment store: {e}")
+
+    yield "done", "transcript", segments
+
+    upgrade = None
+    if decision["upgrade"]:
+        # The draft is out; transcribe the lecture again with the chosen tier in the background
+        upgrade = schedule_upgrade(upgrade_audio, decision["upgrade"], upgraded_keys, store_path, transcription)
+        if upgrade is None:
+            # An earlier upload of this lecture has one pending already, which this session won't hear about
+            yield "done", "tier", dict(decision, upgrade=None)
+
+    yield from _generate_stages(transcription, segments, keys, trace)
+
+    # The upgrade is not waited for: it updates the cache, the segment store and the search index by itself.
+    # Only if it already ended (e.g. a short lecture, or it failed) does this session learn the outcome.
+    if upgrade is not None and upgrade.done():
+        upgraded = upgrade.result()
+        if upgraded is None:
+            yield "done", "tier", dict(decision, upgrade=None)
+        else:
+            yield "done", "tier", dict(decision, tier=decision["upgrade"], upgrade=None)
+            yield "done", "transcript", upgraded[1]
+
+
+def _generate_stages(transcription, segments, keys, trace):
+    """
+    Generates the study materials of a transcript, separately or with a single call (GENERATION_MODE).
+    Args:
+        transcription (str): Full transcription text.
+        segments (list of dict): Transcription segments with timestamps.
+        keys (dict or None): Cache keys of the transcript's stages.
+        trace (dict): Root trace span of this video.
+    Yields:
+        tuple: (kind, stage, value) events, see process_video_stream.
+    """
+    if GENERATION_MODE == "combined":
+        yield from _generate_combined(transcription, segments, keys, trace)
+        return
+
+    # Run the independent generation stages concurrently on the same transcript
+    yield from stream_concurrently(
+        {
+            "summary": (lambda emit: cached_stage(keys, "summary",
+                                                  lambda: generate_summary_stage(transcription, segments, emit),
+                                                  lambda value: value is not None and value != SUMMARY_ERROR,
+                                                  trace),
+                        None),
+            "quizzes": (lambda emit: cached_stage(keys, "quizzes", lambda: generate_quiz_stage(transcription, emit), bool,
+                                                  trace),
+                        None),
+            "flashcards": (lambda emit: cached_stage(keys, "flashcards",
+                                                     lambda: generate_flashcards(transcription, on_token=emit), bool,
+                                                     trace),
+                           None),
+            "timestamps": (lambda emit: cached_stage(keys, "timestamps",
+                                                     lambda: generate_timestamps_stage(transcription, segments),
+                                                     lambda value: bool(value) and value != TIMESTAMPS_ERROR,
+                                                     trace),
+                           TIMESTAMPS_ERROR),
+        },
+        timeouts=STAGE_TIMEOUTS,
+    )
+
+
+def _generate_combined(transcription, segments, keys, trace):
+    """
+    Generates every study material with a single LLM call (GENERATION_MODE=combined) and
+    reports it as the events of the separate summary, quizzes, flashcards and timestamps stages.
+    Args:
+        transcription (str): Full transcription text.
+        segments (list of dict): Transcription segments with timestamps.
+        keys (dict or None): Cache keys of the current video's stages.
+        trace (dict): Root trace span of this video.
+    Yields:
+        tuple: (kind, stage, value) events, see process_video_stream.
+    """
+    result = None
+    for kind, _, value in stream_concurrently(
+            {"materials": (lambda emit: cached_stage(keys, "materials",
+                                                     lambda: generate_materials(transcription, segments, emit),
+                                                     lambda value: value and value["summary"] != SUMMARY_ERROR,
+                                                     trace),
+                           None)},
+            timeouts=STAGE_TIMEOUTS):
+        if kind == "partial":
+            # Every update carries everything parsed so far, so dropped updates lose nothing
+            if value["summary"] is not None:
+                yield "partial", "summary", value["summary"]
+            if value["quizzes"]:
+                yield "partial", "quizzes", value["quizzes"]
+        else:
+            result = value
+
+    if result is None:
+        # Same fallbacks as failed separate stages
+        result = {"summary": None, "quizzes": None, "flashcards": None, "timestamps": TIMESTAMPS_ERROR}
+    for stage in ("summary", "quizzes", "flashcards", "timestamps"):
+        yield "done", stage, result[stage]
+
+
+def add_upgrade_listener(callback):
+    """
+    Registers a function called after every finished transcript upgrade.
+    Args:
+        callback (callable): Called with (lecture, tier, segments) on the upgrade thread.
+    """
+    _upgrade_listeners.append(callback)
+
+
+def schedule_upgrade(audio, tier, keys, store_path, draft_text=None):
+    """
+    Queues the background pass that replaces a draft transcript with one of a better tier.
+    The upgraded transcript is cached under that tier's keys, so the next time the lecture is
+    processed (or batch.py --rebuild runs) it is used instead of the draft; the segment store
+    is replaced and the upgrade listeners (the search index) are told right away. With
+    TIER_UPGRADE_REGENERATE, a transcript that changed also has its study materials regenerated.
+    Args:
+        audio (np.ndarray or list of str): The draft's 16 kHz samples, or audio or video files to decode
+            them from, tried in order (the WAV may have been evicted by the time the upgrade runs).
+        tier (str): Tier of the upgraded transcript.
+        keys (dict or None): Cache keys of the upgraded tier's stages (None when caching is disabled).
+        store_path (str): Segment store of the lecture.
+        draft_text (str, optional): Text of the draft, to tell whether the upgrade changed anything.
+    Returns:
+        Future or None: The queued upgrade, or None if this lecture already has one pending.
+    """
+    with _pending_upgrades_lock:
+        if store_path in _pending_upgrades:
+            return None
+        _pending_upgrades.add(store_path)
+    inc("lecchurro_transcript_upgrades_total", tier=tier, result="queued")
+    return upgrade_executor.submit(_upgrade_transcript, audio, tier, keys, store_path, draft_text)
+
+
+def _upgrade_transcript(audio, tier, keys, store_path, draft_text=None):
+    """
+    Runs one background transcript upgrade (see schedule_upgrade).
+    Args:
+        audio (np.ndarray or list of str): The draft's samples, or files to decode them from.
+        tier (str): Tier of the upgraded transcript.
+        keys (dict or None): Cache keys of the upgraded tier's stages.
+        store_path (str): Segment store of the lecture.
+        draft_text (str, optional): Text of the draft.
+    Returns:
+        tuple or None: (transcription text, segments) of the upgraded transcript, or None if the upgrade failed.
+    """
+    lecture = os.path.splitext(os.path.basename(store_path))[0]
+    ticket = None
+    try:
+        with span("transcript_upgrade", video=lecture, tier=tier) as attributes:
+            if transcription_pool is not None and transcription_pool.started:
+                # Queue behind the uploads already waiting, on the same worker processes
+                ticket = transcription_pool.admit()
+                transcription_pool.wait_turn(ticket)
+            samples = audio
+            if isinstance(audio, list):
+                sources = [path for path in audio if os.path.isfile(path)]
+                if not sources:
+                    raise FileNotFoundError(f"no audio or video left to decode ({', '.join(audio)})")
+                samples = stream_audio(sources[0])
+            started = time.perf_counter()
+            transcription, segments = transcribe_audio(samples, ticket=ticket, tier=tier)
+            log_transcription(tier, tier_transcriber(tier, load=False), len(samples) / SAMPLE_RATE,
+                              time.perf_counter() - started)
+            attributes["segments"] = len(segments)
+
+            if keys:
+                artifact_cache.put_json(keys["transcript"], {"text": transcription, "segments": segments})
+            write_segments(store_path, segments)
+            store_file(lecture, "transcript", store_path)
+        print(f"Transcript of {lecture} upgraded to tier '{tier}'.")
+        inc("lecchurro_transcript_upgrades_total", tier=tier, result="done")
+        for listener in _upgrade_listeners:
+            try:
+                listener(lecture, tier, segments)
+            except Exception as e:
+                print(f"Error notifying transcript upgrade of {lecture}: {e}")
+
+        if TIER_UPGRADE_REGENERATE and keys and transcription != draft_text:
+            # Only worth the LLM calls when the words changed; the results land in the cache
+            for kind, stage, _ in _generate_stages(transcription, segments, keys, None):
+                if kind == "done":
+                    print(f"Regenerated {stage} of {lecture} from the upgraded transcript.")
+        return transcription, segments
+    except Exception as e:
+        # ServerBusy included: the draft stays, and the next upload of the lecture tries again
+        print(f"Error upgrading transcript of {lecture}: {e}")
+        inc("lecchurro_transcript_upgrades_total", tier=tier, result="failed")
+        return None
+    finally:
+        if ticket is not None:
+            transcription_pool.release(ticket)
+        with _pending_upgrades_lock:
+            _pending_upgrades.discard(store_path)
+
+
+def process_video(video_file):
+    """
+    Processes the uploaded video to extract and analyze its content.
+    Args:
+        video_file (str): Path to the uploaded video file.
+    Returns:
+        tuple: Paths and generated data (video path, summary, segments, quizzes, flashcards, timestamps HTML).
+    """
+    outputs = {}
+    for kind, stage, value in process_video_stream(video_file):
+        if kind == "error":
+            return value, None, None, None, None, None
+        if kind == "done":
+            outputs[stage] = value
+
+    return (outputs.get("video"), outputs.get("summary"), outputs.get("transcript"), outputs.get("quizzes"),
+            outputs.get("flashcards"), outputs.get("timestamps"))
@@ -1,49 +1,207 @@
 # src/core/quizzes.py
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import json
+from core.llm import chat_completion, lecture_messages, TRANSCRIPT_ABOVE
+from core.config import GENERATION_MODE
 
-# Load environment variables from the .env file to access API keys or other configurations
-load_dotenv()
-
-# Initialize OpenAI client with the API key
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 # Maximum number of quiz questions to generate
 MAX_QUESTIONS = 50  # Adjustable
 
+# Generation settings (also used to key cached quizzes)
+QUIZ_MODEL = "gpt-4o"
+QUIZ_TEMPERATURE = 0.7
+QUIZ_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/quiz_generation_json.txt')
+
+# Structured output schema: the model must answer with {"quizzes": [{question, options, answer}, ...]}
+QUIZ_SCHEMA = {
+    "name": "quiz",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "quizzes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "question": {"type": "string"},
+                        "options": {"type": "array", "items": {"type": "string"}},
+                        "answer": {"type": "string"},
+                    },
+                    "required": ["question", "options", "answer"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["quizzes"],
+        "additionalProperties": False,
+    },
+}
 
-def generate_quiz(transcription_text):
+
+def validate_question(item):
+    """
+    Checks one generated question and normalizes it.
+    Args:
+        item (object): Parsed question object.
+    Returns:
+        dict or None: The question with 'question', 'options' and 'answer', or None if it is unusable.
+    """
+    if not isinstance(item, dict):
+        return None
+    question = item.get("question")
+    options = item.get("options")
+    answer = item.get("answer")
+    if not isinstance(question, str) or not question.strip() or not isinstance(answer, str):
+        return None
+    if not isinstance(options, list) or len(options) not in (2, 4) or not all(isinstance(o, str) for o in options):
+        return None
+    options = [option.strip() for option in options]
+    if len(set(options)) != len(options):
+        return None
+    # The answer must be one of the options (tolerating case and surrounding whitespace)
+    matches = [option for option in options if option.lower() == answer.strip().lower()]
+    if not matches:
+        return None
+    return {"question": question.strip(), "options": options, "answer": matches[0]}
+
+
+class QuizStreamParser:
+    """
+    Incremental parser for a streamed quiz response. It scans only the newly received
+    text on every call and hands back each question object as soon as its closing brace
+    arrives. Invalid questions are dropped one by one instead of failing the whole quiz.
+    """
+
+    def __init__(self, start=0):
+        """
+        Args:
+            start (int): Offset in the response where the scan begins (e.g. past a preceding field).
+        """
+        self.questions = []
+        self.dropped = 0
+        self._pos = start
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+
+    def feed(self, text):
+        """
+        Parses the response received so far.
+        Args:
+            text (str): The whole response text so far (each call extends the previous one).
+        Returns:
+            list of dict: Questions completed by this call (already validated).
+        """
+        completed = []
+        i = self._pos
+        while i < len(text) and not self._done:
+            char = text[i]
+            if not self._in_array:
+                # The question list is the first JSON array of the response
+                self._in_array = char == "["
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    question = self._parse_item(text[self._item_start:i + 1])
+                    if question is not None:
+                        completed.append(question)
+                    self._item_start = None
+            elif char == "]" and self._depth == 0:
+                self._done = True
+            i += 1
+        self._pos = i
+        self.questions.extend(completed)
+        return completed
+
+    def _parse_item(self, item_text):
+        """Decodes and validates one question object, counting it as dropped on failure."""
+        try:
+            question = validate_question(json.loads(item_text))
+        except ValueError:
+            question = None
+        if question is None:
+            self.dropped += 1
+            print(f"Dropped invalid quiz question: {item_text[:100]}...")
+        return question
+
+
+def parse_quiz_response(text):
+    """
+    Parses a complete quiz response.
+    Args:
+        text (str): Model output containing the question list.
+    Returns:
+        list of dict: The valid questions.
+    """
+    parser = QuizStreamParser()
+    parser.feed(text)
+    return parser.questions
+
+
+def generate_quiz(transcription_text, on_questions=None):
     """
     Generates a quiz based on the provided lecture transcription using OpenAI's API.
+    The response follows QUIZ_SCHEMA and is parsed while it streams in.
     Args:
         transcription_text (str): The lecture transcription text to generate quiz questions from.
+        on_questions (callable, optional): Called with the valid questions parsed so far
+            every time another one is complete.
     Returns:
-        str: Raw quiz text as a JSON-formatted string containing questions and answers.
+        list of dict: Valid questions, each with 'question', 'options' and 'answer'.
     """
-    # Get the directory of this script and construct the relative path for the quiz prompt file
-    current_dir = os.path.dirname(os.path.abspath(__file__))  # Get the directory of this script
-    prompt_file_path = os.path.join(current_dir, 'prompts/quiz_generation_json.txt')  # Combine directory with the file name
-
     # Read the quiz generation prompt template from the file
-    with open(prompt_file_path, 'r', encoding='utf-8') as file:
+    with open(QUIZ_PROMPT_PATH, 'r', encoding='utf-8') as file:
         prompt_template = file.read()
 
-    # Replace the placeholder in the prompt template with the actual transcription text
-    prompt = prompt_template.replace("TRANSCRIPTION_HERE", transcription_text)
-
-    # Send the formatted prompt to OpenAI's API (gpt4o) to generate the quiz
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+    if GENERATION_MODE == "shared_prefix":
+        # The transcript leads the request, shared with the summary and flashcards requests
+        messages = lecture_messages(transcription_text, prompt_template.replace("TRANSCRIPTION_HERE", TRANSCRIPT_ABOVE))
+    else:
+        # Replace the placeholder in the prompt template with the actual transcription text
+        prompt = prompt_template.replace("TRANSCRIPTION_HERE", " ".join(transcription_text.split()))
+        messages = [
             {"role": "system", "content": "You are an expert teacher skilled in producing detailed and correct student assessments."},
             {"role": "user", "content": prompt}
-        ],
-        max_tokens=14000, # Maximum tokens for response
-        temperature=0.7, # Controls creativity in response
+        ]
+
+    parser = QuizStreamParser()
+
+    def on_token(text):
+        # Report the quiz every time the stream completes another question
+        if parser.feed(text) and on_questions:
+            on_questions(list(parser.questions))
+
+    # Send the formatted prompt to OpenAI's API (gpt4o) to generate the quiz
+    response = chat_completion(
+        model=QUIZ_MODEL,
+        messages=messages,
+        max_tokens=None, # Use whatever the context window leaves after the prompt
+        temperature=QUIZ_TEMPERATURE, # Controls creativity in response
+        on_token=on_token,
+        response_format={"type": "json_schema", "json_schema": QUIZ_SCHEMA},
     )
-    # Extract and return the generated quiz text
-    quiz = response.choices[0].message.content.strip()
-    return quiz
+    # Parse whatever the stream did not deliver token by token (e.g. a cached response)
+    parser.feed(response)
+    if parser.dropped:
+        print(f"Dropped {parser.dropped} invalid quiz question(s), kept {len(parser.questions)}.")
+    return parser.questions[:MAX_QUESTIONS]
 
 def grade_quizzes(*args):
     """
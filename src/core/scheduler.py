@@ -0,0 +1,283 @@
+# src/core/scheduler.py
+import time
+import heapq
+import random
+import itertools
+import threading
+
+from core.metrics import inc, observe, set_gauge
+from core.config import (LLM_RPM, LLM_TPM, LLM_RATE_SHARE, LLM_MAX_RETRIES,
+                         LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, LLM_PRIORITY)
+
+# Request priorities: lower values are served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Client-side failures that carry no status code but are transient
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "Timeout", "ConnectionError"}
+
+
+class TokenBucket:
+    """
+    Continuously refilling token bucket holding at most one minute's worth of capacity.
+    """
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        """
+        Args:
+            per_minute (float): Tokens added per minute (0 disables the limit).
+            clock (callable): Monotonic time source, replaceable in tests.
+        """
+        self.per_minute = per_minute
+        self.clock = clock
+        self.level = float(per_minute)
+        self.updated = clock()
+
+    def _refill(self):
+        """Adds the tokens accumulated since the last update."""
+        now = self.clock()
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Args:
+            amount (float): Tokens needed.
+        Returns:
+            float: Seconds until `amount` tokens are available (0 if they already are).
+        """
+        if not self.per_minute:
+            return 0.0
+        self._refill()
+        # A request larger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.per_minute)
+        return max(0.0, (amount - self.level) * 60.0 / self.per_minute)
+
+    def take(self, amount):
+        """
+        Removes tokens from the bucket (the level may go negative for oversized requests).
+        Args:
+            amount (float): Tokens consumed.
+        """
+        if self.per_minute:
+            self._refill()
+            self.level -= amount
+
+    def refund(self, amount):
+        """
+        Returns unused tokens to the bucket.
+        Args:
+            amount (float): Tokens given back.
+        """
+        if self.per_minute and amount > 0:
+            self._refill()
+            self.level = min(self.per_minute, self.level + amount)
+
+
+class RequestScheduler:
+    """
+    Central admission point for LLM requests. Requests wait in a priority queue
+    until both the requests-per-minute and tokens-per-minute buckets allow them,
+    and failed requests are retried with jittered exponential backoff, honouring
+    the server's Retry-After header. A rate-limit response pauses every request,
+    not only the one that received it.
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rpm (float): Requests per minute (0 disables the limit).
+            tpm (float): Tokens per minute (0 disables the limit).
+            max_retries (int): Retries after the first attempt before giving up.
+            backoff_base (float): Delay in seconds before the first retry.
+            backoff_max (float): Upper bound on a single retry delay.
+            clock (callable): Monotonic time source, replaceable in tests.
+            sleep (callable): Sleep function used between retries, replaceable in tests.
+        """
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self._queue = []
+        self._order = itertools.count()
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def queue_depth(self):
+        """
+        Returns:
+            int: Number of requests waiting for admission.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def acquire(self, tokens, priority="interactive"):
+        """
+        Blocks until the request may be sent, serving higher priorities (then arrival order) first.
+        Args:
+            tokens (int): Tokens the request is expected to consume.
+            priority (str): "interactive" or "batch".
+        """
+        entry = (PRIORITIES.get(priority, 0), next(self._order))
+        queued = self.clock()
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            set_gauge("lecchurro_llm_queue_depth", len(self._queue))
+            try:
+                while True:
+                    if self._queue[0] == entry:
+                        wait = max(self._paused_until - self.clock(),
+                                   self.requests.wait_time(1),
+                                   self.tokens.wait_time(tokens))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            observe("lecchurro_llm_queue_wait_seconds", self.clock() - queued, priority=priority)
+                            return
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                set_gauge("lecchurro_llm_queue_depth", len(self._queue))
+                self._condition.notify_all()
+
+    def refund(self, tokens):
+        """
+        Gives back tokens that were reserved but not used (e.g. an unused completion budget).
+        Args:
+            tokens (int): Unused tokens.
+        """
+        with self._condition:
+            self.tokens.refund(tokens)
+            self._condition.notify_all()
+
+    def charge(self, tokens):
+        """
+        Takes tokens a request used beyond what it reserved (e.g. a completion longer than expected).
+        Args:
+            tokens (int): Extra tokens used.
+        """
+        if tokens > 0:
+            with self._condition:
+                self.tokens.take(tokens)
+
+    def pause(self, seconds):
+        """
+        Holds every queued request for a while, e.g. after the server reported a rate limit.
+        Args:
+            seconds (float): Pause duration.
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+    def backoff_delay(self, attempt, error=None):
+        """
+        Computes the delay before a retry: the server's Retry-After when given,
+        otherwise exponential backoff with full jitter.
+        Args:
+            attempt (int): Number of the failed attempt (0 for the first).
+            error (Exception, optional): The error that caused the retry.
+        Returns:
+            float: Seconds to wait.
+        """
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def submit(self, call, tokens, priority="interactive"):
+        """
+        Runs a request under the rate limits, retrying transient failures.
+        Args:
+            call (callable): Sends the request and returns its result.
+            tokens (int): Tokens the request is expected to consume.
+            priority (str): "interactive" or "batch".
+        Returns:
+            object: The result of `call`.
+        Raises:
+            Exception: The last error once retries are exhausted, or any non-retryable error.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens, priority)
+            try:
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                inc("lecchurro_llm_retries_total", status=status_code(e) or type(e).__name__)
+                if status_code(e) == 429:
+                    self.pause(delay)
+                print(f"LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries}).")
+                self.sleep(delay)
+                attempt += 1
+
+
+def status_code(error):
+    """
+    Args:
+        error (Exception): Error raised by the API client.
+    Returns:
+        int or None: The HTTP status of the failed response, if any.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(error):
+    """
+    Args:
+        error (Exception): Error raised by the API client.
+    Returns:
+        bool: True for rate limits, timeouts, connection errors and server errors.
+    """
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after_seconds(error):
+    """
+    Reads the server's requested retry delay from a failed response.
+    Args:
+        error (Exception): Error raised by the API client.
+    Returns:
+        float or None: Seconds to wait, or None if the server did not say.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                # HTTP-date form of Retry-After, not used by the OpenAI API
+                continue
+    return None
+
+
+scheduler = RequestScheduler(
+    rpm=LLM_RPM * LLM_RATE_SHARE,
+    tpm=LLM_TPM * LLM_RATE_SHARE,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+)
+
+# Priority of requests that don't ask for one ("batch" in batch worker processes)
+DEFAULT_PRIORITY = LLM_PRIORITY
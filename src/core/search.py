@@ -0,0 +1,301 @@
+# src/core/search.py
+import os
+import re
+import html
+import math
+import pickle
+import threading
+
+import numpy as np
+
+from core.segment_store import SegmentStore, EXTENSION as SEGMENT_STORE_EXTENSION
+from core.metrics import span
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words are lowercase runs of letters and digits (keeping contractions like "it's" together)
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+# Bumped whenever the pickled layout changes, so old snapshots are rebuilt instead of misread
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase words.
+    Args:
+        text (str): Text to tokenize.
+    Returns:
+        list of str: The words, in order.
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Splits a query into quoted phrases and free terms.
+    Args:
+        query (str): Search query, e.g. 'complete the square "partial fractions"'.
+    Returns:
+        tuple: (list of phrases, each a list of words; list of all words to score on).
+    """
+    phrases = [tokenize(phrase) for phrase in PHRASE_PATTERN.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    return phrases, tokenize(PHRASE_PATTERN.sub(" ", query)) + [word for phrase in phrases for word in phrase]
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over the transcript segments of every processed lecture.
+    Each segment is a document; postings map a term to the segments containing it and
+    the word positions inside them, which answers BM25-ranked term queries and exact
+    phrase queries. Lectures can be added and removed at any time, and the index can
+    be snapshotted to disk and kept in sync with the segment stores. Ranking works on
+    NumPy copies of the postings (segment ids, term frequencies and segment lengths),
+    built the first time a term is searched and dropped whenever its postings change.
+    """
+
+    def __init__(self):
+        self.postings = {}  # term -> {doc id: positions}
+        self.docs = {}  # doc id -> (lecture, start, end, text, length)
+        self.lectures = {}  # lecture -> {"docs": [doc ids], "source": path, "mtime": float, "video": path}
+        self.total_length = 0
+        self._next_doc = 0
+        self._arrays = {}  # term -> (doc ids, term frequencies, segment lengths), see _term_arrays
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add_lecture(self, lecture, segments, source=None, mtime=None, video=None):
+        """
+        Indexes (or re-indexes) the segments of a lecture.
+        Args:
+            lecture (str): Lecture identifier (the video's file name without extension).
+            segments (iterable): Segments with 'start', 'end' and 'text' (dicts or Segment views).
+            source (str, optional): Segment store the lecture was read from.
+            mtime (float, optional): Modification time of the source when it was indexed.
+            video (str, optional): Path of the lecture's video.
+        """
+        with self._lock:
+            self.remove_lecture(lecture)
+            doc_ids = []
+            for segment in segments:
+                if isinstance(segment, dict):
+                    start, end, text = segment["start"], segment["end"], segment["text"]
+                else:
+                    start, end, text = segment.start, segment.end, segment.text
+                words = tokenize(text)
+                if not words:
+                    continue
+                doc_id = self._next_doc
+                self._next_doc += 1
+                positions = {}
+                for position, word in enumerate(words):
+                    positions.setdefault(word, []).append(position)
+                for word, word_positions in positions.items():
+                    self.postings.setdefault(word, {})[doc_id] = tuple(word_positions)
+                    self._arrays.pop(word, None)
+                self.docs[doc_id] = (lecture, round(float(start), 2), round(float(end), 2), text.strip(), len(words))
+                self.total_length += len(words)
+                doc_ids.append(doc_id)
+            self.lectures[lecture] = {"docs": doc_ids, "source": source, "mtime": mtime, "video": video}
+
+    def remove_lecture(self, lecture):
+        """
+        Drops a lecture from the index.
+        Args:
+            lecture (str): Lecture identifier.
+        Returns:
+            bool: True if the lecture was indexed.
+        """
+        with self._lock:
+            entry = self.lectures.pop(lecture, None)
+            if entry is None:
+                return False
+            for doc_id in entry["docs"]:
+                _, _, _, text, length = self.docs.pop(doc_id)
+                self.total_length -= length
+                for word in set(tokenize(text)):
+                    self._arrays.pop(word, None)
+                    postings = self.postings.get(word)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self.postings[word]
+            return True
+
+    def _term_arrays(self, word):
+        """
+        Returns the postings of a term as arrays for vectorized scoring (caller holds the lock).
+        Returns:
+            tuple: (np.ndarray of doc ids, np.ndarray of term frequencies, np.ndarray of segment lengths).
+        """
+        arrays = self._arrays.get(word)
+        if arrays is None:
+            postings = self.postings[word]
+            doc_ids = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter((len(positions) for positions in postings.values()), dtype=np.float64,
+                                      count=len(postings))
+            lengths = np.fromiter((self.docs[doc_id][4] for doc_id in postings), dtype=np.float64,
+                                  count=len(postings))
+            arrays = self._arrays[word] = (doc_ids, frequencies, lengths)
+        return arrays
+
+    def _has_phrase(self, doc_id, phrase):
+        """Checks whether a segment contains the words of a phrase consecutively."""
+        first = self.postings[phrase[0]][doc_id]
+        following = [set(self.postings[word][doc_id]) for word in phrase[1:]]
+        return any(all(start + offset + 1 in positions for offset, positions in enumerate(following))
+                   for start in first)
+
+    def search(self, query, limit=20):
+        """
+        Finds the segments best matching a query.
+        Quoted phrases must appear verbatim in a segment; every word is scored with BM25.
+        Args:
+            query (str): Search query.
+            limit (int): Maximum number of results.
+        Returns:
+            list of dict: Results with 'lecture', 'start', 'end', 'text', 'score' and 'video', best first.
+        """
+        phrases, words = parse_query(query)
+        with span("search", terms=len(words), phrases=len(phrases)), self._lock:
+            if not words or not self.docs:
+                return []
+            candidates = None
+            for phrase in phrases:
+                if any(word not in self.postings for word in phrase):
+                    return []
+                # Only segments holding every word of the phrase can match it
+                docs = set.intersection(*(set(self.postings[word]) for word in phrase))
+                docs = {doc_id for doc_id in docs if self._has_phrase(doc_id, phrase)}
+                candidates = docs if candidates is None else candidates & docs
+
+            if candidates is not None:
+                if not candidates:
+                    return []
+                candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+            count = len(self.docs)
+            average_length = self.total_length / count
+            matched, contributions = [], []
+            for word in set(words):
+                if word not in self.postings:
+                    continue
+                doc_ids, tf, lengths = self._term_arrays(word)
+                idf = math.log(1 + (count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                if candidates is not None:
+                    # With a phrase, only its (usually few) matching segments need scoring
+                    keep = np.isin(doc_ids, candidates)
+                    doc_ids, tf, lengths = doc_ids[keep], tf[keep], lengths[keep]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+                matched.append(doc_ids)
+                contributions.append(idf * tf * (BM25_K1 + 1) / (tf + norm))
+            if not matched:
+                return []
+
+            # Sum every term's score per segment, then keep the best `limit` (ties go to the earlier segment)
+            doc_ids, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(contributions))
+            best = np.argpartition(-scores, limit - 1)[:limit] if limit < len(scores) else np.arange(len(scores))
+            best = best[np.lexsort((doc_ids[best], -scores[best]))]
+
+            results = []
+            for doc_id, score in zip(doc_ids[best].tolist(), scores[best].tolist()):
+                lecture, start, end, text, _ = self.docs[doc_id]
+                results.append({"lecture": lecture, "start": start, "end": end, "text": text, "score": score,
+                                "video": self.lectures[lecture]["video"]})
+            return results
+
+    def sync(self, directory):
+        """
+        Brings the index up to date with the segment stores of a directory: new or
+        rewritten stores are (re)indexed and lectures whose store disappeared are removed.
+        Args:
+            directory (str): Directory holding <lecture>.seg files.
+        Returns:
+            bool: True if the index changed.
+        """
+        stores = {}
+        for filename in os.listdir(directory):
+            if filename.endswith(SEGMENT_STORE_EXTENSION):
+                path = os.path.join(directory, filename)
+                stores[os.path.splitext(filename)[0]] = (path, os.path.getmtime(path))
+
+        changed = False
+        with self._lock:
+            for lecture in [lecture for lecture, entry in self.lectures.items()
+                            if entry["source"] and lecture not in stores]:
+                changed |= self.remove_lecture(lecture)
+            for lecture, (path, mtime) in stores.items():
+                entry = self.lectures.get(lecture)
+                if entry is not None and entry["mtime"] is not None and entry["mtime"] >= mtime:
+                    continue
+                try:
+                    self.add_lecture(lecture, SegmentStore.open(path), source=path, mtime=mtime,
+                                     video=entry["video"] if entry else None)
+                    changed = True
+                except (OSError, ValueError) as e:
+                    print(f"Error indexing {path}: {e}")
+        return changed
+
+    def save(self, path):
+        """
+        Writes a snapshot of the index (atomically) so it loads quickly on the next start.
+        Args:
+            path (str): Snapshot file.
+        """
+        with self._lock:
+            state = (SNAPSHOT_VERSION, self.postings, self.docs, self.lectures, self.total_length, self._next_doc)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a snapshot written by save.
+        Args:
+            path (str): Snapshot file.
+        Returns:
+            SearchIndex: The loaded index, or an empty one if the snapshot is missing or outdated.
+        """
+        index = cls()
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return index
+        if state[0] == SNAPSHOT_VERSION:
+            _, index.postings, index.docs, index.lectures, index.total_length, index._next_doc = state
+        return index
+
+
+def format_search_results(results, query):
+    """
+    Renders search results as HTML with the same clickable seek points as the Timestamps tab.
+    Args:
+        results (list of dict): Results returned by SearchIndex.search.
+        query (str): The query, whose words are highlighted.
+    Returns:
+        str: HTML list of results.
+    """
+    if not results:
+        return "<p>No matching segments.</p>"
+    words = set(parse_query(query)[1])
+    items = []
+    for result in results:
+        minutes, seconds = divmod(int(result["start"]), 60)
+        # Highlight the query words in the (escaped) segment text
+        text = "".join(f"<mark>{html.escape(part)}</mark>" if part.lower() in words else html.escape(part)
+                       for part in re.split(r"([A-Za-z0-9]+(?:'[A-Za-z]+)?)", result["text"]))
+        items.append(
+            f"<li><a href='#' class='timestamp-link' data-time='{result['start']:.2f}' "
+            f"data-lecture='{html.escape(result['lecture'], quote=True)}'>"
+            f"<b>{html.escape(result['lecture'])} [{minutes:02d}:{seconds:02d}]</b></a>: {text}</li>")
+    return "<ul>" + "".join(items) + "</ul>"
@@ -0,0 +1,263 @@
+# src/core/segment_store.py
+import os
+import sys
+import csv
+import json
+import struct
+import threading
+import numpy as np
+
+# File layout: a fixed header followed by one array per column, each aligned to 8 bytes.
+#   start, end       float32[n]      segment times in seconds
+#   token_offsets    uint32[n + 1]   segment i owns tokens[token_offsets[i]:token_offsets[i + 1]]
+#   tokens           int32[t]        token ids of every segment, concatenated
+#   text_offsets     uint32[n + 1]   segment i owns text[text_offsets[i]:text_offsets[i + 1]]
+#   text             uint8[b]        UTF-8 text of every segment, concatenated
+MAGIC = b"LCSEG\x00\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")  # magic, version, segment count, token count, text bytes
+ALIGNMENT = 8
+
+# Extension of segment store files
+EXTENSION = ".seg"
+
+
+def _layout(count, token_count, text_bytes):
+    """
+    Computes where every column lives in the file.
+    Args:
+        count (int): Number of segments.
+        token_count (int): Total number of token ids.
+        text_bytes (int): Total size of the UTF-8 text.
+    Returns:
+        tuple: (dict of column name to (byte offset, dtype, length), total file size).
+    """
+    columns = (("start", np.float32, count), ("end", np.float32, count),
+               ("token_offsets", np.uint32, count + 1), ("tokens", np.int32, token_count),
+               ("text_offsets", np.uint32, count + 1), ("text", np.uint8, text_bytes))
+    layout = {}
+    offset = HEADER.size
+    for name, dtype, length in columns:
+        offset += -offset % ALIGNMENT
+        layout[name] = (offset, dtype, length)
+        offset += np.dtype(dtype).itemsize * length
+    return layout, offset
+
+
+class Segment:
+    """
+    Lightweight view of one segment of a SegmentStore. Fields are read from the
+    store's columns on access, so creating a view copies nothing.
+    """
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index
+
+    @property
+    def start(self):
+        return float(self._store.starts[self.index])
+
+    @property
+    def end(self):
+        return float(self._store.ends[self.index])
+
+    @property
+    def text(self):
+        return self._store.text(self.index)
+
+    @property
+    def tokens(self):
+        return self._store.tokens(self.index)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The segment as a Whisper-style dict ('id', 'start', 'end', 'text', 'tokens').
+        """
+        return {"id": self.index, "start": self.start, "end": self.end, "text": self.text,
+                "tokens": self.tokens.tolist()}
+
+    def __repr__(self):
+        return f"Segment({self.index}, {self.start:.2f}-{self.end:.2f}, {self.text[:40]!r})"
+
+
+class SegmentStore:
+    """
+    Read-only, column-oriented transcript segments backed by a byte buffer, usually a
+    memory-mapped file: opening a store reads only the header, and each column is a
+    zero-copy NumPy view that is paged in when it is first touched.
+    """
+
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer (np.ndarray): uint8 buffer holding a store file (e.g. a np.memmap).
+        Raises:
+            ValueError: If the buffer is not a segment store of a supported version.
+        """
+        magic, version, count, token_count, text_bytes = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a segment store file (or an unsupported version).")
+        layout, size = _layout(count, token_count, text_bytes)
+        if len(buffer) < size:
+            raise ValueError("Truncated segment store file.")
+        self._buffer = buffer
+        self._layout = layout
+        self._count = count
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-maps a store file.
+        Args:
+            path (str): Path of the .seg file.
+        Returns:
+            SegmentStore: The store.
+        """
+        return cls(np.memmap(path, dtype=np.uint8, mode='r'))
+
+    def _column(self, name):
+        offset, dtype, length = self._layout[name]
+        return np.frombuffer(self._buffer, dtype=dtype, count=length, offset=offset)
+
+    @property
+    def starts(self):
+        """np.ndarray: Start times (float32) of every segment."""
+        return self._column("start")
+
+    @property
+    def ends(self):
+        """np.ndarray: End times (float32) of every segment."""
+        return self._column("end")
+
+    @property
+    def token_ids(self):
+        """np.ndarray: Token ids (int32) of all segments, concatenated."""
+        return self._column("tokens")
+
+    def tokens(self, index):
+        """
+        Args:
+            index (int): Segment index.
+        Returns:
+            np.ndarray: The segment's token ids (a view, not a copy).
+        """
+        offsets = self._column("token_offsets")
+        return self._column("tokens")[offsets[index]:offsets[index + 1]]
+
+    def text(self, index):
+        """
+        Args:
+            index (int): Segment index.
+        Returns:
+            str: The segment's text.
+        """
+        offsets = self._column("text_offsets")
+        return self._column("text")[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def full_text(self):
+        """
+        Returns:
+            str: The text of every segment, concatenated (the transcript).
+        """
+        return self._column("text").tobytes().decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("segment index out of range")
+        return Segment(self, index)
+
+    def __iter__(self):
+        return (Segment(self, index) for index in range(self._count))
+
+    def to_dicts(self):
+        """
+        Returns:
+            list of dict: Every segment as a Whisper-style dict.
+        """
+        return [segment.to_dict() for segment in self]
+
+
+def write_segments(path, segments):
+    """
+    Writes segments to a store file (atomically).
+    Args:
+        path (str): Destination .seg file.
+        segments (iterable): Segments with 'start', 'end', 'text' and optionally 'tokens'
+            (Whisper's result["segments"] dicts, or Segment views).
+    Returns:
+        int: Size of the written file in bytes.
+    """
+    starts, ends, token_lists, texts = [], [], [], []
+    for segment in segments:
+        get = segment.get if isinstance(segment, dict) else lambda key, default=None: getattr(segment, key, default)
+        starts.append(get("start"))
+        ends.append(get("end"))
+        token_lists.append(np.asarray(get("tokens") if get("tokens") is not None else [], dtype=np.int32))
+        texts.append((get("text") or "").encode("utf-8"))
+
+    count = len(starts)
+    token_offsets = np.zeros(count + 1, dtype=np.uint32)
+    token_offsets[1:] = np.cumsum([len(tokens) for tokens in token_lists])
+    text_offsets = np.zeros(count + 1, dtype=np.uint32)
+    text_offsets[1:] = np.cumsum([len(text) for text in texts])
+    columns = {
+        "start": np.asarray(starts, dtype=np.float32),
+        "end": np.asarray(ends, dtype=np.float32),
+        "token_offsets": token_offsets,
+        "tokens": np.concatenate(token_lists) if token_lists else np.zeros(0, dtype=np.int32),
+        "text_offsets": text_offsets,
+        "text": np.frombuffer(b"".join(texts), dtype=np.uint8),
+    }
+    layout, size = _layout(count, int(token_offsets[-1]), int(text_offsets[-1]))
+
+    # Several writers can replace the same store (an upload, its background upgrade, a live session)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, int(token_offsets[-1]), int(text_offsets[-1])))
+        for name, (offset, dtype, _) in layout.items():
+            # Pad up to the column's aligned offset
+            f.write(b"\x00" * (offset - f.tell()))
+            f.write(columns[name].astype(dtype, copy=False).tobytes())
+    os.replace(tmp_path, path)
+    return size
+
+
+def convert_csv(csv_path, store_path=None):
+    """
+    Converts a transcript CSV (a pandas dump of Whisper segments, with the token list
+    stringified in the 'tokens' column) into a segment store.
+    Args:
+        csv_path (str): Path of the CSV file (e.g. data/text_timestamps/<lecture>.txt).
+        store_path (str, optional): Destination (defaults to the CSV path with a .seg extension).
+    Returns:
+        str: Path of the written store.
+    """
+    store_path = store_path or os.path.splitext(csv_path)[0] + EXTENSION
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        segments = [{"start": float(row["start"]), "end": float(row["end"]), "text": row["text"],
+                     # "[50364, 4027, ...]" is valid JSON, which parses much faster than literal_eval
+                     "tokens": json.loads(row["tokens"]) if row.get("tokens") else []}
+                    for row in csv.DictReader(f)]
+    write_segments(store_path, segments)
+    return store_path
+
+
+if __name__ == "__main__":
+    # Usage (from src/): python -m core.segment_store [csv ...]  (defaults to data/text_timestamps/*.txt)
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    text_dir = os.path.join(root_dir, 'data', 'text_timestamps')
+    paths = sys.argv[1:] or sorted(os.path.join(text_dir, f) for f in os.listdir(text_dir) if f.endswith(".txt"))
+    for csv_path in paths:
+        store_path = convert_csv(csv_path)
+        print(f"{os.path.basename(csv_path)}: {os.path.getsize(csv_path)} bytes -> "
+              f"{os.path.basename(store_path)}: {os.path.getsize(store_path)} bytes "
+              f"({len(SegmentStore.open(store_path))} segments)")
@@ -0,0 +1,326 @@
+# src/core/storage.py
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from core.cache import file_lock, file_signature
+from core.metrics import inc, set_gauge
+
+# Kinds of files kept per lecture. Only the first two are ever evicted, in this order:
+# raw media can be uploaded again, and a WAV can be decoded again from the video.
+# "other" counts files that can't be rebuilt, such as bundled sample recordings.
+KINDS = ("video", "audio", "transcript", "other")
+EVICTION_ORDER = ("video", "audio")
+
+# Extension of the audio files the pipeline decodes from videos
+WAV_EXTENSION = ".wav"
+
+
+class StorageManager:
+    """
+    Per-lecture size index of the data directories, with quotas and LRU eviction.
+
+    The pipeline records every file it writes under the data directory against its lecture
+    and kind, and the index keeps running totals per kind, so checking the quotas after an
+    upload takes constant time instead of a scan of the tree. Over quota, the raw videos of
+    the least recently used lectures are deleted first, then their WAVs; transcripts (and the
+    study materials, which live in the artifact cache) are never evicted. Each evictable kind
+    keeps its own LRU queue of the lectures holding such files, so eviction only visits the
+    lectures it actually frees space from. Processes sharing the data directory (e.g. batch
+    workers) merge their changes into the index on disk under a file lock.
+    """
+
+    def __init__(self, data_dir, index_path, max_bytes=0, max_kind_bytes=None, directories=None,
+                 release_links=None):
+        """
+        Args:
+            data_dir (str): Data directory; only files under it are tracked.
+            index_path (str): JSON file holding the index.
+            max_bytes (int): Quota of all tracked files together in bytes (0 for no quota).
+            max_kind_bytes (dict, optional): Quotas of single kinds, e.g. {"video": ...} (0 for no quota).
+            directories (dict, optional): Directory -> kind of the files in it, scanned once to
+                build the index when there is none yet (files written before tracking started).
+            release_links (callable, optional): Called with the path of a file about to be evicted
+                that has other hardlinks, to drop the ones it owns (e.g. the artifact cache's copy).
+        """
+        self.data_dir = os.path.abspath(data_dir)
+        self.index_path = index_path
+        self.lock_path = index_path + ".lock"
+        self.max_bytes = max_bytes
+        self.max_kind_bytes = {kind: limit for kind, limit in (max_kind_bytes or {}).items() if limit}
+        self.release_links = release_links
+        self._lock = threading.RLock()
+        # name -> {"last_access": float, "files": {path relative to data_dir: [kind, size]}}
+        self._lectures = {}
+        self._totals = dict.fromkeys(KINDS, 0)
+        # Per evictable kind, the lectures holding files of that kind, least recently used first
+        self._queues = {kind: OrderedDict() for kind in EVICTION_ORDER}
+        # Changes not yet merged into the index on disk
+        self._dirty = set()
+        self._removed = set()
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with file_lock(self.lock_path):
+            self._signature = file_signature(index_path)
+            lectures = self._read_index()
+        if lectures is not None:
+            self._adopt(lectures)
+        elif directories:
+            self._scan(directories)
+
+    # ---------------------------------------------------------------- tracking
+
+    def record(self, lecture, kind, path):
+        """
+        Records (or updates the size of) a file of a lecture and marks the lecture as used.
+        Args:
+            lecture (str): Lecture name (the video's file name without extension).
+            kind (str): One of KINDS.
+            path (str): Path of the file; files outside the data directory (e.g. a video
+                referenced in place) take no space here and are ignored.
+        """
+        path = os.path.abspath(path)
+        if not path.startswith(self.data_dir + os.sep) or not os.path.isfile(path):
+            return
+        relative = os.path.relpath(path, self.data_dir)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._add_file(lecture, relative, kind, size)
+            self._touch(lecture)
+            self._save_index()
+        self._update_gauges()
+
+    def touch(self, lecture):
+        """
+        Marks a lecture as used, moving it to the back of the eviction order.
+        Args:
+            lecture (str): Lecture name.
+        """
+        with self._lock:
+            if lecture in self._lectures:
+                self._touch(lecture)
+                self._save_index()
+
+    def files(self, lecture, kind=None):
+        """
+        Args:
+            lecture (str): Lecture name.
+            kind (str, optional): Only list files of this kind.
+        Returns:
+            list of str: Absolute paths of the lecture's tracked files.
+        """
+        with self._lock:
+            entry = self._lectures.get(lecture, {"files": {}})
+            return [os.path.join(self.data_dir, relative) for relative, (file_kind, _) in entry["files"].items()
+                    if kind is None or file_kind == kind]
+
+    def usage(self):
+        """
+        Returns:
+            dict: Bytes used per kind, plus 'total'.
+        """
+        with self._lock:
+            return dict(self._totals, total=sum(self._totals.values()))
+
+    # ------------------------------------------------------------------ quotas
+
+    def over_quota(self):
+        """
+        Checks every quota against the running totals (constant time).
+        Returns:
+            bool: True if any quota is exceeded.
+        """
+        with self._lock:
+            if self.max_bytes and sum(self._totals.values()) > self.max_bytes:
+                return True
+            return any(self._totals[kind] > limit for kind, limit in self.max_kind_bytes.items())
+
+    def enforce(self, protect=None):
+        """
+        Evicts files until every quota holds: videos of the least recently used lectures
+        first, then their WAVs. Returns immediately when no quota is exceeded. A file whose
+        bytes are still held by another hardlink (after release_links) is kept and stays
+        counted, since deleting it would free nothing.
+        Args:
+            protect (str, optional): Lecture whose files must stay (e.g. the one being processed).
+        Returns:
+            int: Bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            if not self.over_quota():
+                return 0
+            for kind in EVICTION_ORDER:
+                emptied = []
+                for lecture in self._queues[kind]:
+                    if not self._needs_room(kind):
+                        break
+                    if lecture != protect:
+                        lecture_freed, kept = self._evict(lecture, kind)
+                        freed += lecture_freed
+                        if not kept:
+                            emptied.append(lecture)
+                for lecture in emptied:
+                    del self._queues[kind][lecture]
+            if self.over_quota():
+                print(f"Storage quota still exceeded after eviction ({self._format_usage()}); transcripts, "
+                      f"the lecture being processed and files hardlinked elsewhere are kept.")
+            self._save_index()
+        self._update_gauges()
+        return freed
+
+    def _needs_room(self, kind):
+        """Whether evicting files of `kind` still brings a quota closer to holding."""
+        if self._totals[kind] > self.max_kind_bytes.get(kind, float("inf")):
+            return True
+        return bool(self.max_bytes) and sum(self._totals.values()) > self.max_bytes
+
+    def _evict(self, lecture, kind):
+        """
+        Deletes the files of one kind of a lecture (the caller updates the queue).
+        Returns:
+            tuple: (bytes freed, whether a file was kept because another hardlink holds its bytes).
+        """
+        entry = self._lectures[lecture]
+        freed = 0
+        kept = False
+        for relative, (file_kind, size) in list(entry["files"].items()):
+            if file_kind != kind:
+                continue
+            path = os.path.join(self.data_dir, relative)
+            if self._links(path) > 1 and self.release_links:
+                self.release_links(path)
+            if self._links(path) > 1:
+                # Another name (e.g. the upload a linked video came from) still holds the bytes
+                kept = True
+                continue
+            try:
+                os.remove(path)
+                print(f"Evicted {kind} of lecture '{lecture}': {relative} ({size / 1024 ** 2:.1f} MiB)")
+            except FileNotFoundError:
+                pass # Already gone; only the index entry is left to drop
+            del entry["files"][relative]
+            self._removed.add((lecture, relative))
+            self._dirty.add(lecture)
+            self._totals[kind] -= size
+            freed += size
+        if freed:
+            inc("lecchurro_storage_evicted_bytes_total", freed, kind=kind)
+        return freed, kept
+
+    @staticmethod
+    def _links(path):
+        """Number of hardlinks of a file (0 if it is gone)."""
+        try:
+            return os.stat(path).st_nlink
+        except FileNotFoundError:
+            return 0
+
+    # ------------------------------------------------------------------- index
+
+    def _add_file(self, lecture, relative, kind, size):
+        """Adds or resizes a file in the index and the running totals (caller holds the lock)."""
+        entry = self._lectures.setdefault(lecture, {"last_access": 0.0, "files": {}})
+        previous = entry["files"].get(relative)
+        if previous:
+            self._totals[previous[0]] -= previous[1]
+        entry["files"][relative] = [kind, size]
+        self._totals[kind] += size
+        if kind in self._queues:
+            self._queues[kind][lecture] = True
+        self._removed.discard((lecture, relative))
+        self._dirty.add(lecture)
+
+    def _touch(self, lecture, when=None):
+        """Moves a lecture to the most recently used end of every queue (caller holds the lock)."""
+        self._lectures[lecture]["last_access"] = when or time.time()
+        self._dirty.add(lecture)
+        for queue in self._queues.values():
+            if lecture in queue:
+                queue.move_to_end(lecture)
+
+    def _format_usage(self):
+        """Describes the bytes used per kind."""
+        return ", ".join(f"{kind} {size / 1024 ** 3:.2f} GiB" for kind, size in self._totals.items())
+
+    def _update_gauges(self):
+        """Publishes the bytes used per kind."""
+        for kind, size in self.usage().items():
+            set_gauge("lecchurro_storage_bytes", size, kind=kind)
+
+    def _read_index(self):
+        """Reads the lectures of the index on disk (None if there is no index or it is corrupt)."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)["lectures"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _adopt(self, lectures):
+        """Replaces the in-memory index, totals and queues with the given lectures."""
+        self._lectures = {}
+        self._totals = dict.fromkeys(KINDS, 0)
+        self._queues = {kind: OrderedDict() for kind in EVICTION_ORDER}
+        for name, entry in sorted(lectures.items(), key=lambda item: item[1]["last_access"]):
+            self._lectures[name] = {"last_access": entry["last_access"], "files": {}}
+            for relative, (kind, size) in entry["files"].items():
+                self._add_file(name, relative, kind, size)
+        self._dirty.clear()
+        self._removed.clear()
+
+    def _scan(self, directories):
+        """
+        Builds the index from the files already in the data directories, oldest first.
+        Only WAVs with a video to decode them from again count as evictable audio; any other
+        audio file (e.g. a bundled sample) is counted as "other" and never evicted.
+        """
+        listings = {directory: [entry for entry in os.scandir(directory) if entry.is_file()
+                                and not entry.name.startswith(".")] if os.path.isdir(directory) else []
+                    for directory in directories}
+        videos = {os.path.splitext(entry.name)[0] for directory, kind in directories.items() if kind == "video"
+                  for entry in listings[directory]}
+        found = []
+        for directory, kind in directories.items():
+            for entry in listings[directory]:
+                lecture, extension = os.path.splitext(entry.name)
+                if kind == "audio" and (extension.lower() != WAV_EXTENSION or lecture not in videos):
+                    kind_of_file = "other"
+                else:
+                    kind_of_file = kind
+                stat = entry.stat()
+                found.append((stat.st_mtime, lecture, kind_of_file, entry.path, stat.st_size))
+        for mtime, lecture, kind, path, size in sorted(found):
+            self._add_file(lecture, os.path.relpath(os.path.abspath(path), self.data_dir), kind, size)
+            self._touch(lecture, when=mtime)
+        print(f"Storage index built from {len(found)} existing file(s) ({self._format_usage()}).")
+        self._save_index()
+
+    def _save_index(self):
+        """
+        Merges this process's changes into the index on disk and writes it back atomically.
+        If another process replaced the index since this one last read or wrote it, the index
+        is re-read under the file lock and this process's added files, accesses and evictions
+        are applied on top of it.
+        """
+        with file_lock(self.lock_path):
+            if file_signature(self.index_path) != self._signature:
+                lectures = self._read_index() or {}
+                for name in self._dirty:
+                    ours = self._lectures.get(name)
+                    if ours is None:
+                        continue
+                    entry = lectures.setdefault(name, {"last_access": 0.0, "files": {}})
+                    entry["files"].update(ours["files"])
+                    entry["last_access"] = max(entry["last_access"], ours["last_access"])
+                for name, relative in self._removed:
+                    if name in lectures:
+                        lectures[name]["files"].pop(relative, None)
+                self._adopt(lectures)
+            tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"lectures": self._lectures}, f)
+            os.replace(tmp_path, self.index_path)
+            self._signature = file_signature(self.index_path)
+            self._dirty.clear()
+            self._removed.clear()
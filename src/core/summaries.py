@@ -1,68 +1,73 @@
 # src/core/summaries.py
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from core.llm import chat_completion, lecture_messages, TRANSCRIPT_ABOVE
+from core.tokens import count_tokens
+from core.config import (SUMMARY_MAP_REDUCE_THRESHOLD, SUMMARY_CHUNK_TOKENS, SUMMARY_MAP_PARALLELISM,
+                         GENERATION_MODE)
 
-# Load environment variables from the .env file to access API keys or other configurations
-load_dotenv()
+# Generation settings (also used to key cached summaries)
+SUMMARY_MODEL = "gpt-4o"
+SUMMARY_TEMPERATURE = 0.5
+SUMMARY_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/summarization_prompt.txt')
+SUMMARY_MAP_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/summarization_map_prompt.txt')
+SUMMARY_REDUCE_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                          'prompts/summarization_reduce_prompt.txt')
 
-# Initialize OpenAI client with the API key
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# System message shared by every summarization call
+SUMMARY_SYSTEM_PROMPT = "You are an AI assistant that summarizes lecture transcripts."
 
-def summarize_text(transcription, segments):
+# Returned in place of a summary when generation fails
+SUMMARY_ERROR = "Error: Unable to generate summary."
+
+def summarize_text(transcription, segments, on_token=None):
     """
     Summarizes the entire lecture transcription.
     Args:
     - transcription (str): The complete transcription of the lecture.
     - segments (list of dict): A list of segments, each containing 'start', 'end', and 'text'.
+    - on_token (callable, optional): Streams the response; called with the summary so far after every token.
     Returns:
     - summary (str): A consolidated summary of the entire lecture.
     """
     try:
-        # Format timestamps for major segments as a reference for summarization
-        major_segments = []
-        for segment in segments:
-            start = segment["start"]
-            end = segment["end"]
-            text = segment["text"]
-            # Include segments with significant content length as major segments
-            if len(text) > 50:  # Assuming a major segment is defined by having more significant content
-                major_segments.append(f"{start:.2f}s - {end:.2f}s: {text[:100]}...")  # Truncate to avoid long texts
-
-        # Create a reference string of timestamps for the summarization prompt
-        timestamps_reference = "\n".join(major_segments)
-
-        # Construct the path to the summarization prompt file
-        current_dir = os.path.dirname(os.path.abspath(__file__))  # Get the directory of this script
-        prompt_file_path = os.path.join(current_dir, 'prompts/summarization_prompt.txt')  # Combine directory with the file name
+        # Long lectures overflow a single prompt, so summarize them in chunks and merge the results
+        if segments and count_tokens(transcription, SUMMARY_MODEL) > SUMMARY_MAP_REDUCE_THRESHOLD:
+            return summarize_map_reduce(segments, on_token=on_token)
 
         # Check if the prompt file exists
-        if not os.path.exists(prompt_file_path):
-            raise FileNotFoundError(f"Prompt file not found at {prompt_file_path}")
+        if not os.path.exists(SUMMARY_PROMPT_PATH):
+            raise FileNotFoundError(f"Prompt file not found at {SUMMARY_PROMPT_PATH}")
 
         # Read the summarization prompt template from the file
-        with open(prompt_file_path, 'r') as file:
+        with open(SUMMARY_PROMPT_PATH, 'r') as file:
             prompt_template = file.read()
 
-        # Format the prompt with the transcription and timestamps reference
-        prompt = prompt_template.format(transcription=transcription, timestamps_reference=timestamps_reference)
+        if GENERATION_MODE == "shared_prefix":
+            # The transcript leads the request, shared with the quiz and flashcards requests
+            messages = lecture_messages(transcription, prompt_template.format(transcription=TRANSCRIPT_ABOVE))
+        else:
+            # Format the prompt with the transcription (whitespace collapsed, it carries no meaning)
+            prompt = prompt_template.format(transcription=" ".join(transcription.split()))
+            messages = [
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
 
         # Log the constructed prompt for debugging purposes (truncate long prompts)
-        print(f"Constructed prompt: {prompt[:500]}...")
+        print(f"Constructed prompt: {messages[-1]['content'][:500]}...")
 
         # Send the prompt to OpenAI's GPT API (gpt4o) for summarization
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an AI assistant that summarizes lecture transcripts."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=14000, # Maximum tokens for the response
-            temperature=0.5,  # Controls creativity in response (lower temperature for more deterministic output)
+        response = chat_completion(
+            model=SUMMARY_MODEL,
+            messages=messages,
+            max_tokens=None, # Use whatever the context window leaves after the prompt
+            temperature=SUMMARY_TEMPERATURE,  # Controls creativity in response (lower temperature for more deterministic output)
+            on_token=on_token,
         )
 
         # Extract and return the summary from the API response
-        summary = response.choices[0].message.content.strip()
+        summary = response.strip()
         print(f"Generated summary: {summary[:500]}...")
 
         return summary
@@ -70,7 +75,133 @@ def summarize_text(transcription, segments):
     except Exception as e:
         # Log and return an error message if summarization fails
         print(f"Error in summarize_text: {e}")
-        return "Error: Unable to generate summary."
+        return SUMMARY_ERROR
+
+def format_timestamp(seconds):
+    """
+    Formats a time in seconds as mm:ss.
+    Args:
+        seconds (float): Time in seconds.
+    Returns:
+        str: The time as "mm:ss".
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def chunk_segments(segments, max_tokens):
+    """
+    Splits segments into consecutive chunks that each fit in a token budget.
+    Args:
+        segments (list of dict): A list of segments, each containing 'start', 'end', and 'text'.
+        max_tokens (int): Approximate maximum number of tokens per chunk.
+    Returns:
+        list of list of dict: The chunks, in lecture order.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        tokens = count_tokens(segment["text"], SUMMARY_MODEL)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def summarize_chunk(chunk, section, total_sections, prompt_template):
+    """
+    Summarizes one chunk of the lecture (the "map" step).
+    Args:
+        chunk (list of dict): Consecutive segments of the lecture.
+        section (int): 1-based position of the chunk.
+        total_sections (int): Total number of chunks.
+        prompt_template (str): Template of the map prompt.
+    Returns:
+        str: Notes for the chunk, with [mm:ss] timestamp anchors.
+    """
+    # Every line carries its timestamp so the notes can point back into the lecture
+    excerpt = "\n".join(f"[{format_timestamp(s['start'])}] {s['text'].strip()}" for s in chunk)
+    prompt = prompt_template.format(section=section, total_sections=total_sections, transcription=excerpt)
+    response = chat_completion(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=4000, # Notes for one section are much shorter than a full summary
+        temperature=SUMMARY_TEMPERATURE,
+    )
+    return response.strip()
+
+
+def summarize_map_reduce(segments, chunk_tokens=None, parallelism=None, on_token=None):
+    """
+    Summarizes a long lecture by summarizing token-budgeted chunks in parallel and
+    merging the partial summaries in a final reduce call that keeps the timestamp anchors.
+    Args:
+        segments (list of dict): A list of segments, each containing 'start', 'end', and 'text'.
+        chunk_tokens (int, optional): Approximate tokens per chunk (defaults to SUMMARY_CHUNK_TOKENS).
+        parallelism (int, optional): Chunks summarized at the same time (defaults to SUMMARY_MAP_PARALLELISM).
+        on_token (callable, optional): Streams the reduce step; called with the summary so far.
+    Returns:
+        str: A consolidated summary of the entire lecture.
+    """
+    chunks = chunk_segments(segments, chunk_tokens or SUMMARY_CHUNK_TOKENS)
+    print(f"Summarizing {len(segments)} segments in {len(chunks)} chunks (map-reduce)...")
+
+    with open(SUMMARY_MAP_PROMPT_PATH, 'r') as file:
+        map_template = file.read()
+    with open(SUMMARY_REDUCE_PROMPT_PATH, 'r') as file:
+        reduce_template = file.read()
+
+    # Map: summarize every chunk, several at a time
+    with ThreadPoolExecutor(max_workers=max(1, parallelism or SUMMARY_MAP_PARALLELISM)) as executor:
+        partial_summaries = list(executor.map(
+            lambda item: summarize_chunk(item[1], item[0] + 1, len(chunks), map_template),
+            enumerate(chunks)))
+
+    # Reduce: merge the section notes (in lecture order) into the final summary
+    sections = [(chunk[0]["start"], chunk[-1]["end"], notes) for chunk, notes in zip(chunks, partial_summaries)]
+    return reduce_summaries(sections, reduce_template, on_token=on_token)
+
+
+def reduce_summaries(sections, reduce_template=None, on_token=None):
+    """
+    Merges section notes into the summary of the whole lecture (the "reduce" step).
+    Args:
+        sections (list of tuple): (start, end, notes) of every section, in lecture order.
+        reduce_template (str, optional): Template of the reduce prompt (read from its file by default).
+        on_token (callable, optional): Streams the response; called with the summary so far.
+    Returns:
+        str: A consolidated summary of the entire lecture.
+    """
+    if reduce_template is None:
+        with open(SUMMARY_REDUCE_PROMPT_PATH, 'r') as file:
+            reduce_template = file.read()
+    merged_notes = "\n\n".join(
+        f"### Section {i} ({format_timestamp(start)} - {format_timestamp(end)})\n{notes}"
+        for i, (start, end, notes) in enumerate(sections, start=1))
+    prompt = reduce_template.format(partial_summaries=merged_notes)
+    response = chat_completion(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=None, # Use whatever the context window leaves after the prompt
+        temperature=SUMMARY_TEMPERATURE,
+        on_token=on_token,
+    )
+    summary = response.strip()
+    print(f"Generated summary: {summary[:500]}...")
+    return summary
+
 
 if __name__ == "__main__":
     # Dummy transcription and segments for testing
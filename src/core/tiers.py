@@ -0,0 +1,133 @@
+# src/core/tiers.py
+import json
+
+from core.models import get_transcriber, warm_up
+from core.metrics import inc, observe
+from core.config import (TRANSCRIBE_TIER, TIER_SHORT_MINUTES, TIER_LONG_MINUTES, TIER_BUSY_QUEUE, TIER_UPGRADE,
+                         TRANSCRIBE_TIERS)
+
+# Transcription settings of every tier, fastest first (backend, model_size, compute_type, beam_size).
+# Settings left out keep their configured value, so "standard" is exactly the configured model.
+DEFAULT_TIERS = {
+    "draft": {"model_size": "tiny", "beam_size": 1, "compute_type": "int8"},
+    "fast": {"model_size": "base", "beam_size": 1, "compute_type": "int8"},
+    "standard": {},
+    "accurate": {"model_size": "small", "beam_size": 5, "compute_type": "int8"},
+}
+
+# Tier of the quick first pass when upgrades are enabled
+DRAFT_TIER = "draft"
+
+
+def load_tiers(overrides=TRANSCRIBE_TIERS):
+    """
+    Builds the tier table from the defaults and the TRANSCRIBE_TIERS overrides.
+    Args:
+        overrides (str): JSON object mapping tier names to settings (empty for none).
+    Returns:
+        dict: Mapping of tier name to backend setting overrides.
+    """
+    tiers = {name: dict(settings) for name, settings in DEFAULT_TIERS.items()}
+    if overrides:
+        try:
+            for name, settings in json.loads(overrides).items():
+                tiers.setdefault(name, {}).update(settings)
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring invalid TRANSCRIBE_TIERS: {e}")
+    return tiers
+
+
+# Tiers available to the pipeline
+TIERS = load_tiers()
+
+
+def tier_transcriber(tier, load=True):
+    """
+    Returns the transcription backend of a tier from the model registry.
+    Args:
+        tier (str): Tier name.
+        load (bool): Load the model before returning (False when only its settings are needed).
+    Returns:
+        TranscriptionBackend: The shared backend of the tier.
+    """
+    settings = dict(TIERS.get(tier, {}))
+    return get_transcriber(settings.pop("backend", None), load=load, **settings)
+
+
+def warm_up_tier(tier):
+    """
+    Loads the transcription backend of a tier in the background (see models.warm_up).
+    Args:
+        tier (str): Tier name.
+    Returns:
+        threading.Thread: The (daemon) loading thread.
+    """
+    settings = dict(TIERS.get(tier, {}))
+    return warm_up(settings.pop("backend", None), **settings)
+
+
+def select_tier(duration, queue_depth, tier=TRANSCRIBE_TIER, upgrade=TIER_UPGRADE):
+    """
+    Picks the transcription tier of a lecture.
+    Args:
+        duration (float or None): Length of the lecture in seconds (None if unknown).
+        queue_depth (int): Lectures waiting for or holding a transcription worker.
+        tier (str): Configured tier, or "auto" to decide from the duration and queue depth.
+        upgrade (bool): Transcribe a draft first and the chosen tier in the background.
+    Returns:
+        dict: 'tier' (tier of the transcript returned now), 'upgrade' (tier of the background
+            pass, or None) and 'reason' (why the tier was chosen).
+    """
+    if tier != "auto":
+        chosen, reason = tier, "configured"
+        if chosen not in TIERS:
+            print(f"Unknown transcription tier '{tier}', using 'standard'.")
+            chosen = "standard"
+    elif queue_depth >= TIER_BUSY_QUEUE:
+        chosen, reason = "fast", "busy transcription queue"
+    elif duration is not None and duration > TIER_LONG_MINUTES * 60:
+        chosen, reason = "fast", "long lecture"
+    elif duration is not None and duration < TIER_SHORT_MINUTES * 60:
+        chosen, reason = "accurate", "short lecture"
+    else:
+        chosen, reason = "standard", "default"
+
+    if upgrade and chosen != DRAFT_TIER:
+        return {"tier": DRAFT_TIER, "upgrade": chosen, "reason": reason}
+    return {"tier": chosen, "upgrade": None, "reason": reason}
+
+
+# Tier the first transcription of a lecture usually runs at (the draft with upgrades on), i.e. the
+# model worth loading at startup
+DEFAULT_TIER = select_tier(None, 0)["tier"]
+
+
+def log_tier_decision(decision, duration, queue_depth):
+    """
+    Logs and counts a tier decision.
+    Args:
+        decision (dict): Decision returned by select_tier.
+        duration (float or None): Length of the lecture in seconds.
+        queue_depth (int): Transcription queue depth when the decision was made.
+    """
+    upgrade = f", upgraded to '{decision['upgrade']}' in the background" if decision["upgrade"] else ""
+    length = f"{duration / 60:.0f} min" if duration is not None else "unknown length"
+    print(f"Transcription tier '{decision['tier']}'{upgrade}: {decision['reason']} "
+          f"({length}, {queue_depth} lecture(s) queued).")
+    inc("lecchurro_tier_decisions_total", tier=decision["tier"], upgrade=decision["upgrade"] or "none")
+
+
+def log_transcription(tier, backend, audio_seconds, elapsed):
+    """
+    Logs the real-time factor of a transcription (time spent per second of audio; below 1 is
+    faster than real time).
+    Args:
+        tier (str): Tier the audio was transcribed with.
+        backend (TranscriptionBackend): Backend of the tier (for its settings).
+        audio_seconds (float): Length of the audio.
+        elapsed (float): Transcription time in seconds.
+    """
+    rtf = elapsed / audio_seconds if audio_seconds else 0.0
+    print(f"Transcribed {audio_seconds:.0f}s of audio with tier '{tier}' ({backend.name} {backend.model_size}, "
+          f"beam {backend.beam_size}, {backend.compute_type}) in {elapsed:.1f}s, RTF {rtf:.3f}.")
+    observe("lecchurro_transcription_rtf", rtf, tier=tier)
@@ -1,15 +1,21 @@
 # src/core/timestamps.py
 import os
 import json
-from dotenv import load_dotenv
-from openai import OpenAI
+from core.llm import chat_completion
+from core.tokens import compact_segments, dumps_compact
+from core.metrics import span
+from core.topics import segment_topics, label_topics
+from core.config import TIMESTAMPS_MODE
 
-# Load environment variables from the .env file to access API keys or other configurations
-load_dotenv()
+# Generation settings (also used to key cached timestamps)
+TIMESTAMPS_MODEL = "gpt-4"
+TIMESTAMPS_TEMPERATURE = 0.7
+TIMESTAMPS_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/group_concepts_prompt.txt')
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) # Initialize OpenAI client with the API key
+# Returned in place of the timestamps HTML when generation fails
+TIMESTAMPS_ERROR = "<p>Unable to generate conceptual timestamps. Please try again later.</p>"
 
-def generate_conceptual_timestamps(transcription, segments):
+def generate_conceptual_timestamps(transcription, segments, mode=TIMESTAMPS_MODE):
     """
     Generates conceptual timestamps for a lecture transcript.
     Args:
@@ -18,75 +24,107 @@ def generate_conceptual_timestamps(transcription, segments):
             - 'start' (float): Start time of the segment in seconds.
             - 'end' (float): End time of the segment in seconds.
             - 'text' (str): Text content of the segment.
+        mode (str): "hybrid" (local topic boundaries, LLM-written titles), "offline" (no LLM call)
+            or "llm" (the model groups every segment).
     Returns:
         str: HTML-formatted string of conceptual groups with timestamps and summaries.
     """
     # Return a message if no segments are provided
     if not segments:
         return "<p>No segments found.</p>"
-    # Prepare a list of segments as JSON for the GPT prompt
-    segments_data = [{"start": s["start"], "end": s["end"], "text": s["text"].strip()} for s in segments]
+    if mode == "llm":
+        return generate_llm_timestamps(segments)
 
-    # Load the conceptual grouping prompt from a file
-    current_dir = os.path.dirname(os.path.abspath(__file__)) # Get the directory of this script
-    prompt_file_path = os.path.join(current_dir, 'prompts/group_concepts_prompt.txt') # Combine directory with prompt file name
+    # Topic boundaries are computed locally, so the model only sees a short sample of each topic
+    with span("segment_topics", segments=len(segments)):
+        concept_groups = segment_topics(segments)
+    if not concept_groups:
+        return "<p>No segments found.</p>"
+    if mode != "offline":
+        concept_groups = label_topics(concept_groups, segments)
+    return format_concept_groups_html(concept_groups)
+
+def generate_llm_timestamps(segments):
+    """
+    Generates conceptual timestamps by asking the model to group every segment.
+    Args:
+        segments (list of dict): Segments with 'start', 'end' and 'text'.
+    Returns:
+        str: HTML-formatted conceptual groups, or TIMESTAMPS_ERROR on failure.
+    """
+    # Prepare a compact list of segments as JSON for the GPT prompt (short keys, rounded times,
+    # short segments merged) so long lectures fit in the model's context
+    segments_data = compact_segments(segments)
 
-    with open(prompt_file_path, 'r') as f:
+    # Load the conceptual grouping prompt from a file
+    with open(TIMESTAMPS_PROMPT_PATH, 'r') as f:
         prompt_template = f.read()
 
     # Inject the segments data into the prompt
-    prompt = f"{prompt_template}\n\nInput segments (JSON):\n{json.dumps(segments_data)}"
+    prompt = f"{prompt_template}\n\nInput segments (JSON):\n{dumps_compact(segments_data)}"
 
     try:
         # Send the prompt to the OpenAI API (gpt4) to generate conceptual groups
-        response = client.chat.completions.create(
-            model="gpt-4",
+        response = chat_completion(
+            model=TIMESTAMPS_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that outputs only the requested data."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=1500, # Max tokens for response
-            temperature=0.7, # Controls randomness (creativity) in response
+            max_tokens=None, # Use whatever the context window leaves after the prompt
+            temperature=TIMESTAMPS_TEMPERATURE, # Controls randomness (creativity) in response
         )
 
         # Parse the response into a JSON object
-        concept_groups_raw = response.choices[0].message.content.strip()
+        concept_groups_raw = response.strip()
         concept_groups = json.loads(concept_groups_raw)
 
     # Handle errors during the API call or response parsing    
     except Exception as e:
         print(f"Error generating conceptual timestamps: {e}")
-        return "<p>Unable to generate conceptual timestamps. Please try again later.</p>"
+        return TIMESTAMPS_ERROR
 
+    return format_concept_groups_html(concept_groups)
+
+def format_concept_groups_html(concept_groups):
+    """
+    Builds the Timestamps tab HTML from concept groups.
+    Args:
+        concept_groups (list of dict): Groups with 'title', 'summary', 'start_time', 'end_time'
+            and 'segments' (sub-topics with 'mini_title', 'start_time' and 'text').
+    Returns:
+        str: HTML-formatted conceptual groups with clickable timestamps.
+    """
     # Build HTML output for the conceptual groups
-    timestamps_html = ""
-    for group in concept_groups:
-        # Extract details of each conceptual group
-        start = group.get("start_time", 0)
-        end = group.get("end_time", 0)
-        title = group.get("title", "Untitled Concept")
-        summary = group.get("summary", "")
-
-        # Main concept title link
-        main_link = f"<a href='#' class='timestamp-link' data-time='{start:.2f}'><b>{title}</b></a>"
-
-        # Generate a list of sub-topics within the group
-        segs_html = "<ul>"
-        for sub in group.get("segments", []):
-            sub_title = sub.get("mini_title", "Sub-topic")
-            sub_start = sub.get("start_time", start)
-            sub_text = sub.get("text", "")
-            segs_html += f"<li><a href='#' class='timestamp-link' data-time='{sub_start:.2f}'><b>{sub_title}</b></a>: {sub_text}</li>"
-        segs_html += "</ul>"
-
-        # Add the conceptual group and its sub-topics to the HTML output
-        timestamps_html += f"""
-        <div style='margin-bottom:20px; border-bottom:1px solid #ccc; padding-bottom:10px;'>
-            <h3>{main_link} <small>({start:.2f}s - {end:.2f}s)</small></h3>
-            <p><em>{summary}</em></p>
-            {segs_html}
-        </div>
-        """
+    with span("render_timestamps_html", groups=len(concept_groups)):
+        timestamps_html = ""
+        for group in concept_groups:
+            # Extract details of each conceptual group
+            start = group.get("start_time", 0)
+            end = group.get("end_time", 0)
+            title = group.get("title", "Untitled Concept")
+            summary = group.get("summary", "")
+
+            # Main concept title link
+            main_link = f"<a href='#' class='timestamp-link' data-time='{start:.2f}'><b>{title}</b></a>"
+
+            # Generate a list of sub-topics within the group
+            segs_html = "<ul>"
+            for sub in group.get("segments", []):
+                sub_title = sub.get("mini_title", "Sub-topic")
+                sub_start = sub.get("start_time", start)
+                sub_text = sub.get("text", "")
+                segs_html += f"<li><a href='#' class='timestamp-link' data-time='{sub_start:.2f}'><b>{sub_title}</b></a>: {sub_text}</li>"
+            segs_html += "</ul>"
+
+            # Add the conceptual group and its sub-topics to the HTML output
+            timestamps_html += f"""
+            <div style='margin-bottom:20px; border-bottom:1px solid #ccc; padding-bottom:10px;'>
+                <h3>{main_link} <small>({start:.2f}s - {end:.2f}s)</small></h3>
+                <p><em>{summary}</em></p>
+                {segs_html}
+            </div>
+            """
 
     return timestamps_html
 
@@ -114,3 +152,19 @@ def format_timestamps(segments):
         
     return timestamps_data
 
+
+def format_transcript_markdown(segments):
+    """
+    Formats lecture segments as a readable, timestamped transcript.
+    Args:
+        segments (list of dict): A list of segments, each containing 'start', 'end', and 'text'.
+    Returns:
+        str: Markdown with one "**[mm:ss]** text" line per segment.
+    """
+    if not segments:
+        return ""
+    lines = []
+    for segment in segments:
+        minutes, seconds = divmod(int(segment["start"]), 60)
+        lines.append(f"**[{minutes:02d}:{seconds:02d}]** {segment['text'].strip()}")
+    return "\n\n".join(lines)
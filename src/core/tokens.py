@@ -0,0 +1,130 @@
+# src/core/tokens.py
+import json
+import threading
+
+# Context window and maximum completion length of the models we use (in tokens)
+MODEL_LIMITS = {
+    "gpt-4o": {"context": 128000, "output": 16384},
+    "gpt-4o-mini": {"context": 128000, "output": 16384},
+    "gpt-4": {"context": 8192, "output": 8192},
+    "gpt-4-turbo": {"context": 128000, "output": 4096},
+}
+
+# Limits assumed for models missing from MODEL_LIMITS
+DEFAULT_LIMITS = {"context": 8192, "output": 4096}
+
+# Tokens added by the chat format around every message, and kept free as a safety margin
+TOKENS_PER_MESSAGE = 4
+BUDGET_MARGIN = 64
+
+# Segments shorter than this many characters are merged into their neighbour when compacting
+MIN_SEGMENT_CHARS = 80
+
+# tiktoken encodings, loaded lazily per model (None when tiktoken is unavailable)
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(model):
+    """
+    Returns the tiktoken encoding of a model, or None if tiktoken is not installed.
+    Args:
+        model (str): Model name.
+    Returns:
+        tiktoken.Encoding or None: The encoding.
+    """
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model] = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    _encodings[model] = tiktoken.get_encoding("o200k_base")
+            except ImportError:
+                _encodings[model] = None
+        return _encodings[model]
+
+
+def count_tokens(text, model="gpt-4o"):
+    """
+    Counts the tokens of a text for a model, using tiktoken when it is installed
+    and a 4-characters-per-token estimate otherwise.
+    Args:
+        text (str): Text to measure.
+        model (str): Model whose tokenizer should be used.
+    Returns:
+        int: Number of tokens.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model="gpt-4o"):
+    """
+    Counts the prompt tokens of a list of chat messages.
+    Args:
+        messages (list of dict): Chat messages with 'role' and 'content'.
+        model (str): Model whose tokenizer should be used.
+    Returns:
+        int: Number of prompt tokens.
+    """
+    return sum(count_tokens(message["content"], model) + TOKENS_PER_MESSAGE for message in messages) + 3
+
+
+def choose_max_tokens(model, prompt_tokens, requested=None):
+    """
+    Picks the completion budget from what the context window has left after the prompt.
+    Args:
+        model (str): Model name.
+        prompt_tokens (int): Tokens used by the prompt.
+        requested (int, optional): Upper bound wanted by the caller.
+    Returns:
+        int: The max_tokens value to send.
+    Raises:
+        ValueError: If the prompt leaves no room for a completion.
+    """
+    limits = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+    available = limits["context"] - prompt_tokens - BUDGET_MARGIN
+    if available <= 0:
+        raise ValueError(f"Prompt of {prompt_tokens} tokens does not fit in the {limits['context']}-token "
+                         f"context of {model}.")
+    budget = min(available, limits["output"])
+    return min(budget, requested) if requested else budget
+
+
+def compact_segments(segments, min_chars=MIN_SEGMENT_CHARS, precision=1):
+    """
+    Shrinks Whisper segments for prompts: short consecutive segments are merged,
+    times are rounded and only the start, end and text are kept under short keys.
+    Args:
+        segments (list of dict): Segments with 'start', 'end' and 'text'.
+        min_chars (int): Segments are merged until their text reaches this length.
+        precision (int): Decimal places kept for the times.
+    Returns:
+        list of dict: Compact segments with keys "s" (start), "e" (end) and "t" (text).
+    """
+    compact = []
+    for segment in segments:
+        text = " ".join(segment["text"].split())
+        if not text:
+            continue
+        if compact and len(compact[-1]["t"]) < min_chars:
+            compact[-1]["e"] = round(segment["end"], precision)
+            compact[-1]["t"] += " " + text
+        else:
+            compact.append({"s": round(segment["start"], precision), "e": round(segment["end"], precision), "t": text})
+    return compact
+
+
+def dumps_compact(value):
+    """
+    Serializes a value as JSON without optional whitespace.
+    Args:
+        value (object): JSON-serializable value.
+    Returns:
+        str: Minified JSON.
+    """
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,355 @@
+# src/core/topics.py
+import os
+import json
+import numpy as np
+
+from core.llm import chat_completion
+from core.search import tokenize
+from core.tokens import dumps_compact
+from core.config import TOPIC_BLOCK_SEGMENTS, TOPIC_MIN_SECONDS, TOPIC_MAX_PER_HOUR
+
+# Labeling settings (also used to key cached timestamps)
+TOPICS_MODEL = "gpt-4o-mini"
+TOPICS_TEMPERATURE = 0.3
+TOPICS_PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts/label_topics_prompt.txt')
+
+# Sub-topics listed under every concept group
+SUBTOPICS_PER_GROUP = 3
+
+# Words sent to the model per sub-topic when asking for labels
+LABEL_WORDS_PER_SUBTOPIC = 120
+
+# Function words that carry no topical signal
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but
+by can could did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it it's its itself just let let's like me more most my no nor not now of off on once only or
+other our ours out over own really right same she should so some such than that that's the their theirs them then
+there these they this those through to too under until up very was we well were what when where which while who
+whom why will with would you your yours okay yeah going get got go gonna want know think see say said thing things
+one two way look kind sort also able use put need back make take give come something somewhere little bit
+good new first last next another much many lot
+""".split())
+
+# Structured output schema of the labeling call
+TOPICS_SCHEMA = {
+    "name": "topic_labels",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "topics": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "title": {"type": "string"},
+                        "summary": {"type": "string"},
+                        "subtopic_titles": {"type": "array", "items": {"type": "string"}},
+                    },
+                    "required": ["id", "title", "summary", "subtopic_titles"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["topics"],
+        "additionalProperties": False,
+    },
+}
+
+
+class TermWeights:
+    """
+    Sparse TF-IDF matrix of a lecture's segments (one row per segment) in compressed sparse
+    row form: the weights of row i are data[indptr[i]:indptr[i + 1]], in the columns
+    indices[indptr[i]:indptr[i + 1]]. A segment only holds a few of the lecture's words, so
+    the matrix grows with the length of the lecture instead of length times vocabulary.
+    """
+
+    def __init__(self, indptr, indices, data, columns):
+        """
+        Args:
+            indptr (np.ndarray): Offset of every row's weights, plus the total count at the end.
+            indices (np.ndarray): Column of every weight.
+            data (np.ndarray): The weights.
+            columns (int): Number of terms.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (len(indptr) - 1, columns)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def row_ids(self, start, stop):
+        """Returns the row of every weight stored for rows [start, stop)."""
+        return np.repeat(np.arange(start, stop), np.diff(self.indptr[start:stop + 1]))
+
+    def column_sums(self, start, stop):
+        """Returns the summed weights of rows [start, stop) as a dense vector over the terms."""
+        low, high = self.indptr[start], self.indptr[stop]
+        return np.bincount(self.indices[low:high], weights=self.data[low:high], minlength=self.shape[1])
+
+
+def term_weights(segments):
+    """
+    Builds the TF-IDF matrix of the segments (one row per segment), keeping only
+    content words that occur in at least two segments.
+    Args:
+        segments (list of dict): Segments with 'text'.
+    Returns:
+        tuple: (TermWeights of shape (segments, terms), list of terms).
+    """
+    docs = [[word for word in tokenize(segment["text"]) if len(word) > 2 and "'" not in word and word not in STOPWORDS]
+            for segment in segments]
+    vocabulary = {}
+    columns = np.array([vocabulary.setdefault(word, len(vocabulary)) for words in docs for word in words],
+                       dtype=np.int64)
+    rows = np.repeat(np.arange(len(docs)), [len(words) for words in docs])
+    # Count every (segment, word) pair once; the keys come out sorted by segment, then word
+    keys, counts = np.unique(rows * max(len(vocabulary), 1) + columns, return_counts=True)
+    rows, columns = np.divmod(keys, max(len(vocabulary), 1))
+
+    document_frequency = np.bincount(columns, minlength=len(vocabulary))
+    keep = document_frequency >= 2
+    idf = np.log((len(docs) + 1) / (document_frequency + 1)) + 1
+    kept = keep[columns]
+    rows, columns, counts = rows[kept], columns[kept], counts[kept]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(docs)))))
+    terms = [word for word, column in sorted(vocabulary.items(), key=lambda item: item[1]) if keep[column]]
+    weights = TermWeights(indptr, (np.cumsum(keep) - 1)[columns], (counts * idf[columns]).astype(np.float32),
+                          len(terms))
+    return weights, terms
+
+
+def _block_sums(weights, gaps_of_row, count, block):
+    """
+    Sums the term weights of the block on one side of every gap, as sorted sparse entries.
+    Args:
+        weights (TermWeights): TF-IDF matrix.
+        gaps_of_row (callable): Maps the rows of the stored weights and an offset 0..block-1
+            to the gaps whose block holds them.
+        count (int): Number of segments (gaps are 1..count-1).
+        block (int): Segments per block.
+    Returns:
+        tuple: (np.ndarray of gap * terms + term keys, np.ndarray of summed weights).
+    """
+    rows = weights.row_ids(0, count)
+    gaps = np.concatenate([gaps_of_row(rows, offset) for offset in range(block)])
+    columns = np.tile(weights.indices, block)
+    values = np.tile(weights.data.astype(np.float64), block)
+    valid = (gaps >= 1) & (gaps < count)
+    keys, inverse = np.unique(gaps[valid] * weights.shape[1] + columns[valid], return_inverse=True)
+    return keys, np.bincount(inverse, weights=values[valid])
+
+
+def gap_similarity(weights, block):
+    """
+    Lexical cohesion across every gap between consecutive segments: the cosine similarity
+    of the summed term weights of the `block` segments before and after the gap.
+    Args:
+        weights (TermWeights): TF-IDF matrix (segments x terms).
+        block (int): Segments per block on each side of a gap.
+    Returns:
+        np.ndarray: Similarity of gaps 1..n-1 (gap g sits before segment g).
+    """
+    count, terms = weights.shape
+    # Segment r is in the block before gaps r+1..r+block and in the block after gaps r-block+1..r
+    left_keys, left = _block_sums(weights, lambda rows, offset: rows + 1 + offset, count, block)
+    right_keys, right = _block_sums(weights, lambda rows, offset: rows - offset, count, block)
+    shared, in_left, in_right = np.intersect1d(left_keys, right_keys, assume_unique=True, return_indices=True)
+    dots = np.bincount(shared // terms, weights=left[in_left] * right[in_right], minlength=count)
+    norms = np.sqrt(np.bincount(left_keys // terms, weights=np.square(left), minlength=count)
+                    * np.bincount(right_keys // terms, weights=np.square(right), minlength=count))
+    return (dots / np.maximum(norms, 1e-9))[1:]
+
+
+def depth_scores(similarity):
+    """
+    TextTiling depth of every gap: how far the similarity dips below the nearest peaks on both sides.
+    The peak on each side is where a climb from the gap stops, found for every gap at once with
+    running maxima (minima from the right) of the positions where a climb stops.
+    Args:
+        similarity (np.ndarray): Smoothed gap similarities.
+    Returns:
+        np.ndarray: Depth score of every gap.
+    """
+    count = len(similarity)
+    if not count:
+        return np.zeros(0, dtype=np.float32)
+    positions = np.arange(count)
+    # Climbing left stops at the first gap whose left neighbour is lower, climbing right likewise
+    left_stops = np.concatenate(([True], similarity[:-1] < similarity[1:]))
+    right_stops = np.concatenate((similarity[1:] < similarity[:-1], [True]))
+    left = np.maximum.accumulate(np.where(left_stops, positions, 0))
+    right = np.minimum.accumulate(np.where(right_stops, positions, count - 1)[::-1])[::-1]
+    return ((similarity[left] - similarity) + (similarity[right] - similarity)).astype(np.float32)
+
+
+def find_boundaries(segments, weights, block=TOPIC_BLOCK_SEGMENTS, min_seconds=TOPIC_MIN_SECONDS,
+                    max_per_hour=TOPIC_MAX_PER_HOUR):
+    """
+    Picks topic boundaries at the deepest cohesion dips, keeping topics at least
+    `min_seconds` long and at most `max_per_hour` of them per hour of lecture.
+    Args:
+        segments (list of dict): Segments with 'start' and 'end'.
+        weights (TermWeights): TF-IDF matrix of the segments.
+        block (int): Segments per comparison block.
+        min_seconds (float): Minimum topic duration.
+        max_per_hour (float): Maximum topics per hour.
+    Returns:
+        list of int: Indices of the segments that start a new topic, in order.
+    """
+    if len(segments) < 2 * block or weights.shape[1] == 0:
+        return []
+    similarity = gap_similarity(weights, block)
+    similarity = np.convolve(similarity, np.ones(3) / 3, mode="same")
+    depths = depth_scores(similarity)
+    threshold = depths.mean() - depths.std() / 2
+
+    duration = segments[-1]["end"] - segments[0]["start"]
+    max_boundaries = max(0, int(duration / 3600 * max_per_hour) - 1)
+    starts = np.array([segment["start"] for segment in segments])
+    chosen = []
+    for gap in np.argsort(-depths):
+        if len(chosen) >= max_boundaries or depths[gap] <= threshold:
+            break
+        index = int(gap) + 1
+        time = starts[index]
+        # Keep every topic, including the first and the last one, long enough
+        if time - segments[0]["start"] < min_seconds or segments[-1]["end"] - time < min_seconds:
+            continue
+        if any(abs(time - starts[other]) < min_seconds for other in chosen):
+            continue
+        chosen.append(index)
+    return sorted(chosen)
+
+
+def _split(start, stop, parts):
+    """Splits the range [start, stop) into up to `parts` contiguous, non-empty ranges."""
+    edges = np.linspace(start, stop, min(parts, stop - start) + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _keywords(weights, start, stop, terms, count=3):
+    """Returns the highest-weighted terms of the block of segments [start, stop)."""
+    totals = weights.column_sums(start, stop)
+    return [terms[i] for i in np.argsort(-totals)[:count] if totals[i] > 0]
+
+
+def _representative(segments, weights, start, stop):
+    """Returns the text of the segment closest to the centroid of the block [start, stop)."""
+    low, high = weights.indptr[start], weights.indptr[stop]
+    rows = weights.row_ids(start, stop) - start
+    values = weights.data[low:high].astype(np.float64)
+    centroid = weights.column_sums(start, stop)
+    dots = np.bincount(rows, weights=values * centroid[weights.indices[low:high]], minlength=stop - start)
+    norms = np.sqrt(np.bincount(rows, weights=np.square(values), minlength=stop - start))
+    norms *= max(np.linalg.norm(centroid), 1e-9)
+    best = start + int(np.argmax(dots / np.maximum(norms, 1e-9)))
+    return segments[best]["text"].strip()
+
+
+def segment_topics(segments):
+    """
+    Groups a lecture's segments into topics locally (no LLM call), labelled with their
+    keywords and most representative sentence.
+    Args:
+        segments (list of dict): Segments with 'start', 'end' and 'text'.
+    Returns:
+        list of dict: Concept groups with 'title', 'summary', 'start_time', 'end_time' and
+            'segments' (sub-topics with 'mini_title', 'start_time', 'end_time' and 'text').
+    """
+    segments = [segment for segment in segments if segment["text"].strip()]
+    if not segments:
+        return []
+    weights, terms = term_weights(segments)
+    edges = [0] + find_boundaries(segments, weights) + [len(segments)]
+
+    groups = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        keywords = _keywords(weights, start, stop, terms)
+        subtopics = []
+        for sub_start, sub_stop in _split(start, stop, SUBTOPICS_PER_GROUP):
+            sub_keywords = _keywords(weights, sub_start, sub_stop, terms, count=2)
+            subtopics.append({
+                "mini_title": ", ".join(word.capitalize() for word in sub_keywords) or "Sub-topic",
+                "start_time": float(segments[sub_start]["start"]),
+                "end_time": float(segments[sub_stop - 1]["end"]),
+                "text": _representative(segments, weights, sub_start, sub_stop),
+            })
+        groups.append({
+            "title": ", ".join(word.capitalize() for word in keywords) or "Untitled Concept",
+            "summary": _representative(segments, weights, start, stop),
+            "start_time": float(segments[start]["start"]),
+            "end_time": float(segments[stop - 1]["end"]),
+            "segments": subtopics,
+        })
+    return groups
+
+
+def label_topics(groups, segments):
+    """
+    Asks the model for short titles and summaries of pre-computed topic groups.
+    Only a sample of each sub-topic's text is sent, so the prompt stays small for any
+    lecture length. Groups keep their local labels if the call fails.
+    Args:
+        groups (list of dict): Groups returned by segment_topics.
+        segments (list of dict): The segments the groups were computed from.
+    Returns:
+        list of dict: The groups with model-written titles and summaries.
+    """
+    request = []
+    for group_id, group in enumerate(groups):
+        subtopics = []
+        for sub in group["segments"]:
+            # Opening words of the sub-topic, enough for the model to name it
+            text = " ".join(segment["text"] for segment in segments
+                            if sub["start_time"] <= segment["start"] <= sub["end_time"])
+            subtopics.append(" ".join(text.split()[:LABEL_WORDS_PER_SUBTOPIC]))
+        request.append({"id": group_id, "subtopics": subtopics})
+
+    with open(TOPICS_PROMPT_PATH, 'r', encoding='utf-8') as f:
+        prompt = f"{f.read()}\n\nInput topics (JSON):\n{dumps_compact(request)}"
+
+    try:
+        response = chat_completion(
+            model=TOPICS_MODEL,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that outputs only the requested data."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=150 * len(groups) + 100, # Titles and short summaries only
+            temperature=TOPICS_TEMPERATURE,
+            response_format={"type": "json_schema", "json_schema": TOPICS_SCHEMA},
+        )
+        labels = json.loads(response)["topics"]
+    except Exception as e:
+        print(f"Error labeling topics, keeping local labels: {e}")
+        labels = []
+    return apply_topic_labels(groups, labels)
+
+
+def apply_topic_labels(groups, labels):
+    """
+    Replaces the local labels of topic groups with model-written ones.
+    Args:
+        groups (list of dict): Groups returned by segment_topics.
+        labels (list of dict): Labels with 'id' (the group's index), 'title', 'summary' and
+            'subtopic_titles', as described by TOPICS_SCHEMA.
+    Returns:
+        list of dict: The groups; those without a (valid) label keep their local one.
+    """
+    labels = {label.get("id"): label for label in labels if isinstance(label, dict)}
+    for group_id, group in enumerate(groups):
+        label = labels.get(group_id)
+        if not label:
+            continue
+        group["title"] = str(label.get("title", "")).strip() or group["title"]
+        group["summary"] = str(label.get("summary", "")).strip() or group["summary"]
+        for subtopic, title in zip(group["segments"], label.get("subtopic_titles") or []):
+            subtopic["mini_title"] = str(title).strip() or subtopic["mini_title"]
+    return groups
+
@@ -0,0 +1,211 @@
+# src/core/transcription.py
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.audio import SAMPLE_RATE, stream_audio
+from core.backends import create_backend
+
+# Whisper's mel frames are 10 ms (160 samples), which is the unit of a segment's "seek"
+SAMPLES_PER_SEEK = 160
+
+# Frame length (in seconds) used when looking for quiet split points
+ENERGY_FRAME_SECONDS = 0.03
+
+# Transcription backend held by each worker process (set by _init_worker)
+_worker_backend = None
+
+# Process pool shared by every chunked transcription, recreated when its settings change
+_pool = None
+_pool_settings = None
+_pool_lock = threading.Lock()
+
+
+def find_split_points(samples, chunk_seconds, search_seconds, sample_rate=SAMPLE_RATE):
+    """
+    Picks chunk boundaries close to every `chunk_seconds`, snapped to the quietest
+    frame within `search_seconds` of each target so words are not cut in half.
+    Args:
+        samples (np.ndarray): Mono float32 samples.
+        chunk_seconds (float): Target chunk length in seconds.
+        search_seconds (float): How far around each target to look for silence.
+        sample_rate (int): Sample rate in Hz.
+    Returns:
+        list of int: Sample offsets of the boundaries, including 0 and len(samples).
+    """
+    frame = max(1, int(ENERGY_FRAME_SECONDS * sample_rate))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return [0, len(samples)]
+    # Frame energies in one vectorized pass
+    energy = np.square(samples[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+
+    points = [0]
+    target = chunk_seconds
+    total_seconds = len(samples) / sample_rate
+    # Stop before a trailing sliver shorter than half a chunk is left over
+    while target < total_seconds - chunk_seconds / 2:
+        lo = max(int((target - search_seconds) * sample_rate) // frame, points[-1] // frame + 1)
+        hi = min(int((target + search_seconds) * sample_rate) // frame, n_frames)
+        if lo >= hi:
+            break
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        points.append(quietest * frame + frame // 2)
+        target = points[-1] / sample_rate + chunk_seconds
+    points.append(len(samples))
+    return points
+
+
+def _init_worker(settings, threads):
+    """
+    Loads the transcription model once per worker process and pins its thread count.
+    Args:
+        settings (dict): Backend settings, as returned by TranscriptionBackend.settings().
+        threads (int): Number of CPU threads for this worker.
+    """
+    global _worker_backend
+    settings = dict(settings, threads=threads)
+    _worker_backend = create_backend(settings.pop("backend"), **settings)
+    _worker_backend.load()
+
+
+def _transcribe_window(samples, options):
+    """
+    Transcribes one window of audio inside a worker process.
+    Args:
+        samples (np.ndarray): Float32 samples of the window.
+        options (dict): Extra keyword arguments for the backend's transcribe.
+    Returns:
+        list of dict: Whisper-style segments with times relative to the window start.
+    """
+    return _worker_backend.transcribe(samples, **options)["segments"]
+
+
+def _get_pool(settings, workers):
+    """
+    Returns the shared process pool, creating it (and loading the models) on first use.
+    Args:
+        settings (dict): Backend settings each worker loads.
+        workers (int): Number of worker processes.
+    Returns:
+        ProcessPoolExecutor: The pool.
+    """
+    global _pool, _pool_settings
+    with _pool_lock:
+        key = (tuple(sorted(settings.items())), workers)
+        if _pool is None or _pool_settings != key:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # Split the cores evenly so workers don't oversubscribe the CPU
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # Spawn rather than fork: forking a process that has loaded torch and started threads can deadlock
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(settings, threads))
+            _pool_settings = key
+        return _pool
+
+
+def stitch_segments(windows):
+    """
+    Merges per-window segments into a single Whisper-style segment list.
+    Each window owns the audio between its two split points; a segment from the
+    overlapping margins is kept only by the window whose owned range contains its
+    midpoint, so text heard by two windows appears once.
+    Args:
+        windows (list of tuple): (segments, window_offset, own_start, own_end) per window,
+            with all times in seconds and segment times relative to the window start.
+    Returns:
+        list of dict: Segments on the original timeline, renumbered from 0.
+    """
+    stitched = []
+    for segments, offset, own_start, own_end in windows:
+        for segment in segments:
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            midpoint = (start + end) / 2
+            if not own_start <= midpoint < own_end:
+                continue
+            # Drop an exact repeat of the previous segment left over at a boundary
+            if stitched and stitched[-1]["text"].strip() == segment["text"].strip() \
+                    and start - stitched[-1]["end"] < 1.0:
+                continue
+            merged = dict(segment)
+            merged["start"] = start
+            merged["end"] = end
+            merged["seek"] = segment.get("seek", 0) + int(offset * SAMPLE_RATE) // SAMPLES_PER_SEEK
+            merged["id"] = len(stitched)
+            stitched.append(merged)
+    return stitched
+
+
+def transcribe_chunked(audio, settings, workers, chunk_seconds=300.0, overlap_seconds=2.0, on_segments=None,
+                       **options):
+    """
+    Transcribes audio in parallel by splitting it at silences into overlapping windows.
+    Args:
+        audio (str or np.ndarray): Path to an audio/video file, or 16 kHz mono float32 samples.
+        settings (dict): Backend settings loaded by each worker (TranscriptionBackend.settings()).
+        workers (int): Number of worker processes.
+        chunk_seconds (float): Target length of each chunk in seconds.
+        overlap_seconds (float): Audio added on both sides of each chunk for context.
+        on_segments (callable, optional): Called with the stitched segments so far each time
+            the next chunk (in timeline order) is finished.
+        **options: Extra keyword arguments for the backend's transcribe (e.g. language).
+    Returns:
+        tuple: (transcription text, list of segments with timestamps), like a single Whisper run.
+    """
+    samples = stream_audio(audio) if isinstance(audio, str) else audio
+    points = find_split_points(samples, chunk_seconds, search_seconds=min(30.0, chunk_seconds / 4))
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    print(f"Transcribing {len(samples) / SAMPLE_RATE:.0f}s of audio in {len(points) - 1} chunk(s) "
+          f"on {workers} worker(s)...")
+
+    pool = _get_pool(settings, workers)
+    jobs = []
+    for own_start, own_end in zip(points[:-1], points[1:]):
+        window_start = max(0, own_start - overlap)
+        window_end = min(len(samples), own_end + overlap)
+        future = pool.submit(_transcribe_window, samples[window_start:window_end], options)
+        jobs.append((future, window_start / SAMPLE_RATE, own_start / SAMPLE_RATE, own_end / SAMPLE_RATE))
+
+    # The last window owns everything up to infinity so a trailing segment is never lost
+    jobs[-1] = jobs[-1][:3] + (float("inf"),)
+    windows = []
+    for future, offset, own_start, own_end in jobs:
+        windows.append((future.result(), offset, own_start, own_end))
+        if on_segments:
+            on_segments(stitch_segments(windows))
+
+    segments = stitch_segments(windows)
+    transcription = "".join(segment["text"] for segment in segments)
+    return transcription, segments
+
+
+def transcribe_windows(backend, samples, window_seconds, on_segments=None, **options):
+    """
+    Transcribes audio sequentially in windows cut at silences, so engines that cannot report
+    segments while decoding still deliver the transcript progressively.
+    Args:
+        backend (TranscriptionBackend): Loaded transcription backend.
+        samples (np.ndarray): 16 kHz mono float32 samples.
+        window_seconds (float): Target window length in seconds.
+        on_segments (callable, optional): Called with the segments so far after every window.
+        **options: Extra keyword arguments for the backend's transcribe.
+    Returns:
+        tuple: (transcription text, list of segments with timestamps).
+    """
+    points = find_split_points(samples, window_seconds, search_seconds=min(10.0, window_seconds / 4))
+    windows = []
+    for own_start, own_end in zip(points[:-1], points[1:]):
+        window_segments = backend.transcribe(samples[own_start:own_end], **options)["segments"]
+        # Windows don't overlap, so each one owns everything from its start onwards
+        windows.append((window_segments, own_start / SAMPLE_RATE, own_start / SAMPLE_RATE, float("inf")))
+        if on_segments:
+            on_segments(stitch_segments(windows))
+
+    segments = stitch_segments(windows)
+    transcription = "".join(segment["text"] for segment in segments)
+    return transcription, segments
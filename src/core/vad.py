@@ -0,0 +1,181 @@
+# src/core/vad.py
+import numpy as np
+
+from core.audio import SAMPLE_RATE
+from core.config import (VAD_THRESHOLD_DB, VAD_MIN_SPEECH_SECONDS, VAD_MIN_SILENCE_SECONDS,
+                         VAD_PADDING_SECONDS)
+
+# Analysis frame length (30 ms, a common VAD frame size)
+FRAME_SECONDS = 0.03
+
+# Frequency band holding most of the energy of speech (fundamental to upper formants)
+SPEECH_BAND_HZ = (80, 4000)
+
+# Frames with at least this fraction of their energy in the speech band count as voiced,
+# which rejects mains hum and broadband hiss (white noise puts about half its energy in the band)
+MIN_BAND_RATIO = 0.7
+
+# Frames quieter than this (in dBFS) are silent whatever the noise floor is
+ABSOLUTE_FLOOR_DB = -60.0
+
+# Frames are transformed this many at a time to bound the memory used by the FFT
+FFT_BLOCK_FRAMES = 4096
+
+# Silence inserted between the speech regions handed to the model, so words of two regions never run together
+JOIN_SILENCE_SECONDS = 0.3
+
+
+def frame_features(samples, sample_rate=SAMPLE_RATE):
+    """
+    Computes per-frame loudness and the fraction of each frame's energy in the speech band.
+    Args:
+        samples (np.ndarray): Mono float32 samples.
+        sample_rate (int): Sample rate in Hz.
+    Returns:
+        tuple: (np.ndarray of frame energies in dBFS, np.ndarray of speech band energy ratios).
+    """
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.square(frames).mean(axis=1) + 1e-10)
+
+    frequencies = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+    band = (frequencies >= SPEECH_BAND_HZ[0]) & (frequencies <= SPEECH_BAND_HZ[1])
+    window = np.hanning(frame).astype(np.float32)
+    band_ratio = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, FFT_BLOCK_FRAMES):
+        power = np.square(np.abs(np.fft.rfft(frames[start:start + FFT_BLOCK_FRAMES] * window, axis=1)))
+        band_ratio[start:start + FFT_BLOCK_FRAMES] = power[:, band].sum(axis=1) / (power.sum(axis=1) + 1e-10)
+    return energy_db, band_ratio
+
+
+def _runs(mask):
+    """Returns the [start, end) frame ranges where a boolean mask is True."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges.reshape(-1, 2)
+
+
+def speech_regions(samples, sample_rate=SAMPLE_RATE, threshold_db=VAD_THRESHOLD_DB,
+                   min_speech=VAD_MIN_SPEECH_SECONDS, min_silence=VAD_MIN_SILENCE_SECONDS,
+                   padding=VAD_PADDING_SECONDS):
+    """
+    Finds the stretches of a recording that contain speech.
+    A frame is voiced when it is `threshold_db` louder than the recording's noise floor
+    and most of its energy lies in the speech band. Pauses shorter than `min_silence`
+    are bridged, blips shorter than `min_speech` dropped, and every region is padded.
+    Args:
+        samples (np.ndarray): Mono float32 samples.
+        sample_rate (int): Sample rate in Hz.
+        threshold_db (float): Loudness above the noise floor that counts as speech.
+        min_speech (float): Shortest speech region kept, in seconds.
+        min_silence (float): Shortest pause that splits two regions, in seconds.
+        padding (float): Audio kept on both sides of every region, in seconds.
+    Returns:
+        list of tuple: (start, end) sample offsets of the speech regions, in order.
+    """
+    energy_db, band_ratio = frame_features(samples, sample_rate)
+    if not len(energy_db):
+        return []
+    # The quietest tenth of the recording approximates its background noise (digital silence,
+    # e.g. a muted microphone, would drag the estimate down and is left out)
+    audible = energy_db[energy_db > ABSOLUTE_FLOOR_DB]
+    if not len(audible):
+        return []
+    noise_floor = np.percentile(audible, 10)
+    voiced = (energy_db > max(noise_floor + threshold_db, ABSOLUTE_FLOOR_DB)) & (band_ratio >= MIN_BAND_RATIO)
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    runs = _runs(voiced)
+    if not len(runs):
+        return []
+    # Bridge short pauses, then drop regions too short to hold a word
+    gaps = runs[1:, 0] - runs[:-1, 1]
+    split = np.flatnonzero(gaps * FRAME_SECONDS >= min_silence)
+    starts = runs[np.concatenate(([0], split + 1)), 0]
+    ends = runs[np.concatenate((split, [len(runs) - 1])), 1]
+    keep = (ends - starts) * FRAME_SECONDS >= min_speech
+
+    pad = int(padding * sample_rate)
+    regions = []
+    for start, end in zip(starts[keep] * frame, ends[keep] * frame):
+        start, end = max(0, int(start) - pad), min(len(samples), int(end) + pad)
+        if regions and start <= regions[-1][1]:
+            # Padding made two regions touch
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+class SpeechMap:
+    """
+    Concatenation of a recording's speech regions, with the mapping from times in the
+    concatenated audio back to times in the original recording.
+    """
+
+    def __init__(self, samples, regions, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            samples (np.ndarray): Mono float32 samples of the whole recording.
+            regions (list of tuple): (start, end) sample offsets of the speech regions.
+            sample_rate (int): Sample rate in Hz.
+        """
+        join = np.zeros(int(JOIN_SILENCE_SECONDS * sample_rate), dtype=np.float32)
+        pieces = []
+        compact_starts = []
+        position = 0
+        for start, end in regions:
+            if pieces:
+                pieces.append(join)
+                position += len(join)
+            compact_starts.append(position)
+            pieces.append(samples[start:end])
+            position += end - start
+        self.samples = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+        self.sample_rate = sample_rate
+        self.total_seconds = len(samples) / sample_rate
+        self.speech_seconds = sum(end - start for start, end in regions) / sample_rate
+        self._compact_starts = np.asarray(compact_starts, dtype=np.float64) / sample_rate
+        self._original_starts = np.asarray([start for start, _ in regions], dtype=np.float64) / sample_rate
+        self._lengths = np.asarray([end - start for start, end in regions], dtype=np.float64) / sample_rate
+
+    @property
+    def skipped_ratio(self):
+        """float: Fraction of the recording that is not transcribed."""
+        return 1 - self.speech_seconds / self.total_seconds if self.total_seconds else 0.0
+
+    def to_original(self, time):
+        """
+        Maps a time in the concatenated audio back to the original recording.
+        Times inside the silence joining two regions map to the end of the earlier one.
+        Args:
+            time (float): Seconds into the concatenated audio.
+        Returns:
+            float: Seconds into the original recording.
+        """
+        if not len(self._compact_starts):
+            return time
+        index = max(0, int(np.searchsorted(self._compact_starts, time, side="right")) - 1)
+        return float(self._original_starts[index] + min(time - self._compact_starts[index], self._lengths[index]))
+
+    def remap_segments(self, segments):
+        """
+        Moves Whisper-style segments (and their word timings, if any) onto the original timeline.
+        Args:
+            segments (list of dict): Segments with times in the concatenated audio.
+        Returns:
+            list of dict: Copies of the segments with original times.
+        """
+        remapped = []
+        for segment in segments:
+            moved = dict(segment)
+            moved["start"] = self.to_original(segment["start"])
+            moved["end"] = max(moved["start"], self.to_original(segment["end"]))
+            # Whisper's seek counts 10 ms mel frames from the start of the audio
+            if "seek" in segment:
+                moved["seek"] = segment["seek"] + int(round((moved["start"] - segment["start"]) * 100))
+            if segment.get("words"):
+                moved["words"] = [dict(word, start=self.to_original(word["start"]), end=self.to_original(word["end"]))
+                                  for word in segment["words"]]
+            remapped.append(moved)
+        return remapped
@@ -0,0 +1,317 @@
+# src/core/workers.py
+import os
+import time
+import itertools
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.backends import create_backend
+from core.transcription import transcribe_windows
+from core.metrics import inc, observe, set_gauge
+from core.config import (SERVER_WORKERS, SERVER_QUEUE_SIZE, SERVER_WORKER_THREADS, SERVER_PIN_CPUS,
+                         TRANSCRIBE_WINDOW_SECONDS)
+
+# State of each worker process (set by _init_worker)
+_worker_backend = None
+_worker_settings = None
+_worker_threads = 0
+_worker_progress = None
+
+# Backends of other transcription tiers, loaded by a worker the first time a job asks for them
+_tier_backends = {}
+
+
+class ServerBusy(Exception):
+    """Raised when a transcription job is refused because the queue is full."""
+
+
+def _init_worker(settings, threads, progress, counter, pin_cpus):
+    """
+    Loads the transcription model once per worker process, pins its thread count and,
+    optionally, its own set of CPU cores so workers never compete for the same cores.
+    Args:
+        settings (dict): Backend settings, as returned by TranscriptionBackend.settings().
+        threads (int): Number of CPU threads for this worker.
+        progress (multiprocessing.Queue): Queue partial segments are reported on.
+        counter (multiprocessing.Value): Shared counter handing out worker indices.
+        pin_cpus (bool): Restrict the worker to `threads` dedicated cores (Linux only).
+    """
+    global _worker_backend, _worker_settings, _worker_threads, _worker_progress
+    # Math libraries read these when they are first imported, i.e. while loading the model below
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    if pin_cpus and len(cores) >= threads * (index + 1):
+        os.sched_setaffinity(0, cores[threads * index:threads * (index + 1)])
+
+    _worker_settings, _worker_threads = settings, threads
+    _worker_backend = _load_backend(settings, threads)
+    _worker_progress = progress
+
+
+def _load_backend(settings, threads):
+    """Creates a backend from its settings (as returned by TranscriptionBackend.settings()) and loads it."""
+    settings = dict(settings, threads=threads)
+    backend = create_backend(settings.pop("backend"), **settings)
+    backend.load()
+    return backend
+
+
+def _job_backend(settings):
+    """
+    Returns the worker's backend for a job: the preloaded one, or the model of another
+    transcription tier, loaded on first use and kept for later jobs.
+    Args:
+        settings (dict or None): Backend settings of the job (None for the preloaded backend).
+    Returns:
+        TranscriptionBackend: A loaded backend.
+    """
+    if settings is None or settings == _worker_settings:
+        return _worker_backend
+    key = tuple(sorted(settings.items()))
+    if key not in _tier_backends:
+        print(f"Worker {os.getpid()} loading {settings['backend']} model '{settings['model_size']}'...")
+        _tier_backends[key] = _load_backend(settings, _worker_threads)
+    return _tier_backends[key]
+
+
+def _ping():
+    """Returns the worker's process id (used to start every worker up front)."""
+    return os.getpid()
+
+
+def _run_job(job_id, samples, window_seconds, settings=None):
+    """
+    Transcribes one recording inside a worker process, reporting segments as they are produced.
+    Args:
+        job_id (int): Job identifier, attached to every progress report.
+        samples (np.ndarray): 16 kHz mono float32 samples.
+        window_seconds (float): Window length for engines that cannot report segments while decoding.
+        settings (dict, optional): Backend settings of the job's transcription tier (defaults to the preloaded backend).
+    Returns:
+        tuple: (transcription text, list of segments with timestamps).
+    """
+    def report(segments):
+        _worker_progress.put((job_id, segments))
+
+    backend = _job_backend(settings)
+    if not backend.streams_segments and window_seconds > 0:
+        return transcribe_windows(backend, samples, window_seconds, on_segments=report)
+    result = backend.transcribe(samples, on_segments=report)
+    return result["text"], result["segments"]
+
+
+class Ticket:
+    """A transcription job admitted to the pool, waiting for or holding a worker."""
+
+    __slots__ = ("id", "admitted", "running")
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.admitted = time.monotonic()
+        self.running = False
+
+
+class TranscriptionPool:
+    """
+    Fixed set of transcription worker processes, each with a preloaded model and its own
+    share of the CPU cores. Jobs are admitted up to `queue_size` beyond the number of
+    workers (later ones are refused with ServerBusy), wait in arrival order and are
+    dispatched only when a worker is free, so waiting jobs can be told their position.
+    """
+
+    def __init__(self, workers, queue_size, threads=0, pin_cpus=True):
+        """
+        Args:
+            workers (int): Number of worker processes.
+            queue_size (int): Jobs allowed to wait for a worker.
+            threads (int): CPU threads per worker (0 splits the cores evenly).
+            pin_cpus (bool): Give each worker dedicated cores.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.pin_cpus = pin_cpus
+        self._executor = None
+        self._waiting = deque()
+        self._running = 0
+        self._ids = itertools.count(1)
+        self._callbacks = {}
+        self._condition = threading.Condition()
+        self._context = multiprocessing.get_context("spawn")
+        self._progress = None
+
+    def start(self, settings):
+        """
+        Starts the worker processes and loads their models in the background.
+        Args:
+            settings (dict): Backend settings each worker loads.
+        Returns:
+            threading.Thread: The (daemon) thread waiting for every worker to be ready.
+        """
+        with self._condition:
+            if self._executor is None:
+                self._settings = settings
+                self._progress = self._context.Queue()
+                self._executor = self._create_executor()
+                threading.Thread(target=self._forward_progress, name="transcription-progress", daemon=True).start()
+            executor = self._executor
+
+        def wait_ready():
+            started = time.perf_counter()
+            try:
+                # Submitting one task per worker before any finishes starts every process
+                pids = [future.result() for future in [executor.submit(_ping) for _ in range(self.workers)]]
+                print(f"{len(set(pids))} transcription worker(s) ready in {time.perf_counter() - started:.1f}s "
+                      f"({self.threads} thread(s) each).")
+            except Exception as e:
+                print(f"Error starting transcription workers: {e}")
+
+        thread = threading.Thread(target=wait_ready, name="transcription-workers", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def started(self):
+        """bool: True once start has been called."""
+        return self._executor is not None
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context, initializer=_init_worker,
+                                   initargs=(self._settings, self.threads, self._progress,
+                                             self._context.Value("i", 0), self.pin_cpus))
+
+    def _forward_progress(self):
+        """Hands partial segments reported by the workers to the callback of their job."""
+        while True:
+            job_id, segments = self._progress.get()
+            # Holding the lock keeps a late report from arriving after its job has returned
+            with self._condition:
+                callback = self._callbacks.get(job_id)
+                if callback:
+                    callback(segments)
+
+    def _update_gauges(self):
+        set_gauge("lecchurro_transcription_queue_depth", len(self._waiting))
+        set_gauge("lecchurro_transcription_running", self._running)
+
+    def admit(self):
+        """
+        Admits a job to the queue.
+        Returns:
+            Ticket: The job's place in the queue.
+        Raises:
+            ServerBusy: If every worker is busy and the queue is full.
+        """
+        with self._condition:
+            if len(self._waiting) + self._running >= self.workers + self.queue_size:
+                inc("lecchurro_transcription_rejected_total")
+                raise ServerBusy(f"The server is busy ({self._running} lecture(s) transcribing, "
+                                 f"{len(self._waiting)} waiting). Please try again in a few minutes.")
+            ticket = Ticket(next(self._ids))
+            self._waiting.append(ticket)
+            self._update_gauges()
+            return ticket
+
+    def position(self, ticket):
+        """
+        Args:
+            ticket (Ticket): An admitted job.
+        Returns:
+            int: 1-based position of the job in the queue (0 once it holds a worker).
+        """
+        with self._condition:
+            if ticket.running:
+                return 0
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def wait_turn(self, ticket, timeout=None):
+        """
+        Waits until the job is first in line and a worker is free, then reserves that worker.
+        Args:
+            ticket (Ticket): An admitted job.
+            timeout (float, optional): Maximum seconds to wait.
+        Returns:
+            bool: True if the job now holds a worker, False on timeout.
+        """
+        with self._condition:
+            if ticket.running:
+                return True
+            ready = self._condition.wait_for(
+                lambda: self._waiting and self._waiting[0] is ticket and self._running < self.workers, timeout)
+            if not ready:
+                return False
+            self._waiting.popleft()
+            ticket.running = True
+            self._running += 1
+            observe("lecchurro_transcription_queue_wait_seconds", time.monotonic() - ticket.admitted)
+            self._update_gauges()
+            self._condition.notify_all()
+            return True
+
+    def release(self, ticket):
+        """
+        Gives up a job's worker or its place in the queue. Safe to call more than once.
+        Args:
+            ticket (Ticket): An admitted job.
+        """
+        with self._condition:
+            if ticket.running:
+                ticket.running = False
+                self._running -= 1
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+            self._callbacks.pop(ticket.id, None)
+            self._update_gauges()
+            self._condition.notify_all()
+
+    def transcribe(self, ticket, samples, on_segments=None, settings=None):
+        """
+        Transcribes audio on the worker reserved by wait_turn.
+        Args:
+            ticket (Ticket): A job holding a worker.
+            samples (np.ndarray): 16 kHz mono float32 samples.
+            on_segments (callable, optional): Called with the segments transcribed so far.
+            settings (dict, optional): Backend settings of the job's transcription tier
+                (defaults to the model the workers preloaded).
+        Returns:
+            tuple: (transcription text, list of segments with timestamps).
+        """
+        self.wait_turn(ticket)
+        with self._condition:
+            if on_segments:
+                self._callbacks[ticket.id] = on_segments
+            executor = self._executor
+        try:
+            return executor.submit(_run_job, ticket.id, samples, TRANSCRIBE_WINDOW_SECONDS, settings).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); replace the pool so later jobs still run
+            with self._condition:
+                if self._executor is executor:
+                    print("A transcription worker died, restarting the worker pool.")
+                    self._executor = self._create_executor()
+            raise
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of running and waiting jobs.
+        """
+        with self._condition:
+            return {"running": self._running, "waiting": len(self._waiting)}
+
+
+# Shared pool used in server mode (None when transcription runs in the app process)
+transcription_pool = (TranscriptionPool(SERVER_WORKERS, SERVER_QUEUE_SIZE, SERVER_WORKER_THREADS, SERVER_PIN_CPUS)
+                      if SERVER_WORKERS > 0 else None)
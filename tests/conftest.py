@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core import metrics
+
+
+@pytest.fixture(autouse=True)
+def trace_file(tmp_path, monkeypatch):
+    """Writes the spans of every test to its own temporary trace file instead of data/metrics."""
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(metrics, "TRACE_FILE", path)
+    return path
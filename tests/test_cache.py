@@ -0,0 +1,128 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core import cache as cache_module
+from core.cache import ArtifactCache, file_signature
+
+
+def test_caches_sharing_a_directory_keep_each_others_entries(tmp_path):
+    # Two processes (e.g. batch workers) each hold their own copy of the index
+    first = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    second = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    first.put_json("aaaaaaaaaaaaaaaa-transcript-1", {"text": "first"})
+    second.put_json("bbbbbbbbbbbbbbbb-transcript-1", {"text": "second"})
+
+    # Each sees the other's artifact, and so does a cache opened afterwards
+    assert first.get_json("bbbbbbbbbbbbbbbb-transcript-1") == {"text": "second"}
+    fresh = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    assert fresh.get_json("aaaaaaaaaaaaaaaa-transcript-1") == {"text": "first"}
+    assert fresh.get_json("bbbbbbbbbbbbbbbb-transcript-1") == {"text": "second"}
+
+
+def test_removals_are_merged_too(tmp_path):
+    first = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    second = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    first.put_json("aaaaaaaaaaaaaaaa-summary-1", "notes")
+    second.put_json("bbbbbbbbbbbbbbbb-summary-1", "notes")
+    first.invalidate(stage="summary")
+
+    second.put_json("cccccccccccccccc-summary-1", "notes")
+    fresh = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    assert not fresh.contains("aaaaaaaaaaaaaaaa-summary-1")
+    assert not fresh.contains("bbbbbbbbbbbbbbbb-summary-1")
+    assert fresh.contains("cccccccccccccccc-summary-1")
+
+
+def test_least_recently_used_artifacts_are_evicted_first(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=25)
+    cache.put_text("aaaaaaaaaaaaaaaa-summary-1", "x" * 10)
+    cache.put_text("bbbbbbbbbbbbbbbb-summary-1", "x" * 10)
+    assert cache.get_text("aaaaaaaaaaaaaaaa-summary-1") == "x" * 10  # Now the most recently used
+
+    cache.put_text("cccccccccccccccc-summary-1", "x" * 10)
+    assert cache.total_bytes() == 20
+    assert cache.contains("aaaaaaaaaaaaaaaa-summary-1") and cache.contains("cccccccccccccccc-summary-1")
+    assert not cache.contains("bbbbbbbbbbbbbbbb-summary-1")
+    assert not os.path.exists(os.path.join(tmp_path, "bbbbbbbbbbbbbbbb"))
+
+
+def test_invalidate_by_video_and_stage(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    for key in ("aaaaaaaaaaaaaaaa-summary-1", "aaaaaaaaaaaaaaaa-quizzes-1",
+                "bbbbbbbbbbbbbbbb-summary-1", "bbbbbbbbbbbbbbbb-quizzes-1"):
+        cache.put_text(key, "notes")
+
+    assert cache.invalidate(video_key="a" * 64, stage="summary") == 1
+    assert cache.invalidate(stage="quizzes") == 2
+    assert not cache.contains("aaaaaaaaaaaaaaaa-summary-1") and cache.contains("bbbbbbbbbbbbbbbb-summary-1")
+    assert cache.invalidate() == 1 and cache.total_bytes() == 0
+
+
+def test_get_or_compute_only_caches_valid_values(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"text": "Error: the model timed out."}
+
+    def is_valid(value):
+        return not value["text"].startswith("Error")
+
+    for _ in range(2):
+        assert cache.get_or_compute("aaaaaaaaaaaaaaaa-summary-1", compute, is_valid)["text"].startswith("Error")
+    assert len(calls) == 2 and not cache.contains("aaaaaaaaaaaaaaaa-summary-1")
+
+    assert cache.get_or_compute("aaaaaaaaaaaaaaaa-summary-1", lambda: {"text": "notes"}, is_valid) == {"text": "notes"}
+    assert cache.get_or_compute("aaaaaaaaaaaaaaaa-summary-1", compute, is_valid) == {"text": "notes"}
+    assert len(calls) == 2
+
+
+def test_hits_are_written_back_in_batches(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.put_text("aaaaaaaaaaaaaaaa-summary-1", "notes")
+    signature = file_signature(cache.index_path)
+    for _ in range(5):
+        assert cache.get_path("aaaaaaaaaaaaaaaa-summary-1")
+    assert file_signature(cache.index_path) == signature
+    accessed = cache._index["entries"]["aaaaaaaaaaaaaaaa-summary-1"]["last_access"]
+
+    # The access time goes out with the next hit once the flush interval has passed
+    monkeypatch.setattr(cache_module, "ACCESS_FLUSH_SECONDS", 0)
+    cache.get_path("aaaaaaaaaaaaaaaa-summary-1")
+    fresh = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    assert fresh._index["entries"]["aaaaaaaaaaaaaaaa-summary-1"]["last_access"] >= accessed
+
+
+def test_a_hit_does_not_bring_back_an_artifact_another_process_removed(tmp_path):
+    first = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    second = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    first.put_text("aaaaaaaaaaaaaaaa-summary-1", "notes")
+    assert second.get_path("aaaaaaaaaaaaaaaa-summary-1")
+    first.invalidate()
+
+    second.put_text("bbbbbbbbbbbbbbbb-summary-1", "notes")
+    fresh = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    assert "aaaaaaaaaaaaaaaa-summary-1" not in fresh._index["entries"]
+
+
+def test_video_hashes_are_forgotten_with_the_last_artifact(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    videos = []
+    for name in ("first.mp4", "second.mp4"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        videos.append(cache.video_key(str(path)))
+    for video in videos:
+        cache.put_text(cache.stage_key(video, "summary", {}), "notes")
+        cache.put_text(cache.stage_key(video, "quizzes", {}), "quiz")
+    assert len(cache._index["files"]) == 2
+
+    cache.invalidate(video_key=videos[0], stage="summary")
+    assert len(cache._index["files"]) == 2  # The quiz is still cached
+    cache.invalidate(video_key=videos[0])
+    assert list(cache._index["files"].values()) == [videos[1]]
+    fresh = ArtifactCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    assert list(fresh._index["files"].values()) == [videos[1]]
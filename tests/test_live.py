@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.live import LiveTranscriber, LiveSession, LiveNotes, SAMPLE_RATE
+
+BLOCK = SAMPLE_RATE // 2
+
+
+class FakeBackend:
+    """Stand-in for Whisper: one segment per stretch of non-zero audio in the window."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], (audio != 0).astype(np.int8), [0])))).reshape(-1, 2)
+        return {"segments": [{"start": start / SAMPLE_RATE, "end": end / SAMPLE_RATE, "text": " words"}
+                             for start, end in edges]}
+
+
+def lecture_audio(seconds, speech=2.5, pause=1.0):
+    """Stand-in for the ffmpeg-decoded stream: utterances separated by pauses, and their times."""
+    samples = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+    utterances = []
+    start = 0.5
+    while start + speech < seconds:
+        samples[int(start * SAMPLE_RATE):int((start + speech) * SAMPLE_RATE)] = 0.3
+        utterances.append((start, start + speech))
+        start += speech + pause
+    return samples, utterances
+
+
+def test_rolling_window_commits_every_utterance_once():
+    samples, utterances = lecture_audio(300)
+    transcriber = LiveTranscriber(FakeBackend(), window_seconds=30, step_seconds=5, hold_seconds=2)
+    for start in range(0, len(samples), BLOCK):
+        transcriber.push(samples[start:start + BLOCK])
+        while transcriber.ready():
+            transcriber.step()
+    transcriber.flush()
+
+    assert len(transcriber.segments) == len(utterances)
+    for segment, (start, end) in zip(transcriber.segments, utterances):
+        assert abs(segment["start"] - start) < 0.01 and abs(segment["end"] - end) < 0.01
+
+
+def test_backlog_is_bounded_and_keeps_the_timeline():
+    # Three hours of audio arrive while transcription never gets a turn
+    transcriber = LiveTranscriber(FakeBackend(), window_seconds=30, max_backlog_seconds=60)
+    block = np.full(BLOCK * 20, 0.3, dtype=np.float32)
+    for _ in range(3 * 3600 // 10):
+        transcriber.push(block)
+
+    assert transcriber._buffer.nbytes == 90 * SAMPLE_RATE * 4
+    assert abs(transcriber.audio_seconds - 3 * 3600) < 1e-6
+    assert abs(transcriber.skipped_seconds - (3 * 3600 - 90)) < 1e-6
+
+
+class EmptySegmentBackend:
+    """Whisper hallucinating a zero-length segment at the start of every window."""
+
+    def transcribe(self, audio, **options):
+        return {"segments": [{"start": 0.0, "end": 0.0, "text": " you"}]}
+
+
+def test_flush_always_consumes_the_remaining_audio():
+    transcriber = LiveTranscriber(EmptySegmentBackend(), window_seconds=30)
+    transcriber.push(np.full(45 * SAMPLE_RATE, 0.3, dtype=np.float32))
+    transcriber.flush()
+
+    # One window, then the 15 seconds left over
+    assert len(transcriber.segments) == 2
+    assert transcriber._filled == 0
+
+
+def test_session_ends_with_final_outputs(monkeypatch):
+    monkeypatch.setattr("core.live.summarize_chunk", lambda chunk, section, total, template: "## Notes")
+    samples, utterances = lecture_audio(40)
+    session = LiveSession("test", backend=FakeBackend())
+    session.notes.label_topics_with_llm = False
+
+    def stream():
+        for start in range(0, len(samples), BLOCK):
+            session.push(samples[start:start + BLOCK])
+        session.stop()
+
+    threading.Thread(target=stream).start()
+    events = list(session.events())
+
+    done = {stage: value for kind, stage, value in events if kind == "done"}
+    assert set(done) == {"transcript", "summary", "timestamps"}
+    assert len(done["transcript"]) == len(utterances)
+    assert done["summary"] == "## Notes"
+
+
+def test_failed_refreshes_wait_for_the_next_interval(monkeypatch):
+    calls = []
+
+    def summarize_chunk(chunk, section, total, template):
+        calls.append(len(chunk))
+        if len(calls) == 1:
+            raise RuntimeError("rate limited")
+        return "## Notes"
+
+    monkeypatch.setattr("core.live.summarize_chunk", summarize_chunk)
+    notes = LiveNotes(refresh_seconds=30, label_topics_with_llm=False)
+    segments = [{"start": float(t), "end": t + 1.0, "text": " words"} for t in range(0, 120, 2)]
+
+    notes.refresh(segments[:16])  # Up to 32 s: the summary fails
+    assert calls == [16] and notes.sections == []
+    # Still due by the transcript, but the failed attempt is only retried 30 s of transcript later
+    assert not notes.due(segments[:30])
+    assert notes.due(segments[:31])
+
+    notes.refresh(segments[:31])
+    assert calls == [16, 31] and len(notes.sections) == 1
+    assert not notes.due(segments[:46]) and notes.due(segments[:47])
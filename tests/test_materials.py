@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.materials import MaterialsStreamParser, annotate_transcript, format_flashcards_text
+
+SUMMARY = '# Notes\n\nSay "quizzes": café \\ naïve — ok 😀'
+QUESTIONS = [{"question": "Is i a number?", "options": ["Yes", "No"], "answer": "Yes"},
+             {"question": "Broken", "options": ["A", "B"], "answer": "C"},
+             {"question": "Is 2 prime?", "options": ["Yes", "No"], "answer": "Yes"}]
+# ensure_ascii escapes the non-ASCII characters (the emoji as a surrogate pair), so \uXXXX sequences
+# get split across pieces too
+RESPONSE = json.dumps({"summary": SUMMARY, "quizzes": QUESTIONS, "flashcards": [], "topics": []})
+
+
+def stream(parser, text, step):
+    """Feeds a response in pieces, recording the parser's state after each one."""
+    states = []
+    for end in range(step, len(text) + step, step):
+        parser.feed(text[:end])
+        states.append((end, parser.summary, len(parser.quiz.questions)))
+    return states
+
+
+def test_summary_streams_in_and_the_quiz_follows():
+    for step in (1, 3, 7):
+        parser = MaterialsStreamParser()
+        states = stream(parser, RESPONSE, step)
+
+        summaries = [summary for _, summary, _ in states if summary is not None]
+        # Every partial summary is a prefix of the final one, whatever escape the piece ended in
+        assert summaries and all(SUMMARY.startswith(summary) for summary in summaries)
+        assert parser.summary == SUMMARY
+        # The quoted "quizzes" inside the summary is not mistaken for the key
+        summary_end = RESPONSE.index('", "quizzes"')
+        assert all(count == 0 for end, _, count in states if end <= summary_end)
+        assert [question["question"] for question in parser.quiz.questions] == ["Is i a number?", "Is 2 prime?"]
+        assert parser.quiz.dropped == 1
+
+
+def test_nothing_is_parsed_before_the_summary_starts():
+    parser = MaterialsStreamParser()
+    parser.feed('{"summ')
+    assert parser.summary is None
+    parser.feed('{"summary": "')
+    assert parser.summary == ""
+
+
+def test_annotate_transcript_marks_subtopic_starts():
+    segments = [{"start": 0.0, "text": " Intro."}, {"start": 5.0, "text": " Algebra."}, {"start": 9.0, "text": " More."}]
+    groups = [{"segments": [{"start_time": 0.0}, {"start_time": 4.0}]}, {"segments": [{"start_time": 9.0}]}]
+    assert annotate_transcript(segments, groups) == "[0.0] Intro. [0.1] Algebra. [1.0] More."
+
+
+def test_flashcards_text_skips_empty_cards():
+    cards = [{"front": " What is  i? ", "back": "The square\nroot of -1."}, {"front": "", "back": "x"}, "junk"]
+    assert format_flashcards_text(cards) == "Front: What is i?\nBack: The square root of -1."
@@ -0,0 +1,42 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core import metrics
+from core.metrics import span
+
+
+def read_spans(path):
+    """Names of the spans in a JSON lines trace file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)["name"] for line in f]
+
+
+def test_spans_are_written_as_json_lines(trace_file):
+    with span("outer", lecture="test"):
+        with span("inner") as attributes:
+            attributes["tokens"] = 3
+    with open(trace_file, 'r', encoding='utf-8') as f:
+        inner, outer = map(json.loads, f)
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert inner["parent_id"] == outer["span_id"] and inner["trace_id"] == outer["trace_id"]
+    assert inner["attributes"] == {"tokens": 3} and outer["error"] is None
+
+
+def test_trace_file_is_rotated_at_the_size_limit(trace_file, monkeypatch):
+    with span("span-0"):
+        pass
+    limit = os.path.getsize(trace_file) * 5 // 2
+    monkeypatch.setattr(metrics, "TRACE_MAX_BYTES", limit)
+
+    names = [f"span-{i}" for i in range(10)]
+    for name in names[1:]:
+        with span(name):
+            pass
+    # Both files stay under the limit, and only the latest previous file is kept
+    assert os.path.getsize(trace_file) <= limit and os.path.getsize(trace_file + ".1") <= limit
+    kept = read_spans(trace_file + ".1") + read_spans(trace_file)
+    assert kept == names[-len(kept):] and len(read_spans(trace_file + ".1")) == 2
+    assert not os.path.exists(trace_file + ".2")
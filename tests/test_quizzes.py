@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.quizzes import QuizStreamParser, parse_quiz_response, validate_question
+
+
+def question(text, options=("Yes", "No"), answer="Yes"):
+    return {"question": text, "options": list(options), "answer": answer}
+
+
+def test_validate_question_normalizes_and_rejects():
+    assert validate_question({"question": " Why? ", "options": [" A", "B ", "C", "D"], "answer": "b"}) == \
+        {"question": "Why?", "options": ["A", "B", "C", "D"], "answer": "B"}
+    assert validate_question(question("Answer not an option", answer="Maybe")) is None
+    assert validate_question(question("Three options", options=("A", "B", "C"), answer="A")) is None
+    assert validate_question(question("Repeated options", options=("A", "A"), answer="A")) is None
+    assert validate_question(question("   ")) is None
+    assert validate_question({"question": "Missing options", "answer": "Yes"}) is None
+    assert validate_question(["not", "a", "dict"]) is None
+
+
+def test_questions_come_out_as_soon_as_they_are_complete():
+    first = question('Is "x" \\ {y} a set?')  # Quotes, a backslash and braces inside strings
+    bad = question("Which answer?", answer="Neither")
+    last = question("Is } a brace?", options=("Yes", "No"), answer="No")
+    response = '{"quizzes": [' + ", ".join(json.dumps(item) for item in (first, bad, last)) + "]}"
+    first_end = response.index("}", response.index('"answer"')) + 1
+
+    parser = QuizStreamParser()
+    emitted = []
+    for end in range(1, len(response) + 1, 7):
+        emitted.append((end, parser.feed(response[:end])))
+    emitted.append((len(response), parser.feed(response)))
+
+    completed = [(end, items) for end, items in emitted if items]
+    assert completed[0][0] - first_end < 7 and completed[0][1][0]["question"] == first["question"]
+    assert [item["question"] for _, items in completed for item in items] == [first["question"], last["question"]]
+    assert parser.dropped == 1
+    assert parser.questions == [validate_question(first), validate_question(last)]
+
+
+def test_malformed_items_are_dropped_one_by_one():
+    response = ('Here is your quiz: {"quizzes": [' + json.dumps(question("Kept?")) + ', {"question": "Broken", '
+                '"options": ["A" "B"], "answer": "A"}, ' + json.dumps(question("Also kept?")) + "]}")
+    assert [item["question"] for item in parse_quiz_response(response)] == ["Kept?", "Also kept?"]
+
+
+def test_truncated_tail_keeps_the_complete_questions():
+    response = '{"quizzes": [' + json.dumps(question("Complete?")) + ', {"question": "Cut off mid str'
+    parser = QuizStreamParser()
+    assert [item["question"] for item in parser.feed(response)] == ["Complete?"]
+    assert parser.dropped == 0
+    # Text after the closing bracket of the list is ignored
+    assert parse_quiz_response('{"quizzes": []} {"question": "Stray"}') == []
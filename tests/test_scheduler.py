@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.scheduler import RequestScheduler, TokenBucket, retry_after_seconds
+
+
+class FakeClock:
+    """Manual clock: sleeping advances time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(status_code, headers)
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.sleep(30)
+    assert bucket.wait_time(30) == 0.0
+
+
+def test_retries_rate_limits_using_retry_after():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_retries=3, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    def call():
+        attempts.append(clock())
+        if len(attempts) < 3:
+            raise FakeAPIError(429, {"retry-after": "2"})
+        return "ok"
+
+    assert scheduler.submit(call, tokens=10) == "ok"
+    assert attempts == [0.0, 2.0, 4.0]
+
+
+def test_gives_up_on_non_retryable_errors():
+    scheduler = RequestScheduler(max_retries=3, sleep=lambda seconds: None)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise FakeAPIError(400)
+
+    with pytest.raises(FakeAPIError):
+        scheduler.submit(call, tokens=10)
+    assert len(calls) == 1
+
+
+def test_retry_after_ms_takes_precedence():
+    error = FakeAPIError(429, {"retry-after-ms": "1500", "retry-after": "2"})
+    assert retry_after_seconds(error) == 1.5
+
+
+def wait_until(condition, timeout=5.0):
+    """Polls a condition until it holds, failing the test after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the scheduler"
+        time.sleep(0.01)
+
+
+def test_interactive_requests_jump_the_queue():
+    clock = FakeClock()
+    scheduler = RequestScheduler(rpm=60, clock=clock)
+    scheduler.requests.take(60)  # Empty bucket: nothing is admitted until the clock moves
+    order = []
+
+    def request(name, priority):
+        scheduler.acquire(1, priority)
+        order.append(name)
+
+    first = threading.Thread(target=request, args=("batch-1", "batch"))
+    first.start()
+    wait_until(lambda: scheduler.queue_depth() == 1)
+    threads = [threading.Thread(target=request, args=("batch-2", "batch")),
+               threading.Thread(target=request, args=("interactive", "interactive"))]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: scheduler.queue_depth() == 3)
+    clock.sleep(60)  # Refill the bucket; the waiters notice on their next timed wake-up
+    for thread in [first] + threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    assert order[0] == "interactive"
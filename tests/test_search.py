@@ -0,0 +1,82 @@
+import os
+import sys
+import math
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.search import SearchIndex, parse_query, tokenize, BM25_K1, BM25_B
+from core.segment_store import write_segments
+
+
+def segments(*texts):
+    return [{"start": 10.0 * i, "end": 10.0 * i + 9.5, "text": text} for i, text in enumerate(texts)]
+
+
+def build():
+    index = SearchIndex()
+    index.add_lecture("algebra", segments(" We complete the square here.", " The square sum.",
+                                          " Partial fractions come next."), video="algebra.mp4")
+    index.add_lecture("complex", segments(" Complex numbers square to minus one.", " It's a rotation."))
+    return index
+
+
+def test_tokenize_and_parse_query():
+    assert tokenize("It's Euler's e^(i*pi)!") == ["it's", "euler's", "e", "i", "pi"]
+    assert parse_query('complete "the Square" now') == ([["the", "square"]], ["complete", "now", "the", "square"])
+
+
+def test_bm25_scores_and_ranking():
+    index = build()
+    results = index.search("square")
+    assert [(result["lecture"], result["start"]) for result in results] == \
+        [("algebra", 10.0), ("algebra", 0.0), ("complex", 0.0)]
+
+    # The score of the best segment, by hand: "square" is in 3 of 5 segments
+    lengths = [5, 3, 4, 6, 3]
+    idf = math.log(1 + (5 - 3 + 0.5) / (3 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * 3 / (sum(lengths) / 5))
+    assert abs(results[0]["score"] - idf * (BM25_K1 + 1) / (1 + norm)) < 1e-9
+    assert results[0]["video"] == "algebra.mp4" and results[0]["text"] == "The square sum."
+
+    assert [result["start"] for result in index.search("square", limit=1)] == [10.0]
+    assert index.search("integral") == [] and index.search("") == []
+
+
+def test_phrase_queries_match_exact_word_order():
+    index = build()
+    assert [result["start"] for result in index.search('"complete the square"')] == [0.0]
+    assert index.search('"square the"') == []
+    # Only segments holding the phrase are returned, however well they match the other words
+    assert [result["lecture"] for result in index.search('"the square" complex')] == ["algebra", "algebra"]
+
+
+def test_removing_and_reindexing_a_lecture():
+    index = build()
+    assert index.remove_lecture("algebra") and not index.remove_lecture("algebra")
+    assert [result["lecture"] for result in index.search("square")] == ["complex"]
+    assert len(index) == 2 and index.total_length == 9
+
+    index.add_lecture("complex", segments(" Now about squares."))
+    assert index.search("square") == [] and len(index) == 1
+
+
+def test_sync_follows_the_segment_stores_and_snapshots(tmp_path):
+    stores = tmp_path / "text"
+    stores.mkdir()
+    write_segments(str(stores / "algebra.seg"), segments(" We complete the square here."))
+    write_segments(str(stores / "complex.seg"), segments(" Complex numbers square to minus one."))
+    index = SearchIndex()
+    assert index.sync(str(stores))
+    assert not index.sync(str(stores))
+    assert {result["lecture"] for result in index.search("square")} == {"algebra", "complex"}
+
+    os.remove(stores / "complex.seg")
+    assert index.sync(str(stores))
+    assert [result["lecture"] for result in index.search("square")] == ["algebra"]
+
+    snapshot = str(tmp_path / "index.pkl")
+    index.save(snapshot)
+    loaded = SearchIndex.load(snapshot)
+    assert loaded.search("square") == index.search("square")
+    assert not loaded.sync(str(stores))
+    assert len(SearchIndex.load(str(tmp_path / "missing.pkl"))) == 0
@@ -0,0 +1,74 @@
+import os
+import sys
+import csv
+import json
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.segment_store import SegmentStore, write_segments, convert_csv
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'text_timestamps',
+                          'necessity_of_complex_numbers.txt')
+
+
+def test_round_trip_keeps_times_text_and_tokens(tmp_path):
+    segments = [{"start": 0.0, "end": 2.5, "text": " Schrödinger's équation, e^{iπ} = −1 🙂",
+                 "tokens": [50364, 7, -1]},
+                {"start": 2.5, "end": 4.0, "text": " No tokens here."},
+                {"start": 4.0, "end": 6.25, "text": "", "tokens": None}]
+    path = str(tmp_path / "lecture.seg")
+    write_segments(path, segments)
+    store = SegmentStore.open(path)
+
+    assert len(store) == 3
+    assert [segment.text for segment in store] == [segment["text"] for segment in segments]
+    assert store.tokens(0).tolist() == [50364, 7, -1]
+    assert store.tokens(1).tolist() == [] and store.tokens(2).tolist() == []
+    assert np.allclose(store.starts, [0.0, 2.5, 4.0]) and np.allclose(store.ends, [2.5, 4.0, 6.25])
+    assert store.full_text() == "".join(segment["text"] for segment in segments)
+    assert store[-1].index == 2 and store[-3].text == segments[0]["text"]
+    with pytest.raises(IndexError):
+        store[3]
+    with pytest.raises(IndexError):
+        store[-4]
+
+    # Segment views can be written back as they are
+    copy = str(tmp_path / "copy.seg")
+    write_segments(copy, store)
+    assert SegmentStore.open(copy).to_dicts() == store.to_dicts()
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "empty.seg")
+    write_segments(path, [])
+    store = SegmentStore.open(path)
+    assert len(store) == 0 and store.to_dicts() == [] and store.full_text() == ""
+    with pytest.raises(IndexError):
+        store[-1]
+
+
+def test_rejects_other_and_truncated_files(tmp_path):
+    path = str(tmp_path / "lecture.seg")
+    write_segments(path, [{"start": 0.0, "end": 1.0, "text": " Hello.", "tokens": [1, 2]}])
+    with open(path, 'rb') as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        SegmentStore(np.frombuffer(data[:-4], dtype=np.uint8))
+    with pytest.raises(ValueError):
+        SegmentStore(np.frombuffer(b"NOTASEG!" + data[8:], dtype=np.uint8))
+
+
+def test_converts_the_sample_transcript_csv(tmp_path):
+    store = SegmentStore.open(convert_csv(SAMPLE_CSV, str(tmp_path / "sample.seg")))
+    with open(SAMPLE_CSV, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    assert len(store) == len(rows)
+    for segment, row in zip(store, rows):
+        assert abs(segment.start - float(row["start"])) < 1e-3 and abs(segment.end - float(row["end"])) < 1e-3
+        assert segment.text == row["text"]
+        assert segment.tokens.tolist() == json.loads(row["tokens"])
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
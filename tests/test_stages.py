@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core import pipeline
+from core.cache import ArtifactCache
+from core.pipeline import STAGE_GRAPH, stage_configs, stage_keys, stale_stages
+
+VIDEO = "0123456789abcdef"
+
+
+def configs(**changes):
+    """Stage configurations with every stage at version 1, except the ones given."""
+    return {stage: {"version": changes.get(stage, 1)} for stage in STAGE_GRAPH}
+
+
+def use_cache(monkeypatch, tmp_path, mode="separate"):
+    """Points the pipeline at an empty cache under tmp_path instead of the one in data/."""
+    cache = ArtifactCache(str(tmp_path), max_bytes=10 ** 6)
+    monkeypatch.setattr(pipeline, "artifact_cache", cache)
+    monkeypatch.setattr(pipeline, "GENERATION_MODE", mode)
+    return cache
+
+
+def test_a_config_change_invalidates_the_stage_and_its_dependents(monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    keys = stage_keys(VIDEO, configs())
+    assert set(keys) == set(STAGE_GRAPH) and len(set(keys.values())) == len(keys)
+    assert stage_keys(VIDEO, configs()) == keys
+    assert stage_keys("fedcba9876543210", configs())["audio"] != keys["audio"]
+
+    summary = stage_keys(VIDEO, configs(summary=2))
+    assert [stage for stage in keys if summary[stage] != keys[stage]] == ["summary"]
+
+    # Everything downstream of the transcript reads it, so its key changes too
+    transcript = stage_keys(VIDEO, configs(transcript=2))
+    assert [stage for stage in keys if transcript[stage] == keys[stage]] == ["audio"]
+
+
+def test_the_default_configs_cover_every_stage(monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    assert set(stage_configs()) == set(STAGE_GRAPH)
+    assert stage_keys(VIDEO) == stage_keys(VIDEO, stage_configs())
+
+
+def test_only_missing_stages_are_stale(monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path)
+    keys = stage_keys(VIDEO, configs())
+    assert stale_stages(keys) == ["audio", "transcript", "summary", "quizzes", "flashcards", "timestamps"]
+
+    # A cached transcript means the audio is not needed
+    cache.put_json(keys["transcript"], {"text": "hello", "segments": []})
+    cache.put_text(keys["summary"], "notes")
+    assert stale_stages(keys) == ["quizzes", "flashcards", "timestamps"]
+
+    for stage in ("quizzes", "flashcards", "timestamps"):
+        cache.put_text(keys[stage], "done")
+    assert stale_stages(keys) == []
+
+    # A new summary prompt only reruns the summary
+    assert stale_stages(stage_keys(VIDEO, configs(summary=2))) == ["summary"]
+
+
+def test_combined_mode_needs_the_materials_stage(monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path, mode="combined")
+    keys = stage_keys(VIDEO, configs())
+    assert stale_stages(keys) == ["audio", "transcript", "materials"]
+
+    cache.put_json(keys["transcript"], {"text": "hello", "segments": []})
+    assert stale_stages(keys) == ["materials"]
@@ -0,0 +1,129 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.storage import StorageManager
+
+MB = 1024 ** 2
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b"\0" * size)
+    return path
+
+
+def add_lecture(storage, data, name, video=0, audio=0, transcript=0):
+    for kind, directory, extension, size in (("video", "video", ".mp4", video), ("audio", "audio", ".wav", audio),
+                                             ("transcript", "text_timestamps", ".seg", transcript)):
+        if size:
+            storage.record(name, kind, write(os.path.join(data, directory, name + extension), size))
+            storage.enforce(protect=name)
+
+
+def test_evicts_videos_then_wavs_of_least_recently_used_lectures(tmp_path):
+    data = str(tmp_path)
+    storage = StorageManager(data, os.path.join(data, "storage", "index.json"), max_bytes=10 * MB)
+    for name in ("a", "b", "c"):
+        add_lecture(storage, data, name, video=2 * MB, audio=1 * MB, transcript=MB // 10)
+    storage.touch("a")
+
+    # 9.3 MB fits; the next lecture's video evicts the oldest videos ("b", then "c"), keeping the WAVs
+    add_lecture(storage, data, "d", video=3 * MB)
+    assert not os.path.exists(os.path.join(data, "video", "b.mp4"))
+    assert os.path.exists(os.path.join(data, "video", "a.mp4"))
+    assert os.path.exists(os.path.join(data, "audio", "b.wav"))
+
+    # Only WAVs are left to evict once the other videos are gone; transcripts always stay
+    add_lecture(storage, data, "e", video=4 * MB)
+    assert not os.path.exists(os.path.join(data, "video", "a.mp4"))
+    assert os.path.exists(os.path.join(data, "video", "e.mp4"))
+    assert all(os.path.exists(os.path.join(data, "text_timestamps", name + ".seg")) for name in "abc")
+    assert storage.usage()["total"] <= 10 * MB
+
+
+def test_index_survives_restarts_and_bootstraps_from_existing_files(tmp_path):
+    data = str(tmp_path)
+    write(os.path.join(data, "video", "old.mp4"), 2 * MB)
+    write(os.path.join(data, "audio", "old.wav"), MB)
+    directories = {os.path.join(data, "video"): "video", os.path.join(data, "audio"): "audio"}
+    index = os.path.join(data, "storage", "index.json")
+
+    storage = StorageManager(data, index, directories=directories)
+    assert storage.usage() == {"video": 2 * MB, "audio": MB, "transcript": 0, "other": 0, "total": 3 * MB}
+    add_lecture(storage, data, "new", video=MB)
+
+    # A restart reads the index instead of scanning, and keeps the eviction order
+    storage = StorageManager(data, index, max_kind_bytes={"video": 2 * MB}, directories=directories)
+    assert storage.usage()["video"] == 3 * MB
+    storage.enforce()
+    assert storage.files("old", "video") == [] and len(storage.files("new", "video")) == 1
+
+
+def test_managers_sharing_the_index_merge_their_changes(tmp_path):
+    # Two batch workers, each with its own copy of the index
+    data = str(tmp_path)
+    index = os.path.join(data, "storage", "index.json")
+    first = StorageManager(data, index)
+    second = StorageManager(data, index)
+    add_lecture(first, data, "a", video=MB)
+    add_lecture(second, data, "b", video=2 * MB)
+
+    fresh = StorageManager(data, index, max_bytes=2 * MB)
+    assert fresh.usage()["video"] == 3 * MB
+    fresh.enforce()
+    assert fresh.files("a", "video") == [] and len(fresh.files("b", "video")) == 1
+
+
+def test_hardlinked_files_only_count_as_freed_once_their_last_link_goes(tmp_path):
+    data = str(tmp_path)
+    upload = write(os.path.join(data, "uploads", "a.mp4"), 2 * MB)
+    cached = write(os.path.join(data, "cache", "a.wav"), MB)
+    released = []
+
+    def release_links(path):
+        # Stands in for the artifact cache dropping its hardlink of the WAV
+        if os.path.exists(cached) and os.path.samefile(path, cached):
+            os.remove(cached)
+            released.append(path)
+
+    storage = StorageManager(data, os.path.join(data, "storage", "index.json"), max_bytes=MB,
+                             release_links=release_links)
+    video = os.path.join(data, "video", "a.mp4")
+    wav = os.path.join(data, "audio", "a.wav")
+    os.makedirs(os.path.dirname(video))
+    os.makedirs(os.path.dirname(wav))
+    os.link(upload, video)
+    os.link(cached, wav)
+    storage.record("a", "video", video)
+    storage.record("a", "audio", wav)
+
+    # The video's bytes are still held by the upload: it stays, and stays counted
+    assert storage.enforce() == MB
+    assert os.path.exists(video) and storage.usage()["video"] == 2 * MB
+    assert not os.path.exists(wav) and released == [wav]
+
+    # Once the upload is gone, deleting the video frees its space
+    os.remove(upload)
+    assert storage.enforce() == 2 * MB
+    assert not os.path.exists(video) and storage.usage()["total"] == 0
+
+
+def test_audio_without_a_source_video_is_never_evicted(tmp_path):
+    data = str(tmp_path)
+    sample = write(os.path.join(data, "audio", "sample_lecture.mp3"), 2 * MB)
+    orphan = write(os.path.join(data, "audio", "orphan.wav"), MB)
+    wav = write(os.path.join(data, "audio", "lecture.wav"), MB)
+    write(os.path.join(data, "video", "lecture.mp4"), MB)
+    directories = {os.path.join(data, "video"): "video", os.path.join(data, "audio"): "audio"}
+
+    storage = StorageManager(data, os.path.join(data, "storage", "index.json"), max_bytes=MB,
+                             directories=directories)
+    assert storage.usage()["other"] == 3 * MB
+    storage.enforce()
+
+    # The video and its WAV go; the sample and the WAV with nothing to rebuild it from stay
+    assert os.path.exists(sample) and os.path.exists(orphan)
+    assert not os.path.exists(wav)
@@ -0,0 +1,101 @@
+import os
+import sys
+import random
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.topics import term_weights, gap_similarity, depth_scores, find_boundaries, segment_topics
+
+
+def lecture(topics, segments_per_topic=30, seconds=6.0, seed=0):
+    """Stand-in transcript: each topic has its own vocabulary, mixed with words shared by all of them."""
+    rng = random.Random(seed)
+    segments = []
+    for topic in topics:
+        for _ in range(segments_per_topic):
+            words = [f"{topic}{rng.randint(0, 9)}" for _ in range(8)]
+            words += [f"shared{rng.randint(0, 99)}" for _ in range(2)]
+            start = len(segments) * seconds
+            segments.append({"start": start, "end": start + seconds, "text": " " + " ".join(words)})
+    return segments
+
+
+def dense(weights):
+    matrix = np.zeros(weights.shape, dtype=np.float32)
+    for row in range(len(weights)):
+        low, high = weights.indptr[row], weights.indptr[row + 1]
+        matrix[row, weights.indices[low:high]] = weights.data[low:high]
+    return matrix
+
+
+def test_term_weights_keep_words_of_two_or_more_segments():
+    segments = [{"text": "The matrix has an eigenvalue."}, {"text": "Each eigenvalue, each matrix!"},
+                {"text": "Determinant of the matrix, matrix."}, {"text": "It's okay."}]
+    weights, terms = term_weights(segments)
+    assert terms == ["matrix", "eigenvalue"]
+    matrix = dense(weights)
+    assert matrix.shape == (4, 2)
+    # Twice as often in a segment, twice the weight; "matrix" is in more segments, so its idf is lower
+    assert matrix[2, 0] == 2 * matrix[0, 0] and matrix[0, 0] < matrix[0, 1]
+    assert not matrix[3].any()
+
+
+def test_gap_similarity_matches_dense_block_sums():
+    segments = lecture(["algebra", "geometry"], segments_per_topic=12)
+    weights, _ = term_weights(segments)
+    matrix = dense(weights).astype(np.float64)
+    block = 4
+    expected = []
+    for gap in range(1, len(matrix)):
+        left = matrix[max(gap - block, 0):gap].sum(axis=0)
+        right = matrix[gap:gap + block].sum(axis=0)
+        expected.append(left @ right / max(np.linalg.norm(left) * np.linalg.norm(right), 1e-9))
+    assert np.allclose(gap_similarity(weights, block), expected)
+
+
+def naive_depths(similarity):
+    depths = []
+    for i in range(len(similarity)):
+        left = i
+        while left > 0 and similarity[left - 1] >= similarity[left]:
+            left -= 1
+        right = i
+        while right < len(similarity) - 1 and similarity[right + 1] >= similarity[right]:
+            right += 1
+        depths.append(similarity[left] + similarity[right] - 2 * similarity[i])
+    return depths
+
+
+def test_depth_scores_climb_to_the_nearest_peaks():
+    assert np.allclose(depth_scores(np.array([0.9, 0.5, 0.2, 0.6, 0.8, 0.3])), [0.0, 0.4, 1.3, 0.2, 0.0, 0.5])
+    assert len(depth_scores(np.zeros(0))) == 0
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        # Rounded values make plateaus, where climbing continues over equal neighbours
+        similarity = np.round(rng.random(rng.integers(1, 40)), 1)
+        assert np.allclose(depth_scores(similarity), naive_depths(similarity))
+
+
+def test_boundaries_fall_on_topic_changes():
+    segments = lecture(["algebra", "geometry", "calculus"])
+    weights, _ = term_weights(segments)
+    # Nine minutes of lecture at 20 topics per hour allow two boundaries: the two deepest dips
+    boundaries = find_boundaries(segments, weights, block=6, min_seconds=60, max_per_hour=20)
+    assert boundaries == [30, 60]
+
+    # Too short to split, and too few topics allowed
+    assert find_boundaries(segments[:10], weights, block=6) == []
+    assert find_boundaries(segments, weights, block=6, min_seconds=60, max_per_hour=1) == []
+
+
+def test_segment_topics_labels_groups_locally():
+    groups = segment_topics(lecture(["algebra", "geometry", "calculus"]))
+    starts = [group["start_time"] for group in groups]
+    assert 180.0 in starts and 360.0 in starts
+    assert groups[0]["start_time"] == 0.0 and groups[-1]["end_time"] == 90 * 6.0
+    # Titles are the group's top keywords, and every group has its sub-topics
+    assert groups[0]["title"].startswith("Algebra") and groups[-1]["title"].startswith("Calculus")
+    assert all(len(group["segments"]) == 3 for group in groups)
+    assert segment_topics([{"start": 0.0, "end": 1.0, "text": "  "}]) == []
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.transcription import find_split_points, stitch_segments, transcribe_windows, SAMPLE_RATE
+
+
+def speech_with_pauses(seconds, pauses, pause_seconds=0.2):
+    """Stand-in for a lecture: loud noise everywhere except short pauses starting at the given times."""
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, int(seconds * SAMPLE_RATE)).astype(np.float32)
+    for pause in pauses:
+        samples[int(pause * SAMPLE_RATE):int((pause + pause_seconds) * SAMPLE_RATE)] = 0.0
+    return samples
+
+
+def segment(start, end, text, seek=0):
+    return {"start": start, "end": end, "text": text, "seek": seek}
+
+
+def test_split_points_snap_to_the_nearest_pause():
+    samples = speech_with_pauses(30, [10.8, 20.6])
+    points = find_split_points(samples, chunk_seconds=10, search_seconds=2)
+
+    assert points[0] == 0 and points[-1] == len(samples)
+    assert len(points) == 4
+    assert abs(points[1] / SAMPLE_RATE - 10.9) < 0.1 and abs(points[2] / SAMPLE_RATE - 20.7) < 0.1
+
+
+def test_split_points_of_short_audio():
+    assert find_split_points(np.zeros(0, dtype=np.float32), 10, 2) == [0, 0]
+    # A trailing piece shorter than half a chunk is not split off
+    samples = speech_with_pauses(14, [10.0])
+    assert find_split_points(samples, chunk_seconds=10, search_seconds=2) == [0, len(samples)]
+
+
+def test_stitching_keeps_overlapping_segments_once():
+    # Two windows split at 10 s, each with 2 s of context from the other side
+    first = [segment(0.0, 4.0, " One."), segment(4.0, 9.0, " Two."), segment(9.0, 11.5, " Three.")]
+    second = [segment(0.5, 3.5, " Three."), segment(3.5, 8.0, " Four.", seek=350)]
+    stitched = stitch_segments([(first, 0.0, 0.0, 10.0), (second, 8.0, 10.0, float("inf"))])
+
+    assert [item["text"] for item in stitched] == [" One.", " Two.", " Three.", " Four."]
+    assert [item["id"] for item in stitched] == [0, 1, 2, 3]
+    # Both windows heard the boundary segment; the second owns its midpoint either way, so its copy is kept
+    assert (stitched[2]["start"], stitched[2]["end"]) == (8.5, 11.5)
+    assert (stitched[3]["start"], stitched[3]["end"]) == (11.5, 16.0)
+    assert stitched[3]["seek"] == 350 + 800  # 8 s of 10 ms frames
+
+
+def test_stitching_drops_repeats_at_a_boundary():
+    first = [segment(0.0, 9.8, " Same words.")]
+    second = [segment(0.0, 2.0, " Same words."), segment(2.0, 4.0, " New words.")]
+    stitched = stitch_segments([(first, 0.0, 0.0, 10.0), (second, 10.0, 10.0, float("inf"))])
+    assert [item["text"] for item in stitched] == [" Same words.", " New words."]
+
+
+class WindowBackend:
+    """Stand-in for Whisper: one segment per window, timed relative to the window."""
+
+    def __init__(self):
+        self.lengths = []
+
+    def transcribe(self, samples, **options):
+        self.lengths.append(len(samples) / SAMPLE_RATE)
+        return {"segments": [segment(0.0, len(samples) / SAMPLE_RATE, f" Window {len(self.lengths)}.")]}
+
+
+def test_windows_are_transcribed_in_order_on_the_original_timeline():
+    backend = WindowBackend()
+    progress = []
+    samples = speech_with_pauses(30, [10.8, 20.6])
+    text, segments = transcribe_windows(backend, samples, 10, on_segments=progress.append)
+
+    assert text == " Window 1. Window 2. Window 3."
+    assert [len(partial) for partial in progress] == [1, 2, 3]
+    assert segments[-1]["end"] == 30.0
+    assert all(abs(a["end"] - b["start"]) < 1e-9 for a, b in zip(segments, segments[1:]))
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.vad import SpeechMap, speech_regions, JOIN_SILENCE_SECONDS
+
+RATE = 16000
+
+
+def recording(parts, noise=3e-3, seed=0):
+    """Stand-in for a decoded lecture: (seconds, tone frequency or None) parts over room noise (about -50 dBFS)."""
+    pieces = []
+    for seconds, frequency in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        pieces.append(0.3 * np.sin(2 * np.pi * frequency * t) if frequency else np.zeros(len(t)))
+    samples = np.concatenate(pieces)
+    samples += np.random.default_rng(seed).normal(0, noise, len(samples))
+    return samples.astype(np.float32)
+
+
+def test_finds_tones_between_silences():
+    samples = recording([(5, None), (3, 440), (5, None), (2, 300), (4, None)])
+    regions = speech_regions(samples, RATE, padding=0.3)
+
+    assert len(regions) == 2
+    for (start, end), (expected_start, expected_end) in zip(regions, [(5, 8), (13, 15)]):
+        assert abs(start / RATE - (expected_start - 0.3)) < 0.05
+        assert abs(end / RATE - (expected_end + 0.3)) < 0.05
+
+
+def test_rejects_mains_hum():
+    samples = recording([(3, None), (3, 50), (3, None)])
+    assert speech_regions(samples, RATE) == []
+
+
+def test_all_silent_recordings_have_no_speech():
+    assert speech_regions(np.zeros(10 * RATE, dtype=np.float32), RATE) == []
+    assert speech_regions(recording([(10, None)]), RATE) == []
+
+    # Nothing to transcribe, and times pass through unchanged
+    speech = SpeechMap(np.zeros(10 * RATE, dtype=np.float32), [], RATE)
+    assert len(speech.samples) == 0 and speech.speech_seconds == 0 and speech.skipped_ratio == 1.0
+    assert speech.to_original(4.2) == 4.2
+
+
+def test_segments_are_mapped_back_onto_the_recording():
+    samples = np.ones(10 * RATE, dtype=np.float32)
+    # Speech from 1 s to 3 s and from 5 s to 6 s
+    speech = SpeechMap(samples, [(1 * RATE, 3 * RATE), (5 * RATE, 6 * RATE)], RATE)
+    assert len(speech.samples) == int((3 + JOIN_SILENCE_SECONDS) * RATE)
+    assert speech.speech_seconds == 3.0 and abs(speech.skipped_ratio - 0.7) < 1e-9
+
+    second = 2 + JOIN_SILENCE_SECONDS
+    segments = [{"start": 0.5, "end": second + 0.6, "seek": 50, "text": " across the pause",
+                 "words": [{"start": second + 0.1, "end": second + 0.2, "word": " pause"}]}]
+    [moved] = speech.remap_segments(segments)
+    assert moved["start"] == 1.5
+    assert abs(moved["end"] - 5.6) < 1e-9
+    assert moved["seek"] == 150
+    assert abs(moved["words"][0]["start"] - 5.1) < 1e-9 and abs(moved["words"][0]["end"] - 5.2) < 1e-9
+    assert segments[0]["start"] == 0.5  # The input is left alone
+
+    # Times in the silence joining two regions belong to the end of the earlier one
+    assert speech.to_original(2 + JOIN_SILENCE_SECONDS / 2) == 3.0